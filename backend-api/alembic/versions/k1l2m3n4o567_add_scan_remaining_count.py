@@ -0,0 +1,42 @@
+"""add scan.remaining_count and pending scan_result index
+
+Also merges the ccf7645372fc and d87c3bb49953 heads.
+
+Revision ID: k1l2m3n4o567
+Revises: ccf7645372fc, d87c3bb49953
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "k1l2m3n4o567"
+down_revision: Union[str, Sequence[str], None] = ("ccf7645372fc", "d87c3bb49953")
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("scan", sa.Column("remaining_count", sa.Integer(), nullable=True))
+    op.create_index(
+        "ix_scan_result_scan_id_pending",
+        "scan_result",
+        ["scan_id"],
+        unique=False,
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_scan_result_scan_id_pending",
+        table_name="scan_result",
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.drop_column("scan", "remaining_count")
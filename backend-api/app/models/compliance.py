@@ -60,6 +60,8 @@ class Scan(Base):
     failed_count: Mapped[int] = mapped_column(default=0)
     skipped_count: Mapped[int] = mapped_column(default=0)
     error_count: Mapped[int] = mapped_column(default=0)
+    # Dispatched controls the worker is still waiting on; NULL until dispatch
+    remaining_count: Mapped[Optional[int]] = mapped_column(nullable=True)
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
 
     # Relationships
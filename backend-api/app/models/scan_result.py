@@ -3,7 +3,7 @@
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import ForeignKey, String, Text, UniqueConstraint
+from sqlalchemy import ForeignKey, Index, String, Text, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -20,6 +20,11 @@ class ScanResult(Base):
     __tablename__ = "scan_result"
     __table_args__ = (
         UniqueConstraint("scan_id", "control_id", name="uq_scan_result_scan_control"),
+        Index(
+            "ix_scan_result_scan_id_pending",
+            "scan_id",
+            postgresql_where=text("status = 'pending'"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -21,38 +21,45 @@ class MFARegistrationReportDataCollector(BaseDataCollector):
     to verify users have registered for multi-factor authentication.
     """
 
+    # Page cap for the report; anything beyond it is flagged in report_truncated
+    MAX_PAGES = 1000
+
     async def collect(self, client: GraphClient) -> dict[str, Any]:
         """Collect MFA registration report data.
 
+        The report has one row per user, so it is folded into counts page by
+        page instead of being held in memory.
+
         Returns:
             Dict containing:
-            - registration_details: User MFA registration details
             - total_users: Total number of users
             - mfa_registered_count: Number of users registered for MFA
             - mfa_capable_count: Number of users capable of MFA
+            - report_truncated: True if the report was cut off at the page cap
         """
         # Get user registration details for MFA
-        registration_details = await client.get_all_pages(
+        pages = client.iter_pages(
             "/reports/authenticationMethods/userRegistrationDetails",
             beta=True,
+            max_pages=self.MAX_PAGES,
         )
 
         # Count users by MFA status
+        total_users = 0
         mfa_registered_count = 0
         mfa_capable_count = 0
 
-        for user in registration_details:
-            # isMfaRegistered indicates user has registered for MFA
-            if user.get("isMfaRegistered"):
-                mfa_registered_count += 1
-            # isMfaCapable indicates user can use MFA
-            if user.get("isMfaCapable"):
-                mfa_capable_count += 1
-
-        total_users = len(registration_details)
+        async for page in pages:
+            total_users += len(page)
+            for user in page:
+                # isMfaRegistered indicates user has registered for MFA
+                if user.get("isMfaRegistered"):
+                    mfa_registered_count += 1
+                # isMfaCapable indicates user can use MFA
+                if user.get("isMfaCapable"):
+                    mfa_capable_count += 1
 
         return {
-            "registration_details": registration_details,
             "total_users": total_users,
             "mfa_registered_count": mfa_registered_count,
             "mfa_capable_count": mfa_capable_count,
@@ -62,4 +69,5 @@ class MFARegistrationReportDataCollector(BaseDataCollector):
                 if total_users > 0
                 else 0
             ),
+            "report_truncated": pages.truncated,
         }
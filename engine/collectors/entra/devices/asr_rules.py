@@ -13,6 +13,7 @@ Graph Endpoints:
 from typing import Any
 
 from collectors.base import BaseDataCollector
+from collectors.concurrency import gather_bounded
 from collectors.graph_client import GraphClient
 
 
@@ -50,17 +51,21 @@ class ASRRulesDataCollector(BaseDataCollector):
     async def collect(self, client: GraphClient) -> dict[str, Any]:
         """Collect ASR rule configuration data."""
         configs = await client.get_all_pages("/deviceManagement/deviceConfigurations")
-        findings: list[tuple[str, str | None]] = []
-        for config in configs:
-            if "endpointprotection" not in config.get("@odata.type", "").lower():
-                continue
-            config_id = config.get("id")
-            if not config_id:
-                continue
-            full_config = await client.get(
-                f"/deviceManagement/deviceConfigurations/{config_id}",
+        endpoint_protection_configs = [
+            config
+            for config in configs
+            if "endpointprotection" in config.get("@odata.type", "").lower() and config.get("id")
+        ]
+        full_configs = await gather_bounded(
+            lambda config: client.get(
+                f"/deviceManagement/deviceConfigurations/{config['id']}",
                 beta=True,
-            )
+            ),
+            endpoint_protection_configs,
+        )
+
+        findings: list[tuple[str, str | None]] = []
+        for config, full_config in zip(endpoint_protection_configs, full_configs):
             win32_value = full_config.get("defenderOfficeMacroCodeAllowWin32ImportsType")
             if win32_value:
                 findings.append(
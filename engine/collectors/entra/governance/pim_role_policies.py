@@ -17,9 +17,11 @@ Controls covered:
     - 5.3.5: Ensure approval is required for Privileged Role Administrator activation
 """
 
+import asyncio
 from typing import Any
 
 from collectors.base import BaseDataCollector
+from collectors.concurrency import gather_bounded
 from collectors.graph_client import GraphClient
 
 
@@ -49,24 +51,26 @@ class PimRolePoliciesDataCollector(BaseDataCollector):
             - max_activation_duration_hours: Maximum activation duration configured
             - pim_enabled: Whether PIM is being used (policies exist)
         """
-        # Step 1: Get all role management policies
+        # Step 1: Get all role management policies, and role definitions to map
+        # scope to role names (both independent, so fetched together)
         # Note: This endpoint requires beta API for full policy details
-        policies_response = await client.get(
-            "/policies/roleManagementPolicies",
-            beta=True,
-            params={"$filter": "scopeId eq '/' and scopeType eq 'DirectoryRole'"},
+        policies_response, role_definitions = await asyncio.gather(
+            client.get(
+                "/policies/roleManagementPolicies",
+                beta=True,
+                params={"$filter": "scopeId eq '/' and scopeType eq 'DirectoryRole'"},
+            ),
+            client.get_all_pages(
+                "/roleManagement/directory/roleDefinitions",
+                beta=True,
+            ),
         )
         policies = policies_response.get("value", [])
-
-        # Step 2: Get role definitions to map scope to role names
-        role_definitions = await client.get_all_pages(
-            "/roleManagement/directory/roleDefinitions",
-            beta=True,
-        )
         role_map = {r.get("templateId"): r for r in role_definitions}
 
-        # Step 3: Process each policy and enrich with rules for key roles
+        # Step 2: Process each policy and enrich with rules for key roles
         enriched_policies = []
+        key_policies = []
         global_admin_policy = None
         privileged_role_admin_policy = None
 
@@ -88,27 +92,34 @@ class PimRolePoliciesDataCollector(BaseDataCollector):
                 "roleName": role_map.get(role_template_id, {}).get("displayName"),
             }
 
-            # Get detailed rules for Global Admin and Privileged Role Admin
+            # Detailed rules are needed for Global Admin and Privileged Role Admin
             if role_template_id in [
                 self.GLOBAL_ADMIN_ROLE_TEMPLATE_ID,
                 self.PRIVILEGED_ROLE_ADMIN_TEMPLATE_ID,
             ]:
-                rules_response = await client.get(
-                    f"/policies/roleManagementPolicies/{policy_id}/rules",
-                    beta=True,
-                )
-                rules = rules_response.get("value", [])
-                policy_data["rules"] = rules
+                key_policies.append(policy_data)
 
-                # Extract key settings from rules
-                policy_data.update(self._extract_rule_settings(rules))
+            enriched_policies.append(policy_data)
 
-                if role_template_id == self.GLOBAL_ADMIN_ROLE_TEMPLATE_ID:
-                    global_admin_policy = policy_data
-                elif role_template_id == self.PRIVILEGED_ROLE_ADMIN_TEMPLATE_ID:
-                    privileged_role_admin_policy = policy_data
+        # Step 3: Get the rules of the key policies concurrently
+        rules_responses = await gather_bounded(
+            lambda policy_data: client.get(
+                f"/policies/roleManagementPolicies/{policy_data['id']}/rules",
+                beta=True,
+            ),
+            key_policies,
+        )
+        for policy_data, rules_response in zip(key_policies, rules_responses):
+            rules = rules_response.get("value", [])
+            policy_data["rules"] = rules
 
-            enriched_policies.append(policy_data)
+            # Extract key settings from rules
+            policy_data.update(self._extract_rule_settings(rules))
+
+            if policy_data["roleTemplateId"] == self.GLOBAL_ADMIN_ROLE_TEMPLATE_ID:
+                global_admin_policy = policy_data
+            elif policy_data["roleTemplateId"] == self.PRIVILEGED_ROLE_ADMIN_TEMPLATE_ID:
+                privileged_role_admin_policy = policy_data
 
         return {
             "role_management_policies": enriched_policies,
@@ -7,11 +7,12 @@ Connection Method: Microsoft Graph API
 Required Scopes: User.Read.All, RoleManagement.Read.Directory
 Graph Endpoints:
     - /directoryRoles
-    - /directoryRoles/{id}/members
-    - /users/{id} ($select id,userPrincipalName,displayName)
-    - /users/{id}/licenseDetails
+    - /directoryRoles/{id}/members (via $batch)
+    - /users/{id} ($select id,userPrincipalName,displayName; via $batch)
+    - /users/{id}/licenseDetails (via $batch)
 """
 
+import asyncio
 from typing import Any
 
 from collectors.base import BaseDataCollector
@@ -69,13 +70,13 @@ class AdminLicenseFootprintDataCollector(BaseDataCollector):
         admin_roles = [
             role for role in roles if role.get("displayName") in self.ADMIN_ROLE_NAMES
         ]
-        admin_users: dict[str, dict[str, Any]] = {}
+        role_members = await client.get_roles_members([role["id"] for role in admin_roles])
 
+        # Admin user ID -> role names, in role order
+        user_roles: dict[str, list[str]] = {}
         for role in admin_roles:
             role_name = role.get("displayName", "Unknown")
-            members = await client.get_role_members(role["id"])
-
-            for member in members:
+            for member in role_members[role["id"]]:
                 if member.get("@odata.type") != "#microsoft.graph.user":
                     continue
 
@@ -83,23 +84,26 @@ class AdminLicenseFootprintDataCollector(BaseDataCollector):
                 if not user_id:
                     continue
 
-                if user_id in admin_users:
-                    if role_name not in admin_users[user_id]["admin_roles"]:
-                        admin_users[user_id]["admin_roles"].append(role_name)
-                    continue
-
-                user_details = await client.get(
-                    f"/users/{user_id}",
-                    params={"$select": "id,userPrincipalName,displayName"},
-                )
-                license_details = await client.get_user_license_details(user_id)
-                admin_users[user_id] = {
-                    "id": user_id,
-                    "userPrincipalName": user_details.get("userPrincipalName"),
-                    "displayName": user_details.get("displayName"),
-                    "admin_roles": [role_name],
-                    "license_details": license_details,
-                }
+                roles_held = user_roles.setdefault(user_id, [])
+                if role_name not in roles_held:
+                    roles_held.append(role_name)
+
+        user_ids = list(user_roles)
+        users, licenses = await asyncio.gather(
+            client.get_users_by_ids(user_ids, select="id,userPrincipalName,displayName"),
+            client.get_users_license_details(user_ids),
+        )
+
+        admin_users: dict[str, dict[str, Any]] = {
+            user_id: {
+                "id": user_id,
+                "userPrincipalName": users[user_id].get("userPrincipalName"),
+                "displayName": users[user_id].get("displayName"),
+                "admin_roles": user_roles[user_id],
+                "license_details": licenses[user_id],
+            }
+            for user_id in user_ids
+        }
 
         admin_accounts: list[dict[str, Any]] = []
         high_footprint_count = 0
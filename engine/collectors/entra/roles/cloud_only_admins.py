@@ -48,14 +48,16 @@ class CloudOnlyAdminsDataCollector(BaseDataCollector):
             role for role in roles if role.get("displayName") in self.ADMIN_ROLE_NAMES
         ]
 
-        # Collect all admin users (deduplicated)
-        admin_users: dict[str, dict[str, Any]] = {}
+        # Members of every admin role, fetched in $batch round trips
+        role_members = await client.get_roles_members([role["id"] for role in admin_roles])
+
+        # Collect all admin users (deduplicated) with the roles they hold
+        user_roles: dict[str, list[str]] = {}
 
         for role in admin_roles:
             role_name = role.get("displayName", "Unknown")
-            members = await client.get_role_members(role["id"])
 
-            for member in members:
+            for member in role_members[role["id"]]:
                 # Only process user objects
                 if member.get("@odata.type") != "#microsoft.graph.user":
                     continue
@@ -64,30 +66,25 @@ class CloudOnlyAdminsDataCollector(BaseDataCollector):
                 if not user_id:
                     continue
 
-                if user_id in admin_users:
-                    # Add role to existing user
-                    admin_users[user_id]["admin_roles"].append(role_name)
-                else:
-                    # Get full user details including onPremisesSyncEnabled
-                    user_details = await client.get(
-                        f"/users/{user_id}",
-                        params={
-                            "$select": "id,userPrincipalName,displayName,onPremisesSyncEnabled"
-                        },
-                    )
-
-                    admin_users[user_id] = {
-                        "id": user_id,
-                        "userPrincipalName": user_details.get("userPrincipalName"),
-                        "displayName": user_details.get("displayName"),
-                        "on_premises_sync_enabled": user_details.get(
-                            "onPremisesSyncEnabled", False
-                        )
-                        or False,
-                        "admin_roles": [role_name],
-                    }
-
-        admin_accounts = list(admin_users.values())
+                user_roles.setdefault(user_id, []).append(role_name)
+
+        # Get full user details including onPremisesSyncEnabled
+        users = await client.get_users_by_ids(
+            list(user_roles),
+            select="id,userPrincipalName,displayName,onPremisesSyncEnabled",
+        )
+
+        admin_accounts = [
+            {
+                "id": user_id,
+                "userPrincipalName": users[user_id].get("userPrincipalName"),
+                "displayName": users[user_id].get("displayName"),
+                "on_premises_sync_enabled": users[user_id].get("onPremisesSyncEnabled", False)
+                or False,
+                "admin_roles": roles_held,
+            }
+            for user_id, roles_held in user_roles.items()
+        ]
 
         return {
             "admin_accounts": admin_accounts,
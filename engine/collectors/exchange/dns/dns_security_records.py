@@ -15,13 +15,42 @@ DNS Records: SPF (TXT), DMARC (_dmarc.{domain} TXT)
 Note: This collector uses a two-step approach:
     1. Retrieve tenant domains via Microsoft Graph API
     2. Query DNS for SPF and DMARC records for each verified domain
+
+    DNS queries are asynchronous and run for all domains concurrently, within
+    an overall timeout budget. Answers are cached for their TTL across scans
+    in the worker process.
 """
 
+import asyncio
+import threading
+import time
 from typing import Any
 
+import dns.asyncresolver
+import dns.resolver
+
 from collectors.base import BaseDataCollector
+from collectors.concurrency import gather_bounded
 from collectors.graph_client import GraphClient
 
+_resolver: dns.asyncresolver.Resolver | None = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> dns.asyncresolver.Resolver:
+    """The process-wide async resolver.
+
+    Its LRU cache keeps TXT answers (and NXDOMAIN/no-answer responses) for
+    their DNS TTL, so repeat scans of a tenant - or tenants sharing domains -
+    don't query the same records again.
+    """
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = dns.asyncresolver.Resolver()
+            _resolver.cache = dns.resolver.LRUCache(max_size=10000)
+        return _resolver
+
 
 class DnsSecurityRecordsDataCollector(BaseDataCollector):
     """Collects DNS security records (SPF, DMARC) for CIS compliance evaluation.
@@ -30,6 +59,13 @@ class DnsSecurityRecordsDataCollector(BaseDataCollector):
     then performs DNS lookups for SPF and DMARC records on each domain.
     """
 
+    # Domains looked up at the same time
+    DNS_CONCURRENCY = 50
+    # Seconds allowed for one query, including retries across nameservers
+    DNS_QUERY_LIFETIME = 5.0
+    # Seconds allowed for all lookups; queries not finished by then time out
+    DNS_TIMEOUT_BUDGET = 20.0
+
     async def collect(self, client: GraphClient) -> dict[str, Any]:
         """Collect DNS security records for all tenant domains.
 
@@ -38,80 +74,108 @@ class DnsSecurityRecordsDataCollector(BaseDataCollector):
             - domains: List of domain records with SPF/DMARC data
             - total_domains: Number of verified domains checked
         """
-        import dns.resolver
-
         # Step 1: Get domains from Graph API
         domains = await client.get_domains()
 
         # Step 2: Filter for verified domains
         verified_domains = [d for d in domains if d.get("isVerified", False)]
 
-        domain_records = []
-        for domain in verified_domains:
-            domain_id = domain.get("id")
-
-            record = {
-                "domain": domain_id,
-                "is_verified": True,
-                "is_default": domain.get("isDefault", False),
-                "is_initial": domain.get("isInitial", False),
-                "authentication_type": domain.get("authenticationType"),
-                "spf_record": None,
-                "dmarc_record": None,
-                "dmarc_policy": None,
-                "spf_error": None,
-                "dmarc_error": None,
-            }
-
-            # Query SPF record (TXT record at domain root)
-            try:
-                answers = dns.resolver.resolve(domain_id, "TXT")
-                for rdata in answers:
-                    # TXT records may have multiple strings, join them
-                    txt_value = "".join(s.decode() if isinstance(s, bytes) else s for s in rdata.strings)
-                    if txt_value.startswith("v=spf1"):
-                        record["spf_record"] = txt_value
-                        break
-            except dns.resolver.NXDOMAIN:
-                record["spf_error"] = "Domain not found"
-            except dns.resolver.NoAnswer:
-                record["spf_error"] = "No TXT records"
-            except dns.resolver.NoNameservers:
-                record["spf_error"] = "No nameservers available"
-            except dns.resolver.Timeout:
-                record["spf_error"] = "DNS query timeout"
-            except Exception as e:
-                record["spf_error"] = str(e)
-
-            # Query DMARC record (TXT record at _dmarc.{domain})
-            dmarc_domain = f"_dmarc.{domain_id}"
-            try:
-                answers = dns.resolver.resolve(dmarc_domain, "TXT")
-                for rdata in answers:
-                    txt_value = "".join(s.decode() if isinstance(s, bytes) else s for s in rdata.strings)
-                    if txt_value.startswith("v=DMARC1"):
-                        record["dmarc_record"] = txt_value
-                        # Parse DMARC policy
-                        record["dmarc_policy"] = self._parse_dmarc_policy(txt_value)
-                        break
-            except dns.resolver.NXDOMAIN:
-                record["dmarc_error"] = "DMARC record not found"
-            except dns.resolver.NoAnswer:
-                record["dmarc_error"] = "No DMARC TXT record"
-            except dns.resolver.NoNameservers:
-                record["dmarc_error"] = "No nameservers available"
-            except dns.resolver.Timeout:
-                record["dmarc_error"] = "DNS query timeout"
-            except Exception as e:
-                record["dmarc_error"] = str(e)
-
-            domain_records.append(record)
+        # Step 3: Look up each domain's records concurrently, within the budget
+        deadline = time.monotonic() + self.DNS_TIMEOUT_BUDGET
+        domain_records = await gather_bounded(
+            lambda domain: self._lookup_domain(domain, deadline),
+            verified_domains,
+            limit=self.DNS_CONCURRENCY,
+        )
 
         return {
             "domains": domain_records,
             "total_domains": len(domain_records),
         }
 
+    async def _resolve_txt(self, name: str, deadline: float) -> list[str]:
+        """Resolve the TXT records of a name, each joined into one string.
+
+        Raises:
+            dns.resolver.Timeout: If the query doesn't finish before deadline.
+            dns.exception.DNSException: For other resolution failures.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise dns.resolver.Timeout()
+        answers = await get_resolver().resolve(
+            name, "TXT", lifetime=min(self.DNS_QUERY_LIFETIME, remaining)
+        )
+        # TXT records may have multiple strings, join them
+        return [
+            "".join(s.decode() if isinstance(s, bytes) else s for s in rdata.strings)
+            for rdata in answers
+        ]
+
+    async def _lookup_domain(self, domain: dict[str, Any], deadline: float) -> dict[str, Any]:
+        """Query the SPF and DMARC records of one verified domain.
+
+        Lookup failures are recorded in spf_error/dmarc_error rather than raised.
+        """
+        domain_id = domain.get("id")
+
+        record = {
+            "domain": domain_id,
+            "is_verified": True,
+            "is_default": domain.get("isDefault", False),
+            "is_initial": domain.get("isInitial", False),
+            "authentication_type": domain.get("authenticationType"),
+            "spf_record": None,
+            "dmarc_record": None,
+            "dmarc_policy": None,
+            "spf_error": None,
+            "dmarc_error": None,
+        }
+
+        # SPF record (TXT record at domain root) and DMARC record (TXT record
+        # at _dmarc.{domain}) are queried together
+        spf_result, dmarc_result = await asyncio.gather(
+            self._resolve_txt(domain_id, deadline),
+            self._resolve_txt(f"_dmarc.{domain_id}", deadline),
+            return_exceptions=True,
+        )
+
+        if isinstance(spf_result, dns.resolver.NXDOMAIN):
+            record["spf_error"] = "Domain not found"
+        elif isinstance(spf_result, dns.resolver.NoAnswer):
+            record["spf_error"] = "No TXT records"
+        elif isinstance(spf_result, dns.resolver.NoNameservers):
+            record["spf_error"] = "No nameservers available"
+        elif isinstance(spf_result, dns.resolver.Timeout):
+            record["spf_error"] = "DNS query timeout"
+        elif isinstance(spf_result, Exception):
+            record["spf_error"] = str(spf_result)
+        else:
+            for txt_value in spf_result:
+                if txt_value.startswith("v=spf1"):
+                    record["spf_record"] = txt_value
+                    break
+
+        if isinstance(dmarc_result, dns.resolver.NXDOMAIN):
+            record["dmarc_error"] = "DMARC record not found"
+        elif isinstance(dmarc_result, dns.resolver.NoAnswer):
+            record["dmarc_error"] = "No DMARC TXT record"
+        elif isinstance(dmarc_result, dns.resolver.NoNameservers):
+            record["dmarc_error"] = "No nameservers available"
+        elif isinstance(dmarc_result, dns.resolver.Timeout):
+            record["dmarc_error"] = "DNS query timeout"
+        elif isinstance(dmarc_result, Exception):
+            record["dmarc_error"] = str(dmarc_result)
+        else:
+            for txt_value in dmarc_result:
+                if txt_value.startswith("v=DMARC1"):
+                    record["dmarc_record"] = txt_value
+                    # Parse DMARC policy
+                    record["dmarc_policy"] = self._parse_dmarc_policy(txt_value)
+                    break
+
+        return record
+
     def _parse_dmarc_policy(self, dmarc_record: str) -> dict[str, str]:
         """Parse DMARC record into key-value pairs.
 
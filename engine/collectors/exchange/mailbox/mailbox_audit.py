@@ -33,14 +33,15 @@ class MailboxAuditDataCollector(BasePowerShellCollector):
             - bypass_count: Number of accounts with bypass enabled
         """
         # Get only mailboxes with AuditBypassEnabled = True
-        # Filter in PowerShell to avoid large output and suppress warnings
+        # Filter and project in PowerShell to avoid large output and suppress warnings
         cmdlet = (
             "Get-MailboxAuditBypassAssociation -ResultSize Unlimited "
             "-WarningAction SilentlyContinue | "
-            "Where-Object { $_.AuditBypassEnabled -eq $true } | "
-            "Select-Object Name, AuditBypassEnabled"
+            "Where-Object { $_.AuditBypassEnabled -eq $true }"
+        )
+        bypassed = await client.run_cmdlet(
+            "ExchangeOnline", cmdlet, select=["Name", "AuditBypassEnabled"]
         )
-        bypassed = await client.run_cmdlet("ExchangeOnline", cmdlet)
 
         # Handle None, single result, or list
         if bypassed is None:
@@ -17,12 +17,50 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+MAILBOX_PROPERTIES = [
+    "UserPrincipalName", "AuditEnabled", "AuditAdmin", "AuditDelegate", "AuditOwner",
+]
+
+# Audit actions CIS 6.1.2 requires for each logon type
+REQUIRED_AUDIT_ACTIONS = {
+    "AuditAdmin": frozenset({
+        "ApplyRecord", "Copy", "Create", "FolderBind", "HardDelete", "Move",
+        "MoveToDeletedItems", "SendAs", "SendOnBehalf", "SoftDelete", "Update",
+        "UpdateCalendarDelegation", "UpdateFolderPermissions", "UpdateInboxRules",
+    }),
+    "AuditDelegate": frozenset({
+        "ApplyRecord", "Create", "FolderBind", "HardDelete", "Move", "MoveToDeletedItems",
+        "SendAs", "SendOnBehalf", "SoftDelete", "Update", "UpdateFolderPermissions",
+        "UpdateInboxRules",
+    }),
+    "AuditOwner": frozenset({
+        "ApplyRecord", "Create", "HardDelete", "MailboxLogin", "Move", "MoveToDeletedItems",
+        "SoftDelete", "Update", "UpdateCalendarDelegation", "UpdateFolderPermissions",
+        "UpdateInboxRules",
+    }),
+}
+
+
+def missing_audit_actions(mailbox: dict[str, Any]) -> dict[str, list[str]]:
+    """Required audit actions a mailbox doesn't log, per logon type that lacks any."""
+    missing = {}
+    for prop, required in REQUIRED_AUDIT_ACTIONS.items():
+        configured = mailbox.get(prop) or []
+        if isinstance(configured, str):
+            configured = [configured]
+        lacking = required.difference(configured)
+        if lacking:
+            missing[prop] = sorted(lacking)
+    return missing
+
 
 class MailboxAuditActionsDataCollector(BasePowerShellCollector):
     """Collects mailbox audit action configuration for CIS 6.1.2 evaluation.
 
-    This collector retrieves audit action settings (AuditAdmin, AuditDelegate,
-    AuditOwner) for user mailboxes.
+    This collector checks the audit action settings (AuditAdmin, AuditDelegate,
+    AuditOwner) of every user mailbox against the actions CIS requires.
+    Mailboxes are checked as they stream in, so only the non-compliant ones are
+    held.
     """
 
     async def collect(self, client: PowerShellClient) -> dict[str, Any]:
@@ -30,26 +68,32 @@ class MailboxAuditActionsDataCollector(BasePowerShellCollector):
 
         Returns:
             Dict containing:
-            - mailboxes: List of user mailboxes with audit settings
             - total_user_mailboxes: Total number of user mailboxes
+            - non_compliant_count: Number of mailboxes missing required audit actions
+            - non_compliant_mailboxes: UserPrincipalName of each of those mailboxes
+              and the required actions it is missing, per logon type
         """
         # Get user mailboxes with audit properties
         # Filter in PowerShell and select only needed properties to reduce output
         cmdlet = (
             "Get-EXOMailbox -PropertySets Audit, Minimum -ResultSize Unlimited "
             "-WarningAction SilentlyContinue | "
-            "Where-Object { $_.RecipientTypeDetails -eq 'UserMailbox' } | "
-            "Select-Object UserPrincipalName, AuditEnabled, AuditAdmin, AuditDelegate, AuditOwner"
+            "Where-Object { $_.RecipientTypeDetails -eq 'UserMailbox' }"
         )
-        mailboxes = await client.run_cmdlet("ExchangeOnline", cmdlet)
-
-        # Handle None, single result, or list
-        if mailboxes is None:
-            mailboxes = []
-        elif isinstance(mailboxes, dict):
-            mailboxes = [mailboxes]
+        total = 0
+        non_compliant = []
+        async for mailbox in client.stream_cmdlet(
+            "ExchangeOnline", cmdlet, select=MAILBOX_PROPERTIES
+        ):
+            total += 1
+            missing = missing_audit_actions(mailbox)
+            if missing:
+                non_compliant.append(
+                    {"UserPrincipalName": mailbox.get("UserPrincipalName"), "missing": missing}
+                )
 
         return {
-            "mailboxes": mailboxes,
-            "total_user_mailboxes": len(mailboxes),
+            "total_user_mailboxes": total,
+            "non_compliant_count": len(non_compliant),
+            "non_compliant_mailboxes": non_compliant,
         }
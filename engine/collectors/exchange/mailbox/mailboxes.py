@@ -14,6 +14,12 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Identifying properties only, enough to match the mailboxes to their Entra ID accounts
+MAILBOX_PROPERTIES = [
+    "Identity", "UserPrincipalName", "DisplayName", "PrimarySmtpAddress",
+    "RecipientTypeDetails", "ExternalDirectoryObjectId",
+]
+
 
 class MailboxesDataCollector(BasePowerShellCollector):
     """Collects mailbox information for CIS compliance evaluation.
@@ -34,6 +40,7 @@ class MailboxesDataCollector(BasePowerShellCollector):
         mailboxes = await client.run_cmdlet(
             "ExchangeOnline",
             "Get-EXOMailbox",
+            select=MAILBOX_PROPERTIES,
             RecipientTypeDetails="SharedMailbox",
             ResultSize="Unlimited",
         )
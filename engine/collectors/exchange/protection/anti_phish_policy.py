@@ -14,6 +14,17 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "Enabled", "PhishThresholdLevel",
+    "EnableTargetedUserProtection", "EnableOrganizationDomainsProtection",
+    "EnableMailboxIntelligence", "EnableMailboxIntelligenceProtection", "EnableSpoofIntelligence",
+    "TargetedUserProtectionAction", "TargetedDomainProtectionAction",
+    "MailboxIntelligenceProtectionAction", "EnableFirstContactSafetyTips",
+    "EnableSimilarUsersSafetyTips", "EnableSimilarDomainsSafetyTips",
+    "EnableUnusualCharactersSafetyTips", "HonorDmarcPolicy", "TargetedUsersToProtect",
+]
+
 
 class AntiPhishPolicyDataCollector(BasePowerShellCollector):
     """Collects anti-phishing policy for CIS compliance evaluation.
@@ -30,7 +41,9 @@ class AntiPhishPolicyDataCollector(BasePowerShellCollector):
             - anti_phish_policies: List of anti-phishing policies
             - default_policy: The default policy (Office365 AntiPhish Default)
         """
-        policies = await client.run_cmdlet("ExchangeOnline", "Get-AntiPhishPolicy")
+        policies = await client.run_cmdlet(
+            "ExchangeOnline", "Get-AntiPhishPolicy", select=POLICY_PROPERTIES
+        )
 
         # Handle None, single policy, or list
         if policies is None:
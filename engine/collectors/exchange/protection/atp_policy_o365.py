@@ -14,6 +14,11 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "EnableATPForSPOTeamsODB", "EnableSafeDocs", "AllowSafeDocsOpen",
+]
+
 
 class AtpPolicyO365DataCollector(BasePowerShellCollector):
     """Collects ATP policy for O365 for CIS compliance evaluation.
@@ -32,7 +37,9 @@ class AtpPolicyO365DataCollector(BasePowerShellCollector):
             - enable_safe_docs: Safe Documents status
             - allow_safe_docs_open: Allow Safe Docs open in Protected View
         """
-        policy = await client.run_cmdlet("ExchangeOnline", "Get-AtpPolicyForO365")
+        policy = await client.run_cmdlet(
+            "ExchangeOnline", "Get-AtpPolicyForO365", select=POLICY_PROPERTIES
+        )
 
         return {
             "atp_policy": policy,
@@ -14,6 +14,11 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "IPAllowList", "EnableSafeList",
+]
+
 
 class HostedConnectionFilterDataCollector(BasePowerShellCollector):
     """Collects connection filter policy for CIS compliance evaluation.
@@ -32,7 +37,7 @@ class HostedConnectionFilterDataCollector(BasePowerShellCollector):
             - enable_safe_list: Safe list status
         """
         policies = await client.run_cmdlet(
-            "ExchangeOnline", "Get-HostedConnectionFilterPolicy"
+            "ExchangeOnline", "Get-HostedConnectionFilterPolicy", select=POLICY_PROPERTIES
         )
 
         # Handle None, single policy, or list
@@ -14,6 +14,11 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "AllowedSenderDomains", "AllowedSenders",
+]
+
 
 class HostedContentFilterDataCollector(BasePowerShellCollector):
     """Collects content filter policy for CIS compliance evaluation.
@@ -32,7 +37,7 @@ class HostedContentFilterDataCollector(BasePowerShellCollector):
             - allowed_senders: Senders allowed to bypass filtering
         """
         policies = await client.run_cmdlet(
-            "ExchangeOnline", "Get-HostedContentFilterPolicy"
+            "ExchangeOnline", "Get-HostedContentFilterPolicy", select=POLICY_PROPERTIES
         )
 
         # Handle None, single policy, or list
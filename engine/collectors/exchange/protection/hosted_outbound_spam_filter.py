@@ -14,6 +14,14 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "AutoForwardingMode", "BccSuspiciousOutboundMail",
+    "BccSuspiciousOutboundAdditionalRecipients", "NotifyOutboundSpam",
+    "NotifyOutboundSpamRecipients", "RecipientLimitExternalPerHour",
+    "RecipientLimitInternalPerHour", "RecipientLimitPerDay", "ActionWhenThresholdReached",
+]
+
 
 class HostedOutboundSpamFilterDataCollector(BasePowerShellCollector):
     """Collects outbound spam filter policy for CIS compliance evaluation.
@@ -32,7 +40,7 @@ class HostedOutboundSpamFilterDataCollector(BasePowerShellCollector):
             - auto_forwarding_mode: Auto-forwarding configuration
         """
         policies = await client.run_cmdlet(
-            "ExchangeOnline", "Get-HostedOutboundSpamFilterPolicy"
+            "ExchangeOnline", "Get-HostedOutboundSpamFilterPolicy", select=POLICY_PROPERTIES
         )
 
         # Handle None, single policy, or list
@@ -14,6 +14,12 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "EnableFileFilter", "FileTypes", "ZapEnabled",
+    "EnableInternalSenderAdminNotifications", "InternalSenderAdminAddress",
+]
+
 
 class MalwareFilterPolicyDataCollector(BasePowerShellCollector):
     """Collects malware filter policy for CIS compliance evaluation.
@@ -31,7 +37,9 @@ class MalwareFilterPolicyDataCollector(BasePowerShellCollector):
             - default_policy: The default policy
             - enable_file_filter: Common attachment types filter status
         """
-        policies = await client.run_cmdlet("ExchangeOnline", "Get-MalwareFilterPolicy")
+        policies = await client.run_cmdlet(
+            "ExchangeOnline", "Get-MalwareFilterPolicy", select=POLICY_PROPERTIES
+        )
 
         # Handle None, single policy, or list
         if policies is None:
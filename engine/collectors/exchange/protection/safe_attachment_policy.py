@@ -14,6 +14,11 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "Enable", "Action", "Redirect", "QuarantineTag",
+]
+
 
 class SafeAttachmentPolicyDataCollector(BasePowerShellCollector):
     """Collects Safe Attachments policy for CIS compliance evaluation.
@@ -30,7 +35,9 @@ class SafeAttachmentPolicyDataCollector(BasePowerShellCollector):
             - safe_attachment_policies: List of Safe Attachment policies
             - policies_with_protection: Policies with protection enabled
         """
-        policies = await client.run_cmdlet("ExchangeOnline", "Get-SafeAttachmentPolicy")
+        policies = await client.run_cmdlet(
+            "ExchangeOnline", "Get-SafeAttachmentPolicy", select=POLICY_PROPERTIES
+        )
 
         # Handle None, single policy, or list
         if policies is None:
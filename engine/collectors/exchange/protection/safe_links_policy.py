@@ -14,6 +14,12 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "IsDefault", "EnableSafeLinksForEmail", "EnableSafeLinksForOffice",
+    "EnableSafeLinksForTeams", "ScanUrls", "TrackClicks",
+]
+
 
 class SafeLinksPolicyDataCollector(BasePowerShellCollector):
     """Collects Safe Links policy for CIS compliance evaluation.
@@ -30,7 +36,9 @@ class SafeLinksPolicyDataCollector(BasePowerShellCollector):
             - safe_links_policies: List of Safe Links policies
             - policies_with_protection: Policies with URL protection enabled
         """
-        policies = await client.run_cmdlet("ExchangeOnline", "Get-SafeLinksPolicy")
+        policies = await client.run_cmdlet(
+            "ExchangeOnline", "Get-SafeLinksPolicy", select=POLICY_PROPERTIES
+        )
 
         # Handle None, single policy, or list
         if policies is None:
@@ -14,6 +14,11 @@ from typing import Any
 from collectors.powershell_base import BasePowerShellCollector
 from collectors.powershell_client import PowerShellClient
 
+# Properties the CIS checks read; the rest of each policy object is not fetched
+POLICY_PROPERTIES = [
+    "Name", "Identity", "ZapEnabled", "MalwareScanEnabled",
+]
+
 
 class TeamsProtectionPolicyDataCollector(BasePowerShellCollector):
     """Collects Teams protection policy for CIS compliance evaluation.
@@ -30,7 +35,9 @@ class TeamsProtectionPolicyDataCollector(BasePowerShellCollector):
             - teams_protection_policy: The Teams protection policy
             - zap_enabled: Zero-hour auto purge status for Teams
         """
-        policy = await client.run_cmdlet("ExchangeOnline", "Get-TeamsProtectionPolicy")
+        policy = await client.run_cmdlet(
+            "ExchangeOnline", "Get-TeamsProtectionPolicy", select=POLICY_PROPERTIES
+        )
 
         return {
             "teams_protection_policy": policy,
@@ -34,7 +34,14 @@ class TransportRulesDataCollector(BasePowerShellCollector):
             - outbound_spam_filter_policies: List of outbound spam filter policies
             - auto_forwarding_blocked: Whether auto-forwarding is blocked in all policies
         """
-        rules = await client.run_cmdlet("ExchangeOnline", "Get-TransportRule")
+        # Both cmdlets run under one connection
+        rules, spam_policies = await client.run_cmdlets(
+            "ExchangeOnline",
+            [("Get-TransportRule", {}), ("Get-HostedOutboundSpamFilterPolicy", {})],
+        )
+        for result in (rules, spam_policies):
+            if isinstance(result, Exception):
+                raise result
 
         # Handle None, single rule, or list
         if rules is None:
@@ -76,11 +83,7 @@ class TransportRulesDataCollector(BasePowerShellCollector):
                     "set_scl": set_scl,
                 })
 
-        # Get outbound spam filter policies for auto-forwarding check (CIS 6.2.1)
-        spam_policies = await client.run_cmdlet(
-            "ExchangeOnline", "Get-HostedOutboundSpamFilterPolicy"
-        )
-
+        # Outbound spam filter policies for auto-forwarding check (CIS 6.2.1)
         # Handle None, single policy, or list
         if spam_policies is None:
             spam_policies = []
@@ -9,7 +9,8 @@ API Documentation: https://learn.microsoft.com/en-us/rest/api/fabric/admin
 from typing import Any
 
 import httpx
-from msal import ConfidentialClientApplication
+
+from collectors.token_cache import TokenCache, get_token_cache
 
 
 class FabricClient:
@@ -18,40 +19,31 @@ class FabricClient:
     FABRIC_BASE_URL = "https://api.fabric.microsoft.com/v1"
     FABRIC_SCOPE = "https://api.fabric.microsoft.com/.default"
 
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str):
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        token_cache: TokenCache | None = None,
+    ):
         """Initialize the Fabric API client.
 
         Args:
             tenant_id: Azure AD tenant ID
             client_id: App registration client ID
             client_secret: App registration client secret
+            token_cache: Token cache to use. Defaults to the process-wide cache.
         """
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
-        self._access_token: str | None = None
-
-        # Initialize MSAL client
-        self._msal_app = ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
-        )
+        self.token_cache = token_cache or get_token_cache()
 
     async def _get_access_token(self) -> str:
         """Get or refresh the Fabric API access token."""
-        if self._access_token:
-            return self._access_token
-
-        # Acquire token for Fabric API
-        result = self._msal_app.acquire_token_for_client(scopes=[self.FABRIC_SCOPE])
-
-        if "access_token" not in result:
-            error = result.get("error_description", result.get("error", "Unknown error"))
-            raise Exception(f"Failed to acquire Fabric token: {error}")
-
-        self._access_token = result["access_token"]
-        return self._access_token
+        return await self.token_cache.acquire_token(
+            self.tenant_id, self.client_id, self.client_secret, self.FABRIC_SCOPE
+        )
 
     async def _request(
         self,
@@ -0,0 +1,186 @@
+"""Scan-scoped read cache for Graph requests.
+
+Many collectors read the same Graph resources within one scan:
+/directoryRoles and its members are read by cloud_only_admins,
+admin_license_footprint, privileged_roles and e8_mfa_enforcement, and
+/domains by the DNS and password policy collectors. A GraphReadCache shared
+by every GraphClient of a scan fetches each distinct GET once:
+
+- Responses are memoized by method + path + query parameters.
+- Concurrent identical requests are coalesced into one (single-flight).
+- Failed requests are not cached; the next caller tries again.
+- Each cache keeps at most max_entries responses and max_bytes of response
+  JSON, least recently used evicted first. Paged collections streamed with
+  GraphClient.iter_pages() bypass the cache altogether, so they stay
+  flat in memory.
+
+Callers get their own deep copy of a cached response, so mutating it cannot
+affect other collectors.
+
+get_scan_cache() hands out one cache per scan in this process and keeps only
+the most recently used scans.
+"""
+
+import asyncio
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import httpx
+
+CacheKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+class GraphReadCache:
+    """Memoizing, single-flight, size-bounded cache of Graph GET responses."""
+
+    MAX_ENTRIES = 2000
+    MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of responses kept. Defaults to MAX_ENTRIES.
+            max_bytes: Maximum size of the kept responses as JSON. Defaults to
+                       MAX_BYTES; a larger single response is not cached.
+        """
+        self.max_entries = max_entries if max_entries is not None else self.MAX_ENTRIES
+        self.max_bytes = max_bytes if max_bytes is not None else self.MAX_BYTES
+        # Response and its JSON size, least recently used first
+        self._values: OrderedDict[CacheKey, tuple[Any, int]] = OrderedDict()
+        self._inflight: dict[CacheKey, asyncio.Future] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(method: str, url: str, params: dict | None = None) -> CacheKey:
+        """Build a cache key from a request.
+
+        Query parameters from the URL and from params are merged and sorted, so
+        "/users?$select=id" and ("/users", {"$select": "id"}) share an entry.
+        """
+        parsed = httpx.URL(url, params=params) if params else httpx.URL(url)
+        query = tuple(sorted(parsed.params.multi_items()))
+        return (method.upper(), f"{parsed.host}{parsed.path}", query)
+
+    def get(self, key: CacheKey) -> Any | None:
+        """Return a copy of a cached response (counting a hit), or None."""
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        self._values.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[0])
+
+    def put(self, key: CacheKey, value: Any) -> None:
+        """Store a response fetched outside get_or_fetch (e.g. via $batch)."""
+        self.misses += 1
+        self._store(key, copy.deepcopy(value))
+
+    def _store(self, key: CacheKey, value: Any) -> None:
+        """Keep a response, evicting the least recently used beyond the limits."""
+        size = len(json.dumps(value, default=str))
+        previous = self._values.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous[1]
+        if size > self.max_bytes:
+            return
+        self._values[key] = (value, size)
+        self.bytes += size
+        while len(self._values) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted_size) = self._values.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evicted += 1
+
+    async def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached response for key, fetching it at most once.
+
+        Args:
+            key: Cache key from GraphReadCache.key()
+            fetch: Coroutine function that performs the request on a miss
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if key in self._values:
+                return self.get(key)
+
+            inflight = self._inflight.get(key)
+            # Futures are bound to a loop; requests on another loop fetch for themselves
+            if inflight is None or inflight.get_loop() is not loop:
+                break
+            self.coalesced += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(inflight))
+            except asyncio.CancelledError:
+                # Only the fetching request was cancelled, not this one: fetch again
+                if not inflight.cancelled():
+                    raise
+
+        self.misses += 1
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved in case nobody was waiting on it
+            future.exception()
+            raise
+        else:
+            self._store(key, value)
+            future.set_result(value)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+        return copy.deepcopy(value)
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counts: hits were served from memory, coalesced waited on
+        an identical in-flight request, misses went to Graph. entries and bytes
+        are what is held now; evicted were dropped to stay within the limits."""
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "entries": len(self._values),
+            "bytes": self.bytes,
+            "evicted": self.evicted,
+        }
+
+
+# Scans whose caches are kept in this process, most recently used last
+MAX_CACHED_SCANS = 8
+SCAN_CACHE_TTL = 3600.0
+
+_scan_caches: "OrderedDict[int, tuple[GraphReadCache, float]]" = OrderedDict()
+_scan_caches_lock = threading.Lock()
+
+
+def get_scan_cache(scan_id: int) -> GraphReadCache:
+    """Get the read cache for a scan, creating it on first use.
+
+    Only the MAX_CACHED_SCANS most recently used scans keep their cache, and
+    none is kept longer than SCAN_CACHE_TTL after it was created.
+    """
+    now = time.monotonic()
+    with _scan_caches_lock:
+        entry = _scan_caches.get(scan_id)
+        if entry is None or now - entry[1] > SCAN_CACHE_TTL:
+            entry = (GraphReadCache(), now)
+        _scan_caches[scan_id] = entry
+        _scan_caches.move_to_end(scan_id)
+        while len(_scan_caches) > MAX_CACHED_SCANS:
+            _scan_caches.popitem(last=False)
+        return entry[0]
@@ -1,47 +1,226 @@
 """Microsoft Graph API client."""
 
+import asyncio
+import logging
+import random
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any
+from urllib.parse import urlencode
 
 import httpx
-from msal import ConfidentialClientApplication
+
+from collectors.concurrency import gather_bounded
+from collectors.graph_cache import GraphReadCache
+from collectors.graph_throttle import GraphThrottle
+from collectors.token_cache import TokenCache, get_token_cache
+
+logger = logging.getLogger(__name__)
+
+
+class GraphBatchError(Exception):
+    """Raised when a sub-request of a $batch call fails."""
+
+    def __init__(self, url: str, status: int, body: Any):
+        error = body.get("error", {}) if isinstance(body, dict) else {}
+        message = error.get("message", body)
+        super().__init__(f"Graph batch request {url} failed with {status}: {message}")
+        self.url = url
+        self.status = status
+        self.body = body
+
+
+class GraphPages:
+    """Async iterator over the pages of a Graph collection.
+
+    Iterating yields each page's "value" list; items() yields the items one by
+    one. With prefetch on, the next page is requested while the caller
+    processes the current one, so at most two pages are held in memory.
+
+    If max_pages stops the iteration before the last page, truncated is set
+    (and next_link holds where the collection continues) instead of the
+    remaining items being dropped silently.
+
+    Pages bypass the client's read cache unless cache is set, so a streamed
+    collection is never held in memory in full.
+    """
+
+    def __init__(
+        self,
+        client: "GraphClient",
+        endpoint: str,
+        beta: bool = False,
+        params: dict | None = None,
+        max_pages: int | None = None,
+        prefetch: bool = True,
+        cache: bool = False,
+    ):
+        self._client = client
+        self.endpoint = endpoint
+        self.beta = beta
+        self.params = params
+        self.max_pages = max_pages
+        self.prefetch = prefetch
+        self.cache = cache
+        self.pages = 0
+        self.truncated = False
+        self.next_link: str | None = None
+
+    async def __aiter__(self) -> AsyncIterator[list[dict[str, Any]]]:
+        fetch: asyncio.Future | None = asyncio.ensure_future(
+            self._client.get(self.endpoint, beta=self.beta, params=self.params, cache=self.cache)
+        )
+        try:
+            while fetch is not None:
+                response = await fetch
+                fetch = None
+                self.pages += 1
+
+                next_endpoint = None
+                next_link = response.get("@odata.nextLink")
+                if next_link:
+                    if self.max_pages is not None and self.pages >= self.max_pages:
+                        self.truncated = True
+                        self.next_link = next_link
+                        logger.warning(
+                            "Stopped paging %s after %d pages; more results remain at %s",
+                            self.endpoint,
+                            self.pages,
+                            next_link,
+                        )
+                    else:
+                        # Params are in the next link URL
+                        next_endpoint = self._client._relative_url(next_link, self.beta)
+                        if self.prefetch:
+                            fetch = asyncio.ensure_future(
+                                self._client.get(next_endpoint, beta=self.beta, cache=self.cache)
+                            )
+
+                yield response.get("value", [])
+
+                if next_endpoint is not None and fetch is None:
+                    fetch = asyncio.ensure_future(
+                        self._client.get(next_endpoint, beta=self.beta, cache=self.cache)
+                    )
+        finally:
+            if fetch is not None and not fetch.done():
+                fetch.cancel()
+
+    async def items(self) -> AsyncIterator[dict[str, Any]]:
+        """Yield every item across all pages."""
+        async for page in self:
+            for item in page:
+                yield item
 
 
 class GraphClient:
-    """Client for Microsoft Graph API."""
+    """Client for Microsoft Graph API.
+
+    Requests go through one pooled HTTP/2 connection that is kept alive for the
+    lifetime of the client. Use it as an async context manager so the pool is
+    closed cleanly:
+
+        async with GraphClient(tenant_id, client_id, client_secret) as client:
+            users = await client.get_users()
+
+    A caller that manages its own pool (e.g. one per worker process) can pass
+    it in as http_client; the GraphClient then leaves closing it to the caller.
+
+    GET responses can be shared through a GraphReadCache (one per scan in the
+    worker), so each distinct resource is fetched once however many collectors
+    read it.
+
+    Throttled responses (429/503/504) are retried inside the client after the
+    Retry-After delay. Every request goes through a per-tenant GraphThrottle,
+    which pauses and narrows concurrency for all clients of the tenant - across
+    worker processes when the throttle is backed by Redis.
+    """
 
     GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
     GRAPH_BETA_URL = "https://graph.microsoft.com/beta"
+    GRAPH_SCOPE = "https://graph.microsoft.com/.default"
 
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str):
+    REQUEST_TIMEOUT = 60.0
+    MAX_CONNECTIONS = 20
+    MAX_KEEPALIVE_CONNECTIONS = 10
+    KEEPALIVE_EXPIRY = 30.0
+
+    MAX_RETRIES = 5
+    RETRYABLE_STATUS_CODES = frozenset({429, 503, 504})
+    MAX_RETRY_AFTER = 300.0
+    # Graph accepts at most 20 sub-requests per $batch call
+    BATCH_SIZE = 20
+    # $batch calls (and follow-up page fetches) a single batch() keeps in flight
+    BATCH_CONCURRENCY = 4
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        http_client: httpx.AsyncClient | None = None,
+        throttle: GraphThrottle | None = None,
+        token_cache: TokenCache | None = None,
+        cache: GraphReadCache | None = None,
+    ):
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
         self._access_token: str | None = None
+        self._http_client = http_client
+        self._owns_http_client = http_client is None
+        self.throttle = throttle or GraphThrottle(tenant_id)
+        self.token_cache = token_cache or get_token_cache()
+        self.cache = cache
 
-        # Initialize MSAL client
-        self._msal_app = ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
+    @classmethod
+    def create_http_client(cls) -> httpx.AsyncClient:
+        """Create a pooled HTTP/2 client suitable for Graph traffic."""
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=cls.REQUEST_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=cls.MAX_CONNECTIONS,
+                max_keepalive_connections=cls.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=cls.KEEPALIVE_EXPIRY,
+            ),
         )
 
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use."""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self.create_http_client()
+            self._owns_http_client = True
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close the connection pool if this client created it."""
+        if self._owns_http_client and self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+    async def __aenter__(self) -> "GraphClient":
+        self._get_http_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
     async def _get_access_token(self) -> str:
-        """Get or refresh the access token."""
+        """Get the Graph access token.
+
+        Tokens come from the shared token cache, so clients of the same tenant
+        and app reuse one token until it nears expiry. A token set directly on
+        _access_token takes precedence (used by scripts and tests).
+        """
         if self._access_token:
             return self._access_token
 
-        # Acquire token for Graph API
-        result = self._msal_app.acquire_token_for_client(
-            scopes=["https://graph.microsoft.com/.default"]
+        return await self.token_cache.acquire_token(
+            self.tenant_id, self.client_id, self.client_secret, self.GRAPH_SCOPE
         )
 
-        if "access_token" not in result:
-            error = result.get("error_description", result.get("error", "Unknown error"))
-            raise Exception(f"Failed to acquire token: {error}")
-
-        self._access_token = result["access_token"]
-        return self._access_token
-
     async def _request(
         self,
         method: str,
@@ -49,28 +228,83 @@ class GraphClient:
         beta: bool = False,
         params: dict | None = None,
         json_data: dict | None = None,
+        cache: bool = True,
     ) -> dict[str, Any]:
-        """Make a request to the Graph API."""
-        token = await self._get_access_token()
+        """Make a request to the Graph API, retrying throttled responses.
+
+        GETs are served from the read cache when the client has one, unless
+        cache is False.
+        """
         base_url = self.GRAPH_BETA_URL if beta else self.GRAPH_BASE_URL
+        url = f"{base_url}{endpoint}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=f"{base_url}{endpoint}",
-                headers={"Authorization": f"Bearer {token}"},
-                params=params,
-                json=json_data,
-                timeout=60.0,
+        if method == "GET" and cache and self.cache is not None:
+            return await self.cache.get_or_fetch(
+                GraphReadCache.key(method, url, params),
+                lambda: self._send(method, url, params, json_data),
             )
+        return await self._send(method, url, params, json_data)
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        params: dict | None = None,
+        json_data: dict | None = None,
+    ) -> dict[str, Any]:
+        """Send a request, retrying throttled responses after their Retry-After."""
+        token = await self._get_access_token()
+
+        attempt = 0
+        while True:
+            async with self.throttle.slot():
+                response = await self._get_http_client().request(
+                    method=method,
+                    url=url,
+                    headers={"Authorization": f"Bearer {token}"},
+                    params=params,
+                    json=json_data,
+                )
+
+            if response.status_code in self.RETRYABLE_STATUS_CODES and attempt < self.MAX_RETRIES:
+                # The next slot() waits out the pause for every client of the tenant
+                await self.throttle.on_throttled(self._retry_delay(response, attempt))
+                attempt += 1
+                continue
+
             response.raise_for_status()
+            await self.throttle.on_success()
             return response.json() if response.content else {}
 
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying a throttled response.
+
+        Uses Retry-After (delta-seconds or HTTP-date) when Graph sends it, and
+        jittered exponential backoff otherwise.
+        """
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.MAX_RETRY_AFTER)
+        return min(2.0**attempt, 30.0) + random.uniform(0, 1)
+
     async def get(
-        self, endpoint: str, beta: bool = False, params: dict | None = None
+        self,
+        endpoint: str,
+        beta: bool = False,
+        params: dict | None = None,
+        cache: bool = True,
     ) -> dict[str, Any]:
-        """GET request to Graph API."""
-        return await self._request("GET", endpoint, beta=beta, params=params)
+        """GET request to Graph API; cache=False bypasses the read cache."""
+        return await self._request("GET", endpoint, beta=beta, params=params, cache=cache)
 
     async def get_all_pages(
         self,
@@ -79,27 +313,240 @@ class GraphClient:
         params: dict | None = None,
         max_pages: int = 100,
     ) -> list[dict[str, Any]]:
-        """Get all pages of a paginated endpoint."""
+        """Get all pages of a paginated endpoint.
+
+        Collections longer than max_pages are cut off with a logged warning;
+        use iter_pages() to stream large collections or to check truncated.
+        Pages go through the read cache, since the whole collection is held
+        anyway and small ones (/directoryRoles, /domains) are read by several
+        collectors.
+        """
         all_items: list[dict[str, Any]] = []
-        current_endpoint = endpoint
-        current_params = params
+        pages = GraphPages(
+            self, endpoint, beta=beta, params=params, max_pages=max_pages, cache=True
+        )
+        async for page in pages:
+            all_items.extend(page)
+        return all_items
 
-        for _ in range(max_pages):
-            response = await self.get(current_endpoint, beta=beta, params=current_params)
-            items = response.get("value", [])
-            all_items.extend(items)
+    def iter_pages(
+        self,
+        endpoint: str,
+        beta: bool = False,
+        params: dict | None = None,
+        max_pages: int | None = None,
+        prefetch: bool = True,
+    ) -> GraphPages:
+        """Iterate over the pages of a paginated endpoint without collecting them.
 
-            # Check for next page
-            next_link = response.get("@odata.nextLink")
-            if not next_link:
-                break
+        Pages bypass the read cache so memory stays flat however long the
+        collection is.
 
-            # Parse next link - it's a full URL
-            base_url = self.GRAPH_BETA_URL if beta else self.GRAPH_BASE_URL
-            current_endpoint = next_link.replace(base_url, "")
-            current_params = None  # Params are in the URL
+            pages = client.iter_pages("/users")
+            async for page in pages:
+                ...
+            if pages.truncated:
+                ...
 
-        return all_items
+        Args:
+            endpoint: Endpoint path, e.g. "/users"
+            beta: Use the beta endpoint
+            params: Query parameters for the first page
+            max_pages: Optional page cap; see GraphPages.truncated
+            prefetch: Request the next page while the current one is processed
+        """
+        return GraphPages(
+            self, endpoint, beta=beta, params=params, max_pages=max_pages, prefetch=prefetch
+        )
+
+    def iter_items(
+        self,
+        endpoint: str,
+        beta: bool = False,
+        params: dict | None = None,
+        prefetch: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over every item of a paginated endpoint, page by page."""
+        return self.iter_pages(endpoint, beta=beta, params=params, prefetch=prefetch).items()
+
+    def _relative_url(self, next_link: str, beta: bool = False) -> str:
+        """Turn an @odata.nextLink (a full URL) into an endpoint path."""
+        base_url = self.GRAPH_BETA_URL if beta else self.GRAPH_BASE_URL
+        return next_link.replace(base_url, "")
+
+    async def batch(
+        self, requests: list[dict[str, Any]], beta: bool = False
+    ) -> list[dict[str, Any]]:
+        """Send requests through the JSON $batch endpoint.
+
+        Requests are sent BATCH_SIZE per call, BATCH_CONCURRENCY calls at a
+        time. Sub-requests that come back
+        throttled (429/503/504) are re-sent in a later batch after their
+        Retry-After, up to MAX_RETRIES times; everything else is returned as is.
+
+        Args:
+            requests: Sub-requests, each {"method": "GET", "url": "/users/{id}"} plus
+                      optional "body" and "headers". URLs are relative to the
+                      version root and may include a query string.
+            beta: Send the batch to the beta endpoint
+
+        Returns:
+            One {"status": int, "headers": dict, "body": Any} per request, in order.
+
+        Raises:
+            GraphBatchError: If a $batch reply has no response for a sub-request.
+        """
+        responses: list[dict[str, Any] | None] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        attempt = 0
+
+        async def send_chunk(chunk: list[int]) -> dict[str, Any]:
+            return await self._request(
+                "POST",
+                "/$batch",
+                beta=beta,
+                json_data={
+                    "requests": [{"id": str(index), **requests[index]} for index in chunk]
+                },
+            )
+
+        while pending:
+            throttled: list[int] = []
+            retry_after = 0.0
+            chunks = [
+                pending[start : start + self.BATCH_SIZE]
+                for start in range(0, len(pending), self.BATCH_SIZE)
+            ]
+            bodies = await gather_bounded(send_chunk, chunks, limit=self.BATCH_CONCURRENCY)
+            for body in bodies:
+                for item in body.get("responses", []):
+                    index = int(item["id"])
+                    status = int(item.get("status", 0))
+                    headers = item.get("headers") or {}
+                    if status in self.RETRYABLE_STATUS_CODES and attempt < self.MAX_RETRIES:
+                        throttled.append(index)
+                        retry_after = max(
+                            retry_after,
+                            self._retry_delay(httpx.Response(status, headers=headers), attempt),
+                        )
+                        continue
+                    responses[index] = {
+                        "status": status,
+                        "headers": headers,
+                        "body": item.get("body"),
+                    }
+
+            if throttled:
+                await self.throttle.on_throttled(retry_after)
+            pending = sorted(throttled)
+            attempt += 1
+
+        results: list[dict[str, Any]] = []
+        for index, response in enumerate(responses):
+            if response is None:
+                raise GraphBatchError(
+                    requests[index]["url"], 0, {"error": {"message": "missing from $batch reply"}}
+                )
+            results.append(response)
+        return results
+
+    async def _batch_get(
+        self,
+        urls: list[str],
+        beta: bool = False,
+        follow_pages: bool = False,
+    ) -> list[Any]:
+        """GET several URLs through $batch and return their bodies in order.
+
+        Args:
+            urls: Request URLs relative to the version root
+            beta: Use the beta endpoint
+            follow_pages: Treat responses as collections: return their "value"
+                          lists, following @odata.nextLink for any that have more pages
+
+        Raises:
+            GraphBatchError: If a sub-request fails.
+        """
+        base_url = self.GRAPH_BETA_URL if beta else self.GRAPH_BASE_URL
+        keys = [GraphReadCache.key("GET", f"{base_url}{url}") for url in urls]
+
+        # Only request what the read cache doesn't already hold
+        cached = [self.cache.get(key) if self.cache is not None else None for key in keys]
+        missing = [i for i, body in enumerate(cached) if body is None]
+        responses = await self.batch(
+            [{"method": "GET", "url": urls[i]} for i in missing], beta=beta
+        )
+        for i, response in zip(missing, responses):
+            if not 200 <= response["status"] < 300:
+                raise GraphBatchError(urls[i], response["status"], response["body"])
+            cached[i] = response["body"] or {}
+            if self.cache is not None:
+                self.cache.put(keys[i], cached[i])
+
+        if not follow_pages:
+            return cached
+
+        async def all_items(body: dict[str, Any]) -> list[dict[str, Any]]:
+            items = list(body.get("value", []))
+            next_link = body.get("@odata.nextLink")
+            if next_link:
+                items.extend(
+                    await self.get_all_pages(self._relative_url(next_link, beta), beta=beta)
+                )
+            return items
+
+        return await gather_bounded(all_items, cached, limit=self.BATCH_CONCURRENCY)
+
+    @staticmethod
+    def _with_query(path: str, params: dict[str, str] | None) -> str:
+        """Append query parameters to a batch sub-request URL."""
+        if not params:
+            return path
+        return f"{path}?{urlencode(params, safe='$,')}"
+
+    async def get_users_by_ids(
+        self, user_ids: list[str], select: str | None = None
+    ) -> dict[str, dict[str, Any]]:
+        """Get several users by ID in $batch round trips.
+
+        Args:
+            user_ids: User object IDs
+            select: Optional $select, e.g. "id,userPrincipalName,displayName"
+
+        Returns:
+            Dict of user ID to user object.
+        """
+        params = {"$select": select} if select else None
+        users = await self._batch_get(
+            [self._with_query(f"/users/{user_id}", params) for user_id in user_ids]
+        )
+        return dict(zip(user_ids, users))
+
+    async def get_users_license_details(
+        self, user_ids: list[str]
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Get license details for several users in $batch round trips.
+
+        Returns:
+            Dict of user ID to that user's licenseDetails list.
+        """
+        params = {"$select": "id,skuId,skuPartNumber,servicePlans"}
+        details = await self._batch_get(
+            [self._with_query(f"/users/{user_id}/licenseDetails", params) for user_id in user_ids],
+            follow_pages=True,
+        )
+        return dict(zip(user_ids, details))
+
+    async def get_roles_members(self, role_ids: list[str]) -> dict[str, list[dict[str, Any]]]:
+        """Get the members of several directory roles in $batch round trips.
+
+        Returns:
+            Dict of role ID to member list.
+        """
+        members = await self._batch_get(
+            [f"/directoryRoles/{role_id}/members" for role_id in role_ids], follow_pages=True
+        )
+        return dict(zip(role_ids, members))
 
     async def get_users(self) -> list[dict[str, Any]]:
         """Get all users."""
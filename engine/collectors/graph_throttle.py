@@ -0,0 +1,267 @@
+"""Per-tenant throttling governor for Microsoft Graph requests.
+
+Graph throttles per tenant (and per app), not per worker process, so every
+worker scanning a tenant has to back off together. GraphThrottle keeps the
+tenant's state in Redis (the Celery broker) when given a URL, or in this
+process otherwise:
+
+- A concurrency limit adjusted AIMD-style: each successful request raises it
+  by 1/limit (about +1 per round of requests), and a throttled response halves
+  it (at most once per DECREASE_COOLDOWN, so a burst of 429s from one
+  overloaded moment counts once).
+- In-flight slots. A request needs a free slot under the limit. In Redis each
+  slot is a lease (a sorted set of holder id to expiry) so slots leaked by a
+  worker that died mid-request expire on their own.
+- A pause deadline set from Retry-After. Nobody sends requests to the tenant
+  until it passes.
+
+Taking a slot checks the pause and the limit in one Redis round trip. Redis
+clients are shared by every governor on an event loop.
+
+If Redis is unreachable the governor falls back to process-local state rather
+than failing the scan.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+import weakref
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# Returns 0 once the slot is taken, otherwise milliseconds to wait before trying again
+# KEYS: leases, limit, paused_until
+# ARGV: now_ms, holder, lease_ms, initial_limit, state_ttl_ms, poll_ms
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local paused_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if paused_until > now then
+    return paused_until - now
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[2]) or ARGV[4])
+if redis.call('ZCARD', KEYS[1]) < math.floor(limit) then
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+    redis.call('PEXPIRE', KEYS[1], ARGV[5])
+    return 0
+end
+return tonumber(ARGV[6])
+"""
+
+# KEYS: leases   ARGV: holder
+_RELEASE_SCRIPT = """
+return redis.call('ZREM', KEYS[1], ARGV[1])
+"""
+
+# KEYS: limit   ARGV: initial_limit, max_limit, state_ttl_ms
+_SUCCESS_SCRIPT = """
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+limit = math.min(tonumber(ARGV[2]), limit + 1 / limit)
+redis.call('SET', KEYS[1], tostring(limit), 'PX', ARGV[3])
+return 0
+"""
+
+# KEYS: limit, paused_until, decreased
+# ARGV: now_ms, retry_after_ms, cooldown_ms, initial_limit, min_limit, factor, state_ttl_ms
+_THROTTLED_SCRIPT = """
+local until_ms = tonumber(ARGV[1]) + tonumber(ARGV[2])
+if until_ms > tonumber(redis.call('GET', KEYS[2]) or '0') then
+    redis.call('SET', KEYS[2], tostring(until_ms), 'PX', math.max(1, tonumber(ARGV[2])))
+end
+if redis.call('SET', KEYS[3], '1', 'NX', 'PX', ARGV[3]) then
+    local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[4])
+    limit = math.max(tonumber(ARGV[5]), limit * tonumber(ARGV[6]))
+    redis.call('SET', KEYS[1], tostring(limit), 'PX', ARGV[7])
+end
+return 0
+"""
+
+
+@dataclass
+class _TenantState:
+    """Process-local governor state for one tenant."""
+
+    limit: float
+    inflight: int = 0
+    paused_until: float = 0.0
+    last_decrease: float = 0.0
+
+
+_local_states: dict[str, _TenantState] = {}
+_local_lock = threading.Lock()
+
+# redis.asyncio clients are bound to the loop they were created on, so each loop
+# gets its own client per Redis URL, shared by every governor on that loop
+_redis_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+async def aclose_redis() -> None:
+    """Close the running event loop's Redis clients."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    clients = _redis_clients.pop(loop, {})
+    for client in clients.values():
+        await client.aclose()
+
+
+class GraphThrottle:
+    """AIMD concurrency governor and Retry-After pause for one tenant."""
+
+    INITIAL_LIMIT = 16.0
+    MIN_LIMIT = 1.0
+    MAX_LIMIT = 64.0
+    DECREASE_FACTOR = 0.5
+    DECREASE_COOLDOWN = 2.0
+    # Redis keys expire after this long without traffic
+    STATE_TTL = 600.0
+    # A Redis slot not released within this long (e.g. its worker died
+    # mid-request) is freed; longer than any Graph request takes
+    SLOT_LEASE = 180.0
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, tenant_id: str, redis_url: str | None = None):
+        """Initialize the governor.
+
+        Args:
+            tenant_id: Tenant whose Graph traffic this governs
+            redis_url: Redis URL for state shared across worker processes.
+                       Without it the state is shared only within this process.
+        """
+        self.tenant_id = tenant_id
+        self.redis_url = redis_url
+        self._key_prefix = f"autoaudit:graph-throttle:{tenant_id}"
+
+    def _key(self, name: str) -> str:
+        return f"{self._key_prefix}:{name}"
+
+    def _get_redis(self):
+        """Get the running loop's Redis client, or None when running with local state only."""
+        if self.redis_url is None:
+            return None
+        clients = _redis_clients.setdefault(asyncio.get_running_loop(), {})
+        client = clients.get(self.redis_url)
+        if client is None:
+            import redis.asyncio as redis
+
+            client = clients[self.redis_url] = redis.from_url(self.redis_url)
+        return client
+
+    async def _run_script(self, script: str, keys: list[str], args: list) -> int | None:
+        """Run a governor script in Redis.
+
+        Returns:
+            The script's return value, or None if Redis is not in use or failed
+            (the caller then uses local state).
+        """
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            return await client.eval(script, len(keys), *keys, *args)
+        except Exception as e:
+            logger.warning("Graph throttle state unavailable in Redis, using local state: %s", e)
+            return None
+
+    def _local_state(self) -> _TenantState:
+        state = _local_states.get(self.tenant_id)
+        if state is None:
+            state = _local_states[self.tenant_id] = _TenantState(limit=self.INITIAL_LIMIT)
+        return state
+
+    async def _try_acquire(self, holder: str) -> tuple[bool, float]:
+        """Take a slot unless the tenant is paused or at its limit.
+
+        Returns:
+            Whether the slot was taken by Redis (False means locally), and the
+            seconds to wait before trying again (0 once the slot is taken).
+        """
+        wait_ms = await self._run_script(
+            _ACQUIRE_SCRIPT,
+            [self._key("leases"), self._key("limit"), self._key("paused_until")],
+            [
+                int(time.time() * 1000),
+                holder,
+                int(self.SLOT_LEASE * 1000),
+                self.INITIAL_LIMIT,
+                int(self.STATE_TTL * 1000),
+                int(self.POLL_INTERVAL * 1000),
+            ],
+        )
+        if wait_ms is not None:
+            return True, wait_ms / 1000
+        with _local_lock:
+            state = self._local_state()
+            paused_for = state.paused_until - time.time()
+            if paused_for > 0:
+                return False, paused_for
+            if state.inflight < int(state.limit):
+                state.inflight += 1
+                return False, 0.0
+            return False, self.POLL_INTERVAL
+
+    async def _release(self, holder: str, in_redis: bool) -> None:
+        if in_redis:
+            # If Redis is unreachable now the lease expires on its own
+            await self._run_script(_RELEASE_SCRIPT, [self._key("leases")], [holder])
+            return
+        with _local_lock:
+            state = self._local_state()
+            state.inflight = max(0, state.inflight - 1)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Wait out any pause, then hold one of the tenant's request slots."""
+        holder = uuid.uuid4().hex
+        while True:
+            in_redis, wait = await self._try_acquire(holder)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        try:
+            yield
+        finally:
+            await self._release(holder, in_redis)
+
+    async def on_success(self) -> None:
+        """Additive increase: grow the limit by 1/limit."""
+        updated = await self._run_script(
+            _SUCCESS_SCRIPT,
+            [self._key("limit")],
+            [self.INITIAL_LIMIT, self.MAX_LIMIT, int(self.STATE_TTL * 1000)],
+        )
+        if updated is None:
+            with _local_lock:
+                state = self._local_state()
+                state.limit = min(self.MAX_LIMIT, state.limit + 1 / state.limit)
+
+    async def on_throttled(self, retry_after: float) -> None:
+        """Multiplicative decrease, and pause the tenant for retry_after seconds."""
+        now = time.time()
+        updated = await self._run_script(
+            _THROTTLED_SCRIPT,
+            [self._key("limit"), self._key("paused_until"), self._key("decreased")],
+            [
+                int(now * 1000),
+                int(retry_after * 1000),
+                int(self.DECREASE_COOLDOWN * 1000),
+                self.INITIAL_LIMIT,
+                self.MIN_LIMIT,
+                self.DECREASE_FACTOR,
+                int(self.STATE_TTL * 1000),
+            ],
+        )
+        if updated is None:
+            with _local_lock:
+                state = self._local_state()
+                state.paused_until = max(state.paused_until, now + retry_after)
+                if now - state.last_decrease >= self.DECREASE_COOLDOWN:
+                    state.limit = max(self.MIN_LIMIT, state.limit * self.DECREASE_FACTOR)
+                    state.last_decrease = now
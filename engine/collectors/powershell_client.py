@@ -12,23 +12,41 @@ Supported modules:
 - MicrosoftTeams (via -AccessTokens)
 
 Authentication Flow:
-1. Use MSAL ConfidentialClientApplication with client_id + client_secret
-2. Acquire token for the appropriate scope
+1. Get a token for the appropriate scope from the shared MSAL token cache
+   (client_id + client_secret; see collectors/token_cache.py)
+2. Reuse it across cmdlets, controls and scans until it nears expiry
 3. Pass token to Docker container (via env var) or HTTP service (via request body)
 4. Container/service runs PowerShell cmdlet and returns JSON
 """
 
+import asyncio
 import json
+import os
+import random
+import re
 import subprocess
+import weakref
+from collections.abc import AsyncIterator
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import httpx
-from msal import ConfidentialClientApplication
 
+from collectors.powershell_container import (
+    DockerError,
+    ensure_docker_image,
+    env_flags,
+    get_container,
+)
+from collectors.service_router import ServiceRouter, get_service_router
+from collectors.token_cache import TokenCache, get_token_cache
 from worker.validators import validate_tenant_id
 
 
+# Property names accepted for Select-Object projection
+_PROPERTY_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
 class PowerShellExecutionError(Exception):
     """Raised when PowerShell execution fails."""
 
@@ -41,16 +59,26 @@ class PowerShellClient:
     # Service-specific scopes for token acquisition
     EXCHANGE_SCOPE = "https://outlook.office365.com/.default"
     TEAMS_SCOPE = "https://api.interfaces.records.teams.microsoft.com/.default"
+    GRAPH_SCOPE = "https://graph.microsoft.com/.default"
     COMPLIANCE_SCOPE = "https://ps.compliance.protection.outlook.com/.default"
 
     DOCKER_IMAGE = "autoaudit-powershell"
 
+    # Retries of requests the PowerShell service rejected as over capacity (429)
+    SERVICE_MAX_RETRIES = 5
+    SERVICE_MAX_RETRY_AFTER = 60.0
+
     def __init__(
         self,
         tenant_id: str,
         client_id: str,
         client_secret: str,
         service_url: str | None = None,
+        token_cache: TokenCache | None = None,
+        bypass_result_cache: bool = False,
+        service_discovery: bool = False,
+        service_router: ServiceRouter | None = None,
+        docker_mode: Literal["container", "per_cmdlet"] = "container",
     ):
         """Initialize PowerShell client.
 
@@ -60,61 +88,69 @@ class PowerShellClient:
             client_secret: Client secret for authentication
             service_url: Optional URL of PowerShell HTTP service (e.g., http://powershell-service:8001).
                          If provided, uses HTTP instead of spawning Docker containers.
+                         A comma-separated list names several replicas; each tenant
+                         is routed to the same one (see collectors/service_router.py).
+            token_cache: Token cache to use. Defaults to the process-wide cache.
+            bypass_result_cache: Ask the PowerShell service for fresh results instead
+                                 of ones it cached for tenant-wide configuration cmdlets.
+            service_discovery: Route across every address the service host names resolve to.
+            service_router: Router to use. Defaults to the process-wide one for service_url.
+            docker_mode: Without service_url, run cmdlets in this process's long-lived
+                         container ("container", see collectors/powershell_container.py)
+                         or in a new container each ("per_cmdlet").
         """
         self.tenant_id = validate_tenant_id(tenant_id)
         self.client_id = client_id
         self.client_secret = client_secret
         self.service_url = service_url
-        self._msal_app = ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{self.tenant_id}",
-        )
-        self._image_checked = False
-
-    def _ensure_docker_image(self) -> None:
-        """Build Docker image if it doesn't exist."""
-        if self._image_checked:
+        self.token_cache = token_cache or get_token_cache()
+        self.bypass_result_cache = bypass_result_cache
+        if service_router is None and service_url:
+            service_router = get_service_router(service_url, discover=service_discovery)
+        self.service_router = service_router
+        self.docker_mode = docker_mode
+        # httpx clients are bound to the loop they were first used on, so each loop
+        # gets its own pool; it goes away with the loop if nobody closes it
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """The service connection pool of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = httpx.AsyncClient()
+        return client
+
+    async def aclose(self) -> None:
+        """Close the running event loop's service connection pool."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
             return
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
 
-        # Check if Docker is available
+    async def __aenter__(self) -> "PowerShellClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    def _ensure_docker_image(self) -> None:
+        """Build Docker image if it doesn't exist (checked once per process)."""
         try:
-            subprocess.run(
-                ["docker", "--version"],
-                capture_output=True,
-                check=True,
+            ensure_docker_image(
+                self.DOCKER_IMAGE, Path(__file__).parent.parent / "docker" / "powershell"
             )
-        except FileNotFoundError:
-            raise PowerShellExecutionError(
-                "Docker is not installed or not in PATH.\n"
-                "Install Docker from: https://docs.docker.com/get-docker/"
-            )
-        except subprocess.CalledProcessError as e:
-            raise PowerShellExecutionError(f"Docker check failed: {e.stderr}")
-
-        # Check if image exists
-        result = subprocess.run(
-            ["docker", "images", "-q", self.DOCKER_IMAGE],
-            capture_output=True,
-            text=True,
-        )
-        if not result.stdout.strip():
-            print(f"Building {self.DOCKER_IMAGE} Docker image (this may take a few minutes)...")
-            dockerfile_dir = Path(__file__).parent.parent / "docker" / "powershell"
-            build_result = subprocess.run(
-                ["docker", "build", "-t", self.DOCKER_IMAGE, str(dockerfile_dir)],
-                capture_output=True,
-                text=True,
-            )
-            if build_result.returncode != 0:
-                raise PowerShellExecutionError(
-                    f"Failed to build Docker image:\n{build_result.stderr}"
-                )
-            print(f"Docker image {self.DOCKER_IMAGE} built successfully.")
-
-        self._image_checked = True
+        except DockerError as e:
+            raise PowerShellExecutionError(str(e))
 
-    async def run_cmdlet(self, module: str, cmdlet: str, **params: Any) -> dict[str, Any]:
+    async def run_cmdlet(
+        self, module: str, cmdlet: str, select: list[str] | None = None, **params: Any
+    ) -> dict[str, Any]:
         """Execute a PowerShell cmdlet.
 
         Uses HTTP service if service_url is configured, otherwise spawns Docker container.
@@ -122,18 +158,129 @@ class PowerShellClient:
         Args:
             module: The PowerShell module (ExchangeOnline, Teams, Compliance)
             cmdlet: The cmdlet to run (e.g., Get-OrganizationConfig)
+            select: Properties to return. The output is projected with
+                    Select-Object before serialization, which keeps large
+                    Exchange objects from being serialized whole; omit to get
+                    full objects.
             **params: Parameters to pass to the cmdlet
 
         Returns:
             Dict containing cmdlet output.
         """
         if self.service_url:
-            return await self._run_via_service(module, cmdlet, params)
+            return await self._run_via_service(module, cmdlet, params, select)
         else:
-            return await self._run_via_docker(module, cmdlet, params)
+            return await self._run_via_docker(module, cmdlet, params, select)
+
+    async def stream_cmdlet(
+        self, module: str, cmdlet: str, select: list[str] | None = None, **params: Any
+    ) -> AsyncIterator[Any]:
+        """Execute a PowerShell cmdlet and yield its output objects one at a time.
+
+        Through the PowerShell service, objects arrive as NDJSON while the
+        cmdlet is still running and the result set is never held whole, so
+        callers that aggregate as they go run in constant memory. The Docker
+        path has no streaming mode; it yields the objects of the full result.
+
+        Args:
+            module: The PowerShell module (ExchangeOnline, Teams, Compliance)
+            cmdlet: The cmdlet to run
+            select: Properties to return (see run_cmdlet)
+            **params: Parameters to pass to the cmdlet
+
+        Raises:
+            PowerShellExecutionError: If execution fails, possibly after some
+                objects were yielded.
+        """
+        if not self.service_url:
+            result = await self._run_via_docker(module, cmdlet, params, select)
+            # Handle None, single result, or list
+            if result is None:
+                result = []
+            elif not isinstance(result, list):
+                result = [result]
+            for item in result:
+                yield item
+            return
+
+        token, graph_token = await self._get_tokens(module)
+        payload = {
+            "module": module,
+            "cmdlet": cmdlet,
+            "params": params,
+            "properties": select,
+            "tenant_id": self.tenant_id,
+            "token": token,
+            "graph_token": graph_token,
+        }
+        async for message in self._stream_from_service("/execute-stream", payload, timeout=120.0):
+            if "item" in message:
+                yield message["item"]
+            elif "error" in message:
+                raise PowerShellExecutionError(message["error"])
+            elif message.get("done"):
+                return
+        raise PowerShellExecutionError("PowerShell service stream ended before the cmdlet finished")
+
+    async def run_cmdlets(
+        self, module: str, cmdlets: list[tuple[Any, ...]]
+    ) -> list[Any]:
+        """Execute several cmdlets of one module under a single connection.
+
+        Args:
+            module: The PowerShell module (ExchangeOnline, Teams, Compliance)
+            cmdlets: (cmdlet, params) pairs or (cmdlet, params, select) triples, e.g.
+                     [("Get-OrganizationConfig", {}), ("Get-TransportConfig", {})]
+
+        Returns:
+            One entry per cmdlet, in order: its output, or the
+            PowerShellExecutionError it failed with.
+
+        Raises:
+            PowerShellExecutionError: If the batch as a whole fails (e.g. connecting).
+        """
+        if not cmdlets:
+            return []
+        if self.service_url:
+            return await self._run_batch_via_service(module, cmdlets)
+
+        # Docker runs are one container per cmdlet; keep the per-cmdlet contract
+        results: list[Any] = []
+        for cmdlet, params, *select in cmdlets:
+            try:
+                results.append(await self._run_via_docker(module, cmdlet, params, *select))
+            except PowerShellExecutionError as e:
+                results.append(e)
+        return results
+
+    async def _get_tokens(self, module: str) -> tuple[str, str | None]:
+        """Get the access token(s) a module connects with.
+
+        Returns:
+            (token, graph_token). Teams needs both a Teams and a Graph token;
+            Exchange and Compliance use a single token and graph_token is None.
+        """
+        if module == "Teams":
+            token = await self.token_cache.acquire_token(
+                self.tenant_id, self.client_id, self.client_secret, self.TEAMS_SCOPE
+            )
+            graph_token = await self.token_cache.acquire_token(
+                self.tenant_id, self.client_id, self.client_secret, self.GRAPH_SCOPE
+            )
+            return token, graph_token
+
+        scope = self._get_scope_for_module(module)
+        token = await self.token_cache.acquire_token(
+            self.tenant_id, self.client_id, self.client_secret, scope
+        )
+        return token, None
 
     async def _run_via_service(
-        self, module: str, cmdlet: str, params: dict[str, Any]
+        self,
+        module: str,
+        cmdlet: str,
+        params: dict[str, Any],
+        select: list[str] | None = None,
     ) -> dict[str, Any]:
         """Execute cmdlet via HTTP service.
 
@@ -141,121 +288,183 @@ class PowerShellClient:
             module: The PowerShell module
             cmdlet: The cmdlet to run
             params: Parameters for the cmdlet
+            select: Properties to return, or None for full objects
 
         Returns:
             Dict containing cmdlet output.
         """
-        # Acquire tokens
-        graph_token = None
-        if module == "Teams":
-            # Teams needs both Graph and Teams tokens
-            graph_result = self._msal_app.acquire_token_for_client(
-                scopes=["https://graph.microsoft.com/.default"]
-            )
-            if "access_token" not in graph_result:
-                error_desc = graph_result.get("error_description", str(graph_result))
-                raise RuntimeError(f"Graph token acquisition failed: {error_desc}")
-            graph_token = graph_result["access_token"]
-
-            teams_result = self._msal_app.acquire_token_for_client(
-                scopes=[self.TEAMS_SCOPE]
-            )
-            if "access_token" not in teams_result:
-                error_desc = teams_result.get("error_description", str(teams_result))
-                raise RuntimeError(f"Teams token acquisition failed: {error_desc}")
-            token = teams_result["access_token"]
-        else:
-            # Exchange and Compliance use single token
-            scope = self._get_scope_for_module(module)
-            result = self._msal_app.acquire_token_for_client(scopes=[scope])
-            if "access_token" not in result:
-                error_desc = result.get("error_description", str(result))
-                raise RuntimeError(f"Token acquisition failed: {error_desc}")
-            token = result["access_token"]
+        token, graph_token = await self._get_tokens(module)
 
         # Build request payload
         payload = {
             "module": module,
             "cmdlet": cmdlet,
             "params": params,
+            "properties": select,
             "tenant_id": self.tenant_id,
             "token": token,
             "graph_token": graph_token,
+            "no_cache": self.bypass_result_cache,
         }
 
         # Call HTTP service
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{self.service_url}/execute",
-                json=payload,
-            )
-            response.raise_for_status()
-
-        result = response.json()
+        result = await self._post_to_service("/execute", payload, timeout=120.0)
         if not result.get("success"):
             raise PowerShellExecutionError(result.get("error", "Unknown error"))
 
         return result.get("data")
 
+    async def _post_to_service(
+        self, path: str, payload: dict[str, Any], timeout: float
+    ) -> dict[str, Any]:
+        """POST to the tenant's PowerShell service replica and return the JSON body."""
+        response = await self._send_to_service(path, payload, timeout)
+        return response.json()
+
+    async def _stream_from_service(
+        self, path: str, payload: dict[str, Any], timeout: float
+    ) -> AsyncIterator[dict[str, Any]]:
+        """POST to a streaming endpoint of the PowerShell service and yield its NDJSON lines.
+
+        timeout applies between lines, not to the whole stream.
+        """
+        response = await self._send_to_service(path, payload, timeout, stream=True)
+        try:
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            await response.aclose()
+
+    async def _send_to_service(
+        self,
+        path: str,
+        payload: dict[str, Any],
+        timeout: float,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Send a request to the tenant's PowerShell service replica.
+
+        Replicas are tried in the tenant's order (see ServiceRouter): one that
+        refuses the connection is marked down and the next is tried. The
+        service answers 429 with Retry-After when all its workers are busy and
+        its queue is full; that is retried on the same replica, which holds the
+        tenant's warm sessions, up to SERVICE_MAX_RETRIES times before the
+        error is raised.
+        """
+        client = self._http_client()
+        unreachable: httpx.TransportError | None = None
+        for replica in await self.service_router.candidates(self.tenant_id):
+            attempt = 0
+            while True:
+                request = client.build_request(
+                    "POST", f"{replica}{path}", json=payload, timeout=timeout
+                )
+                try:
+                    response = await client.send(request, stream=stream)
+                except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                    self.service_router.mark_down(replica)
+                    unreachable = e
+                    break
+                self.service_router.mark_up(replica)
+                if response.status_code == 429 and attempt < self.SERVICE_MAX_RETRIES:
+                    delay = self._service_retry_delay(response, attempt)
+                    await response.aclose()
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+                return response
+        # Every replica refused the connection
+        raise unreachable
+
+    def _service_retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying: Retry-After, else jittered backoff."""
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = min(2.0**attempt, 30.0)
+        return min(max(delay, 0.0), self.SERVICE_MAX_RETRY_AFTER) + random.uniform(0, 1)
+
+    async def _run_batch_via_service(
+        self, module: str, cmdlets: list[tuple[Any, ...]]
+    ) -> list[Any]:
+        """Execute cmdlets via the HTTP service's /execute-batch endpoint."""
+        token, graph_token = await self._get_tokens(module)
+
+        payload = {
+            "module": module,
+            "cmdlets": [
+                {"cmdlet": cmdlet, "params": params, "properties": select[0] if select else None}
+                for cmdlet, params, *select in cmdlets
+            ],
+            "tenant_id": self.tenant_id,
+            "token": token,
+            "graph_token": graph_token,
+            "no_cache": self.bypass_result_cache,
+        }
+
+        result = await self._post_to_service(
+            "/execute-batch", payload, timeout=120.0 * len(cmdlets)
+        )
+        if not result.get("success"):
+            raise PowerShellExecutionError(result.get("error", "Unknown error"))
+
+        return [
+            item.get("data")
+            if item.get("success")
+            else PowerShellExecutionError(item.get("error", "Unknown error"))
+            for item in result.get("results", [])
+        ]
+
     async def _run_via_docker(
-        self, module: str, cmdlet: str, params: dict[str, Any]
+        self,
+        module: str,
+        cmdlet: str,
+        params: dict[str, Any],
+        select: list[str] | None = None,
     ) -> dict[str, Any]:
-        """Execute cmdlet by spawning Docker container.
+        """Execute cmdlet in Docker: in this process's container, or a new one (docker_mode).
 
         Args:
             module: The PowerShell module
             cmdlet: The cmdlet to run
             params: Parameters for the cmdlet
+            select: Properties to return, or None for full objects
 
         Returns:
             Dict containing cmdlet output.
         """
         # Ensure Docker image exists
-        self._ensure_docker_image()
+        await asyncio.to_thread(self._ensure_docker_image)
 
         # Build environment variables for tokens
-        env_vars = []
-
+        token, graph_token = await self._get_tokens(module)
         if module == "Teams":
-            # Teams needs both Graph and Teams tokens
-            graph_result = self._msal_app.acquire_token_for_client(
-                scopes=["https://graph.microsoft.com/.default"]
-            )
-            if "access_token" not in graph_result:
-                error_desc = graph_result.get("error_description", str(graph_result))
-                raise RuntimeError(f"Graph token acquisition failed: {error_desc}")
-
-            teams_result = self._msal_app.acquire_token_for_client(
-                scopes=[self.TEAMS_SCOPE]
-            )
-            if "access_token" not in teams_result:
-                error_desc = teams_result.get("error_description", str(teams_result))
-                raise RuntimeError(f"Teams token acquisition failed: {error_desc}")
-
-            env_vars = [
-                "-e", f"GRAPH_TOKEN={graph_result['access_token']}",
-                "-e", f"TEAMS_TOKEN={teams_result['access_token']}",
-            ]
+            token_env = {"GRAPH_TOKEN": graph_token, "TEAMS_TOKEN": token}
         else:
-            # Exchange and Compliance use single token
-            scope = self._get_scope_for_module(module)
-            result = self._msal_app.acquire_token_for_client(scopes=[scope])
-            if "access_token" not in result:
-                error_desc = result.get("error_description", str(result))
-                raise RuntimeError(f"Token acquisition failed: {error_desc}")
-            env_vars = ["-e", f"EXO_TOKEN={result['access_token']}"]
+            token_env = {"EXO_TOKEN": token}
 
         # Build PowerShell script
-        script = self._build_script(module, cmdlet, params)
-
-        # Run in Docker container (pass token via env var for security)
-        docker_cmd = ["docker", "run", "--rm"] + env_vars + [self.DOCKER_IMAGE, script]
-        proc = subprocess.run(
-            docker_cmd,
-            capture_output=True,
-            text=True,
-            timeout=120,
-        )
+        script = self._build_script(module, cmdlet, params, select)
+
+        # Tokens are passed by name; docker reads their values from its environment
+        try:
+            if self.docker_mode == "container":
+                proc = await asyncio.to_thread(self._exec_in_container, script, token_env)
+            else:
+                proc = await asyncio.to_thread(
+                    subprocess.run,
+                    ["docker", "run", "--rm", *env_flags(token_env), self.DOCKER_IMAGE, script],
+                    capture_output=True,
+                    text=True,
+                    timeout=120,
+                    env={**os.environ, **token_env},
+                )
+        except subprocess.TimeoutExpired:
+            raise PowerShellExecutionError("PowerShell execution timed out after 120 seconds")
 
         if proc.returncode != 0:
             raise PowerShellExecutionError(f"PowerShell execution failed:\n{proc.stderr}")
@@ -268,13 +477,29 @@ class PowerShellClient:
                 f"Failed to parse PowerShell output as JSON:\n{proc.stdout}\nError: {e}"
             )
 
-    def _build_script(self, module: str, cmdlet: str, params: dict[str, Any]) -> str:
+    def _exec_in_container(
+        self, script: str, token_env: dict[str, str]
+    ) -> subprocess.CompletedProcess:
+        try:
+            container = get_container(self.DOCKER_IMAGE)
+        except DockerError as e:
+            raise PowerShellExecutionError(str(e))
+        return container.exec(script, token_env, timeout=120)
+
+    def _build_script(
+        self,
+        module: str,
+        cmdlet: str,
+        params: dict[str, Any],
+        select: list[str] | None = None,
+    ) -> str:
         """Build the PowerShell script to execute.
 
         Args:
             module: The module to import and connect
             cmdlet: The cmdlet to run
             params: Parameters for the cmdlet
+            select: Properties to return, or None for full objects
 
         Returns:
             PowerShell script as a string
@@ -289,6 +514,15 @@ class PowerShellClient:
             else:
                 param_str += f" -{key} {value}"
 
+        # Projected output is flat, so it needs far less serialization depth
+        depth = 10
+        if select:
+            for name in select:
+                if not _PROPERTY_NAME_RE.match(name):
+                    raise ValueError(f"Invalid property name: {name!r}")
+            param_str += " | Select-Object -Property " + ", ".join(select)
+            depth = 3
+
         if module == "ExchangeOnline":
             return f'''
 Import-Module ExchangeOnlineManagement
@@ -298,7 +532,7 @@ try {{
     if ($null -eq $result) {{
         Write-Output 'null'
     }} else {{
-        $result | ConvertTo-Json -Depth 10
+        $result | ConvertTo-Json -Depth {depth}
     }}
 }} finally {{
     Disconnect-ExchangeOnline -Confirm:$false -ErrorAction SilentlyContinue
@@ -313,7 +547,7 @@ try {{
     if ($null -eq $result) {{
         Write-Output 'null'
     }} else {{
-        $result | ConvertTo-Json -Depth 10
+        $result | ConvertTo-Json -Depth {depth}
     }}
 }} finally {{
     Disconnect-ExchangeOnline -Confirm:$false -ErrorAction SilentlyContinue
@@ -329,7 +563,7 @@ try {{
     if ($null -eq $result) {{
         Write-Output 'null'
     }} else {{
-        $result | ConvertTo-Json -Depth 10
+        $result | ConvertTo-Json -Depth {depth}
     }}
 }} finally {{
     Disconnect-MicrosoftTeams -ErrorAction SilentlyContinue
@@ -0,0 +1,216 @@
+"""Long-lived PowerShell container for PowerShellClient's Docker path.
+
+Without the PowerShell service, each cmdlet used to run in its own
+`docker run --rm autoaudit-powershell` container and pay container start-up
+every time. Instead each worker process now starts one container and runs
+every cmdlet in it with `docker exec`:
+
+- The container's main process is `cat` reading the stdin of the
+  `docker run -i` process this module holds. When the worker process exits,
+  however it exits, that pipe closes, cat ends and the container is removed
+  (--rm). shutdown_container() does the same on an orderly worker shutdown.
+- Containers are per process: after a fork the child starts its own.
+- Tokens are passed to `docker exec` by name (-e EXO_TOKEN) and read from the
+  docker CLI's environment, so they never appear in a command line.
+
+The image is checked (and built if missing) once per process rather than by
+every client.
+"""
+
+import atexit
+import os
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Seconds to wait for a new container to be running
+CONTAINER_START_TIMEOUT = 60.0
+
+
+class DockerError(Exception):
+    """Raised when Docker is unavailable or the container cannot be started."""
+
+    pass
+
+
+_checked_images: set[str] = set()
+_image_lock = threading.Lock()
+
+
+def ensure_docker_image(image: str, dockerfile_dir: Path) -> None:
+    """Check that Docker is available and build the image if it doesn't exist.
+
+    Runs once per image and process; later calls return immediately.
+
+    Raises:
+        DockerError: If Docker is missing or the build fails
+    """
+    if image in _checked_images:
+        return
+    with _image_lock:
+        if image in _checked_images:
+            return
+
+        # Check if Docker is available
+        try:
+            subprocess.run(["docker", "--version"], capture_output=True, check=True)
+        except FileNotFoundError:
+            raise DockerError(
+                "Docker is not installed or not in PATH.\n"
+                "Install Docker from: https://docs.docker.com/get-docker/"
+            )
+        except subprocess.CalledProcessError as e:
+            raise DockerError(f"Docker check failed: {e.stderr}")
+
+        # Check if image exists
+        result = subprocess.run(
+            ["docker", "images", "-q", image],
+            capture_output=True,
+            text=True,
+        )
+        if not result.stdout.strip():
+            print(f"Building {image} Docker image (this may take a few minutes)...")
+            build_result = subprocess.run(
+                ["docker", "build", "-t", image, str(dockerfile_dir)],
+                capture_output=True,
+                text=True,
+            )
+            if build_result.returncode != 0:
+                raise DockerError(f"Failed to build Docker image:\n{build_result.stderr}")
+            print(f"Docker image {image} built successfully.")
+
+        _checked_images.add(image)
+
+
+def env_flags(env: dict[str, str]) -> list[str]:
+    """`-e NAME` flags passing env's variables by name, values taken from docker's env."""
+    flags = []
+    for name in env:
+        flags += ["-e", name]
+    return flags
+
+
+class PowerShellContainer:
+    """A running autoaudit-powershell container that cmdlets are exec'd in."""
+
+    def __init__(self, image: str):
+        """Start the container and wait until it is running.
+
+        Raises:
+            DockerError: If the container does not start
+        """
+        self.image = image
+        suffix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.name = f"autoaudit-powershell-{suffix}"
+        self._proc = subprocess.Popen(
+            ["docker", "run", "-i", "--rm", "--name", self.name, "--entrypoint", "cat", image],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + CONTAINER_START_TIMEOUT
+        while not self._running():
+            if self._proc.poll() is not None:
+                raise DockerError(
+                    f"PowerShell container exited on start:\n{self._proc.stderr.read().decode()}"
+                )
+            if time.monotonic() >= deadline:
+                self.close()
+                raise DockerError(
+                    f"PowerShell container not running after {CONTAINER_START_TIMEOUT:g} seconds"
+                )
+            time.sleep(0.2)
+
+    def _running(self) -> bool:
+        result = subprocess.run(
+            ["docker", "inspect", "-f", "{{.State.Running}}", self.name],
+            capture_output=True,
+            text=True,
+        )
+        return result.returncode == 0 and result.stdout.strip() == "true"
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def exec(
+        self, script: str, env: dict[str, str], timeout: float = 120
+    ) -> subprocess.CompletedProcess:
+        """Run a PowerShell script in the container.
+
+        Args:
+            script: PowerShell script to run
+            env: Environment variables (tokens) for the script
+            timeout: Seconds to wait for the script
+
+        Raises:
+            subprocess.TimeoutExpired: If the script runs longer than timeout
+        """
+        return subprocess.run(
+            [
+                "docker",
+                "exec",
+                *env_flags(env),
+                self.name,
+                "pwsh",
+                "-NoProfile",
+                "-NonInteractive",
+                "-Command",
+                script,
+            ],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            env={**os.environ, **env},
+        )
+
+    def close(self) -> None:
+        """Stop and remove the container."""
+        if self.alive:
+            try:
+                # EOF ends cat, and with it the container
+                self._proc.stdin.close()
+                self._proc.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                subprocess.run(["docker", "rm", "-f", self.name], capture_output=True)
+                self._proc.kill()
+                self._proc.wait()
+        self._proc.stderr.close()
+
+
+_container: PowerShellContainer | None = None
+_container_pid: int | None = None
+_container_lock = threading.Lock()
+
+
+def get_container(image: str) -> PowerShellContainer:
+    """This process's PowerShell container, started (or restarted) as needed.
+
+    Raises:
+        DockerError: If the container cannot be started
+    """
+    global _container, _container_pid
+    with _container_lock:
+        # A container inherited across fork belongs to the parent
+        if _container is None or _container_pid != os.getpid() or not _container.alive:
+            if _container is not None and _container_pid == os.getpid():
+                _container.close()
+            _container = PowerShellContainer(image)
+            _container_pid = os.getpid()
+        return _container
+
+
+def shutdown_container() -> None:
+    """Remove this process's PowerShell container, if it was started."""
+    global _container, _container_pid
+    with _container_lock:
+        if _container is not None and _container_pid == os.getpid():
+            _container.close()
+        _container = None
+        _container_pid = None
+
+
+atexit.register(shutdown_container)
@@ -0,0 +1,145 @@
+"""Tenant-affinity routing across PowerShell service replicas.
+
+Every PowerShell service replica keeps warm, connected sessions per tenant and
+module. Behind a round-robin load balancer one tenant's cmdlets land on every
+replica and each of them pays the connect cost. ServiceRouter instead sends a
+tenant to the same replica every time:
+
+- Replicas are ranked per tenant by rendezvous (highest random weight)
+  hashing: each replica scores hash(replica, tenant) and the highest score is
+  the tenant's home. Adding or removing a replica only moves the tenants whose
+  home it is or becomes, about 1/n of them; everyone else keeps their sessions.
+- The rest of the ranking is the tenant's failover order. A replica that
+  refuses connections is marked down for down_cooldown seconds; its tenants
+  use their next replica meanwhile and return when it is back up.
+- With discovery on, each configured URL's host name is resolved to all of
+  its addresses (a scaled Compose service, a Kubernetes headless service)
+  every refresh_interval seconds, and each address is a replica. Replicas
+  coming and going rebalance as above.
+
+Routers are shared by every client in the process (see get_service_router),
+so down marks and discovery results carry across tasks.
+"""
+
+import asyncio
+import hashlib
+import socket
+import time
+from collections.abc import Sequence
+from urllib.parse import urlsplit, urlunsplit
+
+# Seconds a replica that refused a connection is skipped
+DOWN_COOLDOWN = 30.0
+# Seconds between DNS lookups of the configured host names (discovery only)
+DISCOVERY_INTERVAL = 30.0
+
+
+def parse_service_urls(value: str) -> list[str]:
+    """Split a comma-separated list of service URLs."""
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+
+class ServiceRouter:
+    """Ranks PowerShell service replicas per tenant and tracks unreachable ones."""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        down_cooldown: float = DOWN_COOLDOWN,
+        discover: bool = False,
+        refresh_interval: float = DISCOVERY_INTERVAL,
+    ):
+        """Initialize the router.
+
+        Args:
+            urls: Service URLs, one per replica (or per host name to discover)
+            down_cooldown: Seconds an unreachable replica is skipped
+            discover: Resolve each URL's host name to all its addresses
+            refresh_interval: Seconds between discovery lookups
+        """
+        if not urls:
+            raise ValueError("At least one PowerShell service URL is required")
+        self.urls = list(urls)
+        self.down_cooldown = down_cooldown
+        self.discover = discover
+        self.refresh_interval = refresh_interval
+        self.replicas = list(self.urls)
+        self._down_until: dict[str, float] = {}
+        self._refreshed_at: float | None = None
+
+    @staticmethod
+    def _score(replica: str, tenant_id: str) -> int:
+        digest = hashlib.sha256(f"{replica}|{tenant_id.lower()}".encode()).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def rank(self, tenant_id: str) -> list[str]:
+        """All replicas in the tenant's order of preference, home replica first."""
+        return sorted(self.replicas, key=lambda replica: -self._score(replica, tenant_id))
+
+    async def candidates(self, tenant_id: str) -> list[str]:
+        """Replicas to try for a tenant, in order.
+
+        Replicas marked down go last rather than being dropped, so a request
+        still has somewhere to go when every replica was marked down.
+        """
+        if self.discover:
+            await self._maybe_refresh()
+        now = time.monotonic()
+        ranked = self.rank(tenant_id)
+        up = [replica for replica in ranked if self._down_until.get(replica, 0.0) <= now]
+        return up + [replica for replica in ranked if replica not in up]
+
+    def mark_down(self, replica: str) -> None:
+        """Skip a replica that refused a connection for down_cooldown seconds."""
+        self._down_until[replica] = time.monotonic() + self.down_cooldown
+
+    def mark_up(self, replica: str) -> None:
+        """Clear a replica's down mark after it answered."""
+        self._down_until.pop(replica, None)
+
+    def set_replicas(self, replicas: Sequence[str]) -> None:
+        """Replace the replica set; tenants move only if their ranking changed."""
+        if not replicas:
+            return
+        self.replicas = sorted(set(replicas))
+        for replica in list(self._down_until):
+            if replica not in self.replicas:
+                del self._down_until[replica]
+
+    async def _maybe_refresh(self) -> None:
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        self.set_replicas(await self._discover())
+
+    async def _discover(self) -> list[str]:
+        """Resolve every configured URL to one URL per address of its host."""
+        loop = asyncio.get_running_loop()
+        replicas = []
+        for url in self.urls:
+            parts = urlsplit(url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            try:
+                infos = await loop.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+            except OSError:
+                # Keep the name; the HTTP client reports the failure when used
+                replicas.append(url)
+                continue
+            for address in sorted({info[4][0] for info in infos}):
+                host = f"[{address}]" if ":" in address else address
+                netloc = f"{host}:{parts.port}" if parts.port else host
+                replicas.append(urlunsplit(parts._replace(netloc=netloc)))
+        return replicas
+
+
+_routers: dict[tuple[str, bool], ServiceRouter] = {}
+
+
+def get_service_router(service_url: str, discover: bool = False) -> ServiceRouter:
+    """The process-wide router for a (comma-separated) PowerShell service URL setting."""
+    key = (service_url, discover)
+    router = _routers.get(key)
+    if router is None:
+        router = _routers[key] = ServiceRouter(parse_service_urls(service_url), discover=discover)
+    return router
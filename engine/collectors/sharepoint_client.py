@@ -22,13 +22,21 @@ SharePoint REST API Reference:
 from typing import Any
 
 import httpx
-from msal import ConfidentialClientApplication
+
+from collectors.token_cache import TokenCache, get_token_cache
 
 
 class SharePointClient:
     """Client for SharePoint Online REST API using client secret auth."""
 
-    def __init__(self, tenant_id: str, client_id: str, client_secret: str, tenant_name: str):
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        tenant_name: str,
+        token_cache: TokenCache | None = None,
+    ):
         """Initialize SharePoint client.
 
         Args:
@@ -36,19 +44,14 @@ class SharePointClient:
             client_id: Application (client) ID
             client_secret: Client secret for authentication
             tenant_name: SharePoint tenant name (e.g., 'contoso' for contoso.sharepoint.com)
+            token_cache: Token cache to use. Defaults to the process-wide cache.
         """
         self.tenant_id = tenant_id
         self.client_id = client_id
         self.client_secret = client_secret
         self.tenant_name = tenant_name
         self.admin_url = f"https://{tenant_name}-admin.sharepoint.com"
-        self._access_token: str | None = None
-
-        self._msal_app = ConfidentialClientApplication(
-            client_id=client_id,
-            client_credential=client_secret,
-            authority=f"https://login.microsoftonline.com/{tenant_id}",
-        )
+        self.token_cache = token_cache or get_token_cache()
 
     async def _get_access_token(self) -> str:
         """Get access token for SharePoint.
@@ -57,20 +60,11 @@ class SharePointClient:
             Access token string.
 
         Raises:
-            Exception: If token acquisition fails.
+            TokenAcquisitionError: If token acquisition fails.
         """
-        if self._access_token:
-            return self._access_token
-
-        result = self._msal_app.acquire_token_for_client(
-            scopes=[f"{self.admin_url}/.default"]
+        return await self.token_cache.acquire_token(
+            self.tenant_id, self.client_id, self.client_secret, f"{self.admin_url}/.default"
         )
-        if "access_token" not in result:
-            error = result.get("error_description", result.get("error", "Unknown"))
-            raise Exception(f"Failed to acquire SharePoint token: {error}")
-
-        self._access_token = result["access_token"]
-        return self._access_token
 
     async def get_tenant_settings(self) -> dict[str, Any]:
         """Get SPO tenant settings via REST API.
@@ -0,0 +1,202 @@
+"""Shared MSAL token cache for app-only (client credentials) tokens.
+
+Without it every control builds its own ConfidentialClientApplication and
+fetches fresh Graph/Exchange/Teams tokens - one round trip to Entra ID per
+control per scope, made synchronously on the event loop.
+
+TokenCache keeps one ConfidentialClientApplication per (tenant, client, secret)
+for the life of the process, and a token per (tenant, client, secret, scope)
+until shortly before it expires. With a Redis URL the serialized MSAL cache of
+each (tenant, client, secret) is also shared through Redis, so other worker processes reuse
+tokens instead of requesting their own. The secret is part of every key (as a
+SHA-256 hash) so a caller with a wrong or revoked secret never gets a token
+issued to the right one. Acquisition runs in a worker thread so
+the event loop keeps serving other requests.
+
+Note that the Redis copy holds bearer tokens; use it only with the internal
+broker Redis.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+from msal import ConfidentialClientApplication, SerializableTokenCache
+
+logger = logging.getLogger(__name__)
+
+
+class TokenAcquisitionError(RuntimeError):
+    """Raised when MSAL cannot acquire an access token."""
+
+    pass
+
+
+class TokenCache:
+    """Process-wide app-only token cache, optionally backed by Redis."""
+
+    # Treat tokens as expired this many seconds early so in-flight calls don't fail
+    EXPIRY_MARGIN = 300
+    # Lifetime of a serialized MSAL cache in Redis (app-only tokens last ~1 hour)
+    REDIS_TTL = 3600
+
+    def __init__(self, redis_url: str | None = None):
+        """Initialize the cache.
+
+        Args:
+            redis_url: Optional Redis URL for sharing tokens across processes.
+        """
+        self.redis_url = redis_url
+        self._redis = None
+        self._apps: dict[tuple[str, str, str], ConfidentialClientApplication] = {}
+        self._tokens: dict[tuple[str, str, str, str], tuple[str, float]] = {}
+        self._locks: dict[tuple[str, str, str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get_redis(self):
+        if self.redis_url is None:
+            return None
+        if self._redis is None:
+            import redis
+
+            self._redis = redis.Redis.from_url(self.redis_url)
+        return self._redis
+
+    @staticmethod
+    def _secret_hash(client_secret: str) -> str:
+        return hashlib.sha256(client_secret.encode()).hexdigest()
+
+    def _key_lock(self, key: tuple[str, str, str, str]) -> threading.Lock:
+        """Per-key lock so concurrent callers wait for one acquisition."""
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _get_app(
+        self, tenant_id: str, client_id: str, client_secret: str
+    ) -> ConfidentialClientApplication:
+        # The secret is part of the key (hashed) so a rotated secret gets a new app
+        key = (tenant_id, client_id, self._secret_hash(client_secret))
+        with self._lock:
+            app = self._apps.get(key)
+            if app is None:
+                app = ConfidentialClientApplication(
+                    client_id=client_id,
+                    client_credential=client_secret,
+                    authority=f"https://login.microsoftonline.com/{tenant_id}",
+                    token_cache=SerializableTokenCache(),
+                )
+                self._apps[key] = app
+            return app
+
+    def _redis_key(self, tenant_id: str, client_id: str, secret_hash: str) -> str:
+        return f"autoaudit:msal-cache:{tenant_id}:{client_id}:{secret_hash}"
+
+    def _load_shared(
+        self,
+        app: ConfidentialClientApplication,
+        tenant_id: str,
+        client_id: str,
+        secret_hash: str,
+    ) -> None:
+        """Load the Redis copy of the MSAL cache into the app's cache."""
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            state = client.get(self._redis_key(tenant_id, client_id, secret_hash))
+        except Exception as e:
+            logger.warning("MSAL token cache unavailable in Redis: %s", e)
+            return
+        if state:
+            app.token_cache.deserialize(state.decode())
+
+    def _save_shared(
+        self,
+        app: ConfidentialClientApplication,
+        tenant_id: str,
+        client_id: str,
+        secret_hash: str,
+    ) -> None:
+        """Write the app's MSAL cache to Redis if it picked up new tokens."""
+        client = self._get_redis()
+        if client is None or not app.token_cache.has_state_changed:
+            return
+        try:
+            client.set(
+                self._redis_key(tenant_id, client_id, secret_hash),
+                app.token_cache.serialize(),
+                ex=self.REDIS_TTL,
+            )
+            app.token_cache.has_state_changed = False
+        except Exception as e:
+            logger.warning("MSAL token cache unavailable in Redis: %s", e)
+
+    def acquire_token_sync(
+        self, tenant_id: str, client_id: str, client_secret: str, scope: str
+    ) -> str:
+        """Get an access token for a scope, from cache when possible (blocking).
+
+        Raises:
+            TokenAcquisitionError: If MSAL cannot acquire the token.
+        """
+        secret_hash = self._secret_hash(client_secret)
+        key = (tenant_id, client_id, secret_hash, scope)
+        with self._key_lock(key):
+            cached = self._tokens.get(key)
+            if cached and cached[1] > time.time():
+                return cached[0]
+
+            app = self._get_app(tenant_id, client_id, client_secret)
+            self._load_shared(app, tenant_id, client_id, secret_hash)
+            # MSAL returns a cached token from the (possibly shared) cache when one is valid
+            result = app.acquire_token_for_client(scopes=[scope])
+            if "access_token" not in result:
+                error = result.get("error_description", result.get("error", "Unknown error"))
+                raise TokenAcquisitionError(f"Failed to acquire token for {scope}: {error}")
+            self._save_shared(app, tenant_id, client_id, secret_hash)
+
+            expires_at = time.time() + int(result.get("expires_in", 3600)) - self.EXPIRY_MARGIN
+            self._tokens[key] = (result["access_token"], expires_at)
+            return result["access_token"]
+
+    async def acquire_token(
+        self, tenant_id: str, client_id: str, client_secret: str, scope: str
+    ) -> str:
+        """Get an access token for a scope without blocking the event loop.
+
+        Args:
+            tenant_id: Azure AD tenant ID
+            client_id: Application (client) ID
+            client_secret: Client secret for authentication
+            scope: Resource scope, e.g. "https://graph.microsoft.com/.default"
+
+        Returns:
+            The access token.
+
+        Raises:
+            TokenAcquisitionError: If MSAL cannot acquire the token.
+        """
+        key = (tenant_id, client_id, self._secret_hash(client_secret), scope)
+        cached = self._tokens.get(key)
+        if cached and cached[1] > time.time():
+            return cached[0]
+        return await asyncio.to_thread(
+            self.acquire_token_sync, tenant_id, client_id, client_secret, scope
+        )
+
+
+_default_cache = TokenCache()
+
+
+def get_token_cache() -> TokenCache:
+    """The process-wide token cache used by clients that aren't given one."""
+    return _default_cache
+
+
+def configure_token_cache(redis_url: str | None) -> TokenCache:
+    """Replace the process-wide token cache, e.g. to back it with Redis."""
+    global _default_cache
+    _default_cache = TokenCache(redis_url=redis_url)
+    return _default_cache
@@ -0,0 +1,281 @@
+"""Cache of policy decisions keyed by exactly what they depend on.
+
+Hourly re-scans of a tenant mostly hand each policy the same collector output
+as the scan before. A decision depends only on that input, the policy's Rego
+source and the package queried, so DecisionCache keys results by a SHA-256 of
+the three and answers repeats without asking OPA:
+
+- The input is canonicalized (sorted keys, compact separators) before it is
+  hashed, so key order in collector output doesn't matter.
+- The Rego file's contents are part of the key, so editing a policy retires
+  its decisions. Our policies never import other packages, so that one file
+  is the whole policy.
+- Entries live in Redis, shared by every worker, and expire after ttl seconds.
+  At most max_entries are kept, least recently used evicted first. Without a
+  Redis URL they are kept in a per-process LRU instead.
+- Redis errors are logged and treated as misses, so the cache never fails an
+  evaluation.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] is the recency index; ARGV is max_entries, ttl, now, then key/value pairs
+_PUT_SCRIPT = """
+for i = 4, #ARGV, 2 do
+    redis.call('SET', ARGV[i], ARGV[i + 1], 'EX', ARGV[2])
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[i])
+end
+local excess = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[1])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[1], 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, excess - 1)
+    redis.call('DEL', unpack(evicted))
+end
+return excess
+"""
+
+# Digests of Rego files by (path, mtime_ns, size), so each file is read once
+_policy_digests: dict[tuple[str, int, int], str] = {}
+
+
+def policy_digest(policy_path: Path) -> str | None:
+    """SHA-256 of a Rego file's contents, or None if the file is missing."""
+    try:
+        stat = policy_path.stat()
+    except OSError:
+        return None
+    memo_key = (str(policy_path), stat.st_mtime_ns, stat.st_size)
+    digest = _policy_digests.get(memo_key)
+    if digest is None:
+        digest = _policy_digests[memo_key] = hashlib.sha256(policy_path.read_bytes()).hexdigest()
+    return digest
+
+
+def input_digest(input_data: Any) -> str:
+    """SHA-256 of the canonical JSON form of a policy input."""
+    canonical = json.dumps(input_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class DecisionCache:
+    """Size-bounded LRU cache of policy decisions, in Redis or in-process."""
+
+    KEY_PREFIX = "autoaudit:decision"
+
+    def __init__(
+        self,
+        redis_url: str | None = None,
+        max_entries: int = 100_000,
+        ttl: int = 7 * 24 * 3600,
+    ):
+        """Initialize the cache.
+
+        Args:
+            redis_url: Redis URL for decisions shared across worker processes.
+                       Without it decisions are kept in this process only.
+            max_entries: Maximum number of decisions kept
+            ttl: Seconds a decision is kept
+        """
+        self.redis_url = redis_url
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # redis.asyncio clients are bound to the loop they were created on
+        self._redis_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._local: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, package_path: str, input_hash: str, policy_hash: str) -> str:
+        """Build the key of one decision from its package and the digests of its sources."""
+        digest = hashlib.sha256(f"{package_path}|{policy_hash}|{input_hash}".encode()).hexdigest()
+        return f"{self.KEY_PREFIX}:{digest}"
+
+    @property
+    def _index_key(self) -> str:
+        return f"{self.KEY_PREFIX}-index"
+
+    def _get_redis(self):
+        """Get the running loop's Redis client, or None when running in-process only."""
+        if self.redis_url is None:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._redis_clients.get(loop)
+        if client is None:
+            import redis.asyncio as redis
+
+            client = self._redis_clients[loop] = redis.from_url(self.redis_url)
+        return client
+
+    async def get_many(self, keys: list[str]) -> dict[str, dict]:
+        """Look up decisions.
+
+        Returns:
+            The cached decision of every key that has one.
+        """
+        if not keys:
+            return {}
+        client = self._get_redis()
+        if client is None:
+            found = self._local_get(keys)
+        else:
+            try:
+                values = await client.mget(keys)
+                found = {key: json.loads(value) for key, value in zip(keys, values) if value}
+                if found:
+                    # Refresh recency so eviction drops the least recently used
+                    now = time.time()
+                    await client.zadd(self._index_key, {key: now for key in found})
+            except Exception as e:
+                logger.warning("Decision cache unavailable in Redis: %s", e)
+                found = {}
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def put_many(self, decisions: dict[str, dict]) -> None:
+        """Store decisions, evicting the least recently used beyond max_entries."""
+        if not decisions:
+            return
+        client = self._get_redis()
+        if client is None:
+            self._local_put(decisions)
+            return
+        args: list = [self.max_entries, self.ttl, time.time()]
+        for key, decision in decisions.items():
+            args += [key, json.dumps(decision, default=str)]
+        try:
+            await client.eval(_PUT_SCRIPT, 1, self._index_key, *args)
+        except Exception as e:
+            logger.warning("Decision cache unavailable in Redis: %s", e)
+
+    def _local_get(self, keys: list[str]) -> dict[str, dict]:
+        found = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._local.get(key)
+                if entry is None:
+                    continue
+                if entry[1] <= now:
+                    del self._local[key]
+                    continue
+                self._local.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def _local_put(self, decisions: dict[str, dict]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, decision in decisions.items():
+                self._local[key] = (decision, expires_at)
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        """Hit and miss counts of this process."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    async def aclose(self) -> None:
+        """Close the running event loop's Redis client."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = self._redis_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+def mark_cached(decision: dict) -> dict:
+    """A copy of a cached decision whose details (stored as evidence) say it was cached."""
+    details = decision.get("details")
+    if details is None:
+        details = {}
+    if not isinstance(details, dict):
+        return decision
+    return {**decision, "details": {**details, "decision_cache": "hit"}}
+
+
+async def evaluate_with_cache(
+    evaluator,
+    cache: DecisionCache | None,
+    policies: dict[str, Path | None],
+    input_data: dict,
+) -> dict[str, dict]:
+    """Evaluate policies against one input, reusing cached decisions.
+
+    Args:
+        evaluator: OPAClient or EmbeddedPolicyEvaluator
+        cache: Decision cache, or None to always evaluate
+        policies: Rego file of each package path to evaluate; packages whose
+                  file is None or missing are always evaluated
+        input_data: The data to evaluate (facts collected from the cloud)
+
+    Returns:
+        Mapping of each package path to its evaluation result. Results served
+        from the cache carry details["decision_cache"] = "hit".
+    """
+    if cache is None:
+        return await _evaluate(evaluator, list(policies), input_data)
+
+    input_hash = input_digest(input_data)
+    keys = {}
+    for package_path, policy_path in policies.items():
+        policy_hash = policy_digest(policy_path) if policy_path is not None else None
+        if policy_hash is not None:
+            keys[package_path] = cache.key(package_path, input_hash, policy_hash)
+
+    cached = await cache.get_many(list(keys.values()))
+    results = {
+        path: mark_cached(cached[key]) for path, key in keys.items() if key in cached
+    }
+    missing = [path for path in policies if path not in results]
+    if missing:
+        evaluated = await _evaluate(evaluator, missing, input_data)
+        results.update(evaluated)
+        # A result without a decision (e.g. {} from a package that isn't loaded)
+        # is not cached, so it is re-evaluated once the policy is fixed
+        await cache.put_many(
+            {
+                keys[path]: result
+                for path, result in evaluated.items()
+                if path in keys and "compliant" in result
+            }
+        )
+    return {path: results[path] for path in policies}
+
+
+async def _evaluate(evaluator, package_paths: list[str], input_data: dict) -> dict[str, dict]:
+    if len(package_paths) == 1:
+        return {package_paths[0]: await evaluator.evaluate_policy(package_paths[0], input_data)}
+    return await evaluator.evaluate_policies(package_paths, input_data)
+
+
+_default_cache: DecisionCache | None = None
+
+
+def get_decision_cache() -> DecisionCache | None:
+    """The process-wide decision cache, or None when DECISION_CACHE_ENABLED is off."""
+    return _default_cache
+
+
+def configure_decision_cache(
+    redis_url: str | None, max_entries: int, ttl: int
+) -> DecisionCache:
+    """Set up the process-wide decision cache."""
+    global _default_cache
+    _default_cache = DecisionCache(redis_url=redis_url, max_entries=max_entries, ttl=ttl)
+    return _default_cache
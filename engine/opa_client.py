@@ -1,20 +1,128 @@
-"""OPA (Open Policy Agent) client for policy evaluation."""
+"""OPA (Open Policy Agent) client for policy evaluation.
+
+OPAClient keeps one keep-alive connection pool per event loop, shared by every
+task on that loop, so a control costs a request on an open connection rather
+than a new TCP handshake. Policy queries have no side effects, so requests that
+fail to connect, or lose a pooled connection OPA has since closed, are retried
+with jittered exponential backoff. A co-located sidecar can be reached over a
+Unix domain socket (OPA_SOCKET_PATH) to skip TCP altogether.
+"""
+
+import asyncio
+import json
+import random
+import weakref
 
 import httpx
 
 from worker.config import settings
 
 
+def rego_result_ref(package_path: str) -> str:
+    """Build a Rego reference to a package's result rule.
+
+    Uses bracket notation so every path segment is quoted, e.g.
+    "cis/microsoft_365_foundations/v3_1_0/control_1_1_1" ->
+    data["cis"]["microsoft_365_foundations"]["v3_1_0"]["control_1_1_1"]["result"]
+    """
+    segments = package_path.replace(".", "/").split("/") + ["result"]
+    return "data" + "".join(f"[{json.dumps(segment)}]" for segment in segments)
+
+
+# Transport errors after which a query is safe to resend: the connection could not
+# be made, or a pooled connection was closed by OPA before it answered
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.RemoteProtocolError,
+    httpx.ReadError,
+    httpx.WriteError,
+)
+
+
 class OPAClient:
     """Client for querying Open Policy Agent for policy evaluation."""
 
-    def __init__(self, base_url: str | None = None):
+    MAX_CONNECTIONS = 50
+    MAX_KEEPALIVE_CONNECTIONS = 20
+    KEEPALIVE_EXPIRY = 30.0
+    HEALTH_TIMEOUT = 5.0
+    # Backoff before retry n is uniform in [0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n)]
+    RETRY_BASE_DELAY = 0.05
+    RETRY_MAX_DELAY = 1.0
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        socket_path: str | None = None,
+        timeout: float | None = None,
+        max_retries: int | None = None,
+    ):
         """Initialize OPA client.
 
         Args:
             base_url: OPA server URL. Defaults to OPA_URL from settings.
+            socket_path: Unix domain socket OPA listens on. Defaults to
+                         OPA_SOCKET_PATH from settings; when set, requests go
+                         over the socket and base_url only names the host.
+            timeout: Request timeout in seconds. Defaults to OPA_TIMEOUT.
+            max_retries: Retries after a connection error. Defaults to OPA_MAX_RETRIES.
         """
         self.base_url = (base_url or settings.OPA_URL).rstrip("/")
+        self.socket_path = socket_path if socket_path is not None else settings.OPA_SOCKET_PATH
+        self.timeout = timeout if timeout is not None else settings.OPA_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else settings.OPA_MAX_RETRIES
+        # httpx clients are bound to the loop they were first used on, so each loop
+        # gets its own pool; it goes away with the loop if nobody closes it
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, httpx.AsyncClient
+        ] = weakref.WeakKeyDictionary()
+
+    def _create_http_client(self) -> httpx.AsyncClient:
+        transport = None
+        if self.socket_path:
+            transport = httpx.AsyncHTTPTransport(uds=self.socket_path)
+        return httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.MAX_CONNECTIONS,
+                max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=self.KEEPALIVE_EXPIRY,
+            ),
+            transport=transport,
+        )
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """The connection pool of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = self._clients[loop] = self._create_http_client()
+        return client
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request on the pool, retrying connection errors with backoff."""
+        client = self._http_client()
+        attempt = 0
+        while True:
+            try:
+                return await client.request(method, f"{self.base_url}{path}", **kwargs)
+            except RETRYABLE_ERRORS:
+                if attempt >= self.max_retries:
+                    raise
+            delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2**attempt)
+            await asyncio.sleep(random.uniform(0, delay))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        """Close the running event loop's connection pool."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
 
     async def evaluate_policy(
         self, package_path: str, input_data: dict
@@ -38,17 +146,54 @@ class OPAClient:
 
         # Query the specific "result" rule within the package
         # This gives us the compliance result directly without extra nesting
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{self.base_url}/v1/data/{url_path}/result",
-                json={"input": input_data},
-            )
-            response.raise_for_status()
-            result = response.json()
+        response = await self._request(
+            "POST", f"/v1/data/{url_path}/result", json={"input": input_data}
+        )
+        response.raise_for_status()
+        result = response.json()
 
         # OPA returns {"result": {...}} - extract the result
         return result.get("result", {})
 
+    async def evaluate_policies(
+        self, package_paths: list[str], input_data: dict
+    ) -> dict[str, dict]:
+        """Evaluate several policies against the same input in one OPA query.
+
+        The input is serialized and uploaded once, and the "result" document of
+        every package is bound to its own variable in a single ad-hoc query to
+        /v1/query. Each binding wraps the rule in a comprehension so a package
+        with an undefined result yields {} (matching evaluate_policy) instead of
+        making the whole query undefined.
+
+        Args:
+            package_paths: OPA package paths (e.g., ["cis/microsoft_365_foundations/v3_1_0/control_1_1_1"])
+            input_data: The data to evaluate (facts collected from the cloud)
+
+        Returns:
+            Mapping of each package path to its evaluation result.
+        """
+        if not package_paths:
+            return {}
+
+        query = "; ".join(
+            f"x{index} := [r | r := {rego_result_ref(path)}]"
+            for index, path in enumerate(package_paths)
+        )
+
+        response = await self._request(
+            "POST", "/v1/query", json={"query": query, "input": input_data}
+        )
+        response.raise_for_status()
+        result = response.json()
+
+        # OPA returns {"result": [{"x0": [...], "x1": [...]}]} - one binding set
+        bindings = (result.get("result") or [{}])[0]
+        return {
+            path: (bindings.get(f"x{index}") or [{}])[0]
+            for index, path in enumerate(package_paths)
+        }
+
     async def health_check(self) -> bool:
         """Check if OPA server is healthy.
 
@@ -56,12 +201,27 @@ class OPAClient:
             True if OPA is responding, False otherwise.
         """
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/health")
-                return response.status_code == 200
+            response = await self._request("GET", "/health", timeout=self.HEALTH_TIMEOUT)
+            return response.status_code == 200
         except Exception:
             return False
 
 
+def create_policy_client():
+    """Create the policy evaluator selected by the POLICY_EVALUATOR setting.
+
+    Returns:
+        OPAClient for "http" (the OPA sidecar), or EmbeddedPolicyEvaluator for
+        "embedded" (in-process rego-cpp). Both expose evaluate_policy,
+        evaluate_policies and health_check.
+    """
+    if settings.POLICY_EVALUATOR == "embedded":
+        from rego_evaluator import EmbeddedPolicyEvaluator
+
+        fallback = OPAClient() if settings.EMBEDDED_POLICY_FALLBACK else None
+        return EmbeddedPolicyEvaluator(fallback=fallback)
+    return OPAClient()
+
+
 # Default client instance
-opa_client = OPAClient()
+opa_client = create_policy_client()
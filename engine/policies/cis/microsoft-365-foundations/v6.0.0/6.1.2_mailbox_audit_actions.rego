@@ -21,28 +21,11 @@ package cis.microsoft_365_foundations.v6_0_0.control_6_1_2
 
 default result := {"compliant": false, "message": "Evaluation failed"}
 
-# Required audit actions per CIS benchmark
-required_admin_actions := {"ApplyRecord", "Copy", "Create", "FolderBind", "HardDelete", "Move", "MoveToDeletedItems", "SendAs", "SendOnBehalf", "SoftDelete", "Update", "UpdateCalendarDelegation", "UpdateFolderPermissions", "UpdateInboxRules"}
-required_delegate_actions := {"ApplyRecord", "Create", "FolderBind", "HardDelete", "Move", "MoveToDeletedItems", "SendAs", "SendOnBehalf", "SoftDelete", "Update", "UpdateFolderPermissions", "UpdateInboxRules"}
-required_owner_actions := {"ApplyRecord", "Create", "HardDelete", "MailboxLogin", "Move", "MoveToDeletedItems", "SoftDelete", "Update", "UpdateCalendarDelegation", "UpdateFolderPermissions", "UpdateInboxRules"}
-
-# Check if a mailbox has required audit actions
-mailbox_has_required_actions(mailbox) if {
-    admin_actions := {a | some a in mailbox.AuditAdmin}
-    delegate_actions := {a | some a in mailbox.AuditDelegate}
-    owner_actions := {a | some a in mailbox.AuditOwner}
-
-    count(required_admin_actions - admin_actions) == 0
-    count(required_delegate_actions - delegate_actions) == 0
-    count(required_owner_actions - owner_actions) == 0
-}
-
+# The collector checks each mailbox against the audit actions the CIS benchmark
+# requires (Admin, Delegate and Owner) and reports only the mailboxes missing some
 result := output if {
-    mailboxes := input.mailboxes
-    total := count(mailboxes)
-
-    # Find non-compliant mailboxes
-    non_compliant := [m.UserPrincipalName | some m in mailboxes; not mailbox_has_required_actions(m)]
+    total := input.total_user_mailboxes
+    non_compliant := [m.UserPrincipalName | some m in input.non_compliant_mailboxes]
 
     compliant := count(non_compliant) == 0
 
@@ -53,7 +36,8 @@ result := output if {
         "details": {
             "total_mailboxes": total,
             "compliant_mailboxes": total - count(non_compliant),
-            "non_compliant_mailboxes": count(non_compliant)
+            "non_compliant_mailboxes": count(non_compliant),
+            "missing_actions": {m.UserPrincipalName: m.missing | some m in input.non_compliant_mailboxes}
         }
     }
 }
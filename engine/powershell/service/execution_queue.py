@@ -0,0 +1,209 @@
+"""Bounded, cancellable execution of blocking PowerShell work.
+
+The endpoints are async, but running pwsh (or waiting on a pooled session)
+blocks. ExecutionQueue runs that work on a fixed pool of threads so the event
+loop keeps serving other requests and /health:
+
+- At most max_workers executions run at once; up to max_queued more wait for
+  a thread. Beyond that, submit() raises CapacityExceededError straight away
+  and the endpoint answers 429 with Retry-After.
+- While waiting, submit() polls whether the client is still connected. If it
+  went away the execution is cancelled: a queued one never starts, and a
+  running one has its cancel event set, which kills the pwsh process or
+  session it was waiting on.
+- stream() runs a generator the same way and relays its items through a small
+  buffer; the generator is paused while the consumer falls behind and
+  cancelled if the consumer stops.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+from executor import CANCEL_POLL_INTERVAL, PowerShellCancelledError
+
+# Items of a stream() buffered between the worker thread and the consumer
+STREAM_BUFFER_ITEMS = 64
+
+_END = object()
+
+
+class CapacityExceededError(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+    pass
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client went away before the execution finished."""
+
+    pass
+
+
+class ExecutionQueue:
+    """Thread pool with a bounded queue for blocking PowerShell executions."""
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 16):
+        """Initialize the queue.
+
+        Args:
+            max_workers: Executions running at once
+            max_queued: Executions allowed to wait for a worker
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pwsh")
+        # Running plus queued executions; only changed on the event loop thread
+        self._pending = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queued
+
+    def _check_capacity(self) -> None:
+        if self._pending >= self.capacity:
+            raise CapacityExceededError(
+                f"PowerShell service at capacity ({self.max_workers} running, "
+                f"{self.max_queued} queued)"
+            )
+
+    async def submit(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Run func(*args, cancel=event, **kwargs) on a worker thread.
+
+        Args:
+            func: Blocking callable that accepts a cancel threading.Event
+            is_disconnected: Coroutine function telling whether the client went away
+
+        Raises:
+            CapacityExceededError: If the queue is full
+            ClientDisconnectedError: If the client disconnected first
+        """
+        self._check_capacity()
+
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        self._pending += 1
+        future = self._executor.submit(functools.partial(func, *args, cancel=cancel, **kwargs))
+        # The slot is freed when the thread is done, not when the caller stops waiting
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+
+        waiter = asyncio.wrap_future(future)
+        try:
+            while True:
+                await asyncio.wait({waiter}, timeout=CANCEL_POLL_INTERVAL)
+                if waiter.done():
+                    break
+                if is_disconnected is not None and await is_disconnected():
+                    raise ClientDisconnectedError("Client disconnected")
+        except BaseException:
+            cancel.set()
+            future.cancel()
+            # Nobody reads the outcome now; retrieve it so it isn't logged as lost
+            waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+        return waiter.result()
+
+    def stream(
+        self, func: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        """Run the generator func(*args, cancel=event, **kwargs) on a worker thread.
+
+        Capacity is checked and the work queued immediately, so the caller can
+        still answer 429 before it starts a response. Closing the returned
+        iterator early cancels the generator.
+
+        Raises:
+            CapacityExceededError: If the queue is full
+        """
+        self._check_capacity()
+
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        channel: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=STREAM_BUFFER_ITEMS)
+
+        def produce() -> None:
+            items = func(*args, cancel=cancel, **kwargs)
+            try:
+                for item in items:
+                    self._put(loop, channel, (True, item), cancel)
+                self._put(loop, channel, (True, _END), cancel)
+            except PowerShellCancelledError:
+                pass
+            except BaseException as e:
+                if not cancel.is_set():
+                    self._put(loop, channel, (False, e), cancel)
+            finally:
+                # Stops the process or session if the consumer went away mid-stream
+                items.close()
+
+        self._pending += 1
+        future = self._executor.submit(produce)
+        future.add_done_callback(lambda _: self._release_from_thread(loop))
+        return self._consume(channel, cancel, future)
+
+    async def _consume(
+        self,
+        channel: "asyncio.Queue[Any]",
+        cancel: threading.Event,
+        future: concurrent.futures.Future,
+    ) -> AsyncIterator[Any]:
+        try:
+            while True:
+                ok, item = await channel.get()
+                if not ok:
+                    raise item
+                if item is _END:
+                    return
+                yield item
+        finally:
+            cancel.set()
+            future.cancel()
+
+    @staticmethod
+    def _put(
+        loop: asyncio.AbstractEventLoop,
+        channel: "asyncio.Queue[Any]",
+        item: Any,
+        cancel: threading.Event,
+    ) -> None:
+        """Hand an item to the consumer from the worker thread, waiting for room."""
+        try:
+            put = asyncio.run_coroutine_threadsafe(channel.put(item), loop)
+        except RuntimeError:
+            # The loop is closed; the service is shutting down
+            raise PowerShellCancelledError("PowerShell execution cancelled")
+        while True:
+            try:
+                put.result(timeout=CANCEL_POLL_INTERVAL)
+                return
+            except concurrent.futures.TimeoutError:
+                if cancel.is_set() or loop.is_closed():
+                    put.cancel()
+                    raise PowerShellCancelledError("PowerShell execution cancelled")
+
+    def _release(self) -> None:
+        self._pending -= 1
+
+    def _release_from_thread(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            # The loop is closed; the service is shutting down
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """Running plus queued executions, for the health endpoint."""
+        return {"pending": self._pending, "capacity": self.capacity}
+
+    def shutdown(self) -> None:
+        """Stop accepting work and cancel queued executions."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
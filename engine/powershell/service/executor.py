@@ -2,9 +2,14 @@
 
 import json
 import os
+import queue
 import re
 import subprocess
-from typing import Any, Dict, Optional
+import textwrap
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
 # NOTE: This validation function is duplicated in engine/worker/validators.py
 # because the powershell service is an isolated package. Keep both copies in sync.
@@ -46,6 +51,36 @@ class PowerShellExecutionError(Exception):
     pass
 
 
+class PowerShellCancelledError(PowerShellExecutionError):
+    """Raised when execution is cancelled because the client went away."""
+
+    pass
+
+
+# Seconds between checks for cancellation while waiting on pwsh
+CANCEL_POLL_INTERVAL = 0.5
+
+# ConvertTo-Json depth for full objects, and for output projected to a few properties
+FULL_JSON_DEPTH = 10
+PROJECTED_JSON_DEPTH = 3
+
+_PROPERTY_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Streaming scripts write each output object on its own line behind this
+# prefix, so host output (warnings, banners) can be told apart
+ITEM_MARKER = "__AUTOAUDIT_ITEM__"
+# Output lines buffered ahead of a slow reader; beyond that pwsh is paused
+STREAM_BUFFER_LINES = 256
+
+
+class CmdletCall(NamedTuple):
+    """One cmdlet to run: name, parameters and optional property projection."""
+
+    cmdlet: str
+    params: Dict[str, Any]
+    properties: Optional[List[str]] = None
+
+
 def build_param_string(params: Dict[str, Any]) -> str:
     """Build PowerShell parameter string from dict.
 
@@ -68,73 +103,286 @@ def build_param_string(params: Dict[str, Any]) -> str:
     return param_str
 
 
-def build_script(
-    module: str,
-    cmdlet: str,
-    params: Dict[str, Any],
-    tenant_id: str,
-) -> str:
-    """Build the PowerShell script to execute.
+def build_connect_script(module: str, tenant_id: str) -> str:
+    """Build the PowerShell script that imports a module and connects it.
 
     Args:
         module: The module to use (ExchangeOnline, Compliance, Teams)
-        cmdlet: The cmdlet to run
-        params: Parameters for the cmdlet
         tenant_id: Azure AD tenant ID
 
     Returns:
-        PowerShell script as a string
+        PowerShell script as a string. Tokens are read from $env:EXO_TOKEN,
+        or $env:GRAPH_TOKEN and $env:TEAMS_TOKEN for Teams.
     """
     tenant_id = validate_tenant_id(tenant_id)
-    param_str = build_param_string(params)
 
     if module == "ExchangeOnline":
         return f'''
 Import-Module ExchangeOnlineManagement
 Connect-ExchangeOnline -AccessToken $env:EXO_TOKEN -Organization "{tenant_id}" -ShowBanner:$false
-try {{
-    $result = {cmdlet}{param_str}
-    if ($null -eq $result) {{
-        Write-Output 'null'
-    }} else {{
-        $result | ConvertTo-Json -Depth 10
-    }}
-}} finally {{
-    Disconnect-ExchangeOnline -Confirm:$false -ErrorAction SilentlyContinue
-}}
 '''
     elif module == "Compliance":
         return f'''
 Import-Module ExchangeOnlineManagement
 Connect-IPPSSession -AccessToken $env:EXO_TOKEN -Organization "{tenant_id}" -ShowBanner:$false
-try {{
-    $result = {cmdlet}{param_str}
-    if ($null -eq $result) {{
-        Write-Output 'null'
-    }} else {{
-        $result | ConvertTo-Json -Depth 10
-    }}
-}} finally {{
-    Disconnect-ExchangeOnline -Confirm:$false -ErrorAction SilentlyContinue
-}}
 '''
     elif module == "Teams":
         return f'''
 Import-Module MicrosoftTeams
 Connect-MicrosoftTeams -AccessTokens @($env:GRAPH_TOKEN, $env:TEAMS_TOKEN) -TenantId "{tenant_id}"
+'''
+    else:
+        raise ValueError(f"Unsupported module: {module}")
+
+
+def build_disconnect_script(module: str) -> str:
+    """Build the PowerShell script that disconnects a module's session."""
+    if module in ("ExchangeOnline", "Compliance"):
+        return "Disconnect-ExchangeOnline -Confirm:$false -ErrorAction SilentlyContinue"
+    elif module == "Teams":
+        return "Disconnect-MicrosoftTeams -ErrorAction SilentlyContinue"
+    else:
+        raise ValueError(f"Unsupported module: {module}")
+
+
+def validate_properties(properties: List[str]) -> List[str]:
+    """Validate property names for Select-Object.
+
+    Only plain identifiers are allowed, since the names are interpolated into
+    the script.
+    """
+    for name in properties:
+        if not _PROPERTY_NAME_RE.match(name):
+            raise ValueError(f"Invalid property name: {name!r}")
+    return properties
+
+
+def _projection(
+    params: Dict[str, Any], properties: Optional[List[str]]
+) -> Tuple[str, int]:
+    """Parameter string (with any Select-Object projection) and JSON depth."""
+    param_str = build_param_string(params)
+    if not properties:
+        return param_str, FULL_JSON_DEPTH
+    param_str += " | Select-Object -Property " + ", ".join(validate_properties(properties))
+    return param_str, PROJECTED_JSON_DEPTH
+
+
+def build_cmdlet_script(
+    cmdlet: str,
+    params: Dict[str, Any],
+    properties: Optional[List[str]] = None,
+) -> str:
+    """Build the PowerShell script that runs a cmdlet and prints its JSON output.
+
+    Args:
+        cmdlet: The cmdlet to run
+        params: Parameters for the cmdlet
+        properties: Properties to keep. When given, the output is projected
+                    with Select-Object and serialized to PROJECTED_JSON_DEPTH
+                    instead of the full object graph.
+
+    Returns:
+        PowerShell script as a string
+    """
+    param_str, depth = _projection(params, properties)
+    return f'''
+$result = {cmdlet}{param_str}
+if ($null -eq $result) {{
+    Write-Output 'null'
+}} else {{
+    $result | ConvertTo-Json -Depth {depth}
+}}
+'''
+
+
+def build_stream_script(
+    cmdlet: str,
+    params: Dict[str, Any],
+    properties: Optional[List[str]] = None,
+) -> str:
+    """Build a script that writes each output object as its own JSON line.
+
+    Objects are serialized as the cmdlet emits them rather than collected
+    first, so neither pwsh nor the reader ever holds the whole result set.
+    Each line is ITEM_MARKER followed by compressed JSON.
+
+    Args:
+        cmdlet: The cmdlet to run
+        params: Parameters for the cmdlet
+        properties: Properties to keep (see build_cmdlet_script)
+
+    Returns:
+        PowerShell script as a string
+    """
+    param_str, depth = _projection(params, properties)
+    return f'''
+{cmdlet}{param_str} | ForEach-Object {{
+    '{ITEM_MARKER}' + ($_ | ConvertTo-Json -Depth {depth} -Compress)
+}}
+'''
+
+
+def build_script(
+    module: str,
+    cmdlet: str,
+    params: Dict[str, Any],
+    tenant_id: str,
+    properties: Optional[List[str]] = None,
+    stream: bool = False,
+) -> str:
+    """Build the PowerShell script to execute in a one-off pwsh process.
+
+    The script connects, runs the cmdlet and disconnects again.
+
+    Args:
+        module: The module to use (ExchangeOnline, Compliance, Teams)
+        cmdlet: The cmdlet to run
+        params: Parameters for the cmdlet
+        tenant_id: Azure AD tenant ID
+        properties: Properties to keep (see build_cmdlet_script)
+        stream: Write one JSON line per object (see build_stream_script)
+
+    Returns:
+        PowerShell script as a string
+    """
+    connect = build_connect_script(module, tenant_id)
+    build_run = build_stream_script if stream else build_cmdlet_script
+    run = build_run(cmdlet, params, properties).strip().replace("\n", "\n    ")
+    disconnect = build_disconnect_script(module)
+    return f'''{connect}try {{
+    {run}
+}} finally {{
+    {disconnect}
+}}
+'''
+
+
+def build_token_env(module: str, token: str, graph_token: Optional[str]) -> Dict[str, str]:
+    """Environment variables carrying the tokens a module connects with.
+
+    Raises:
+        ValueError: If Teams module requested without graph_token
+    """
+    if module == "Teams":
+        if not graph_token:
+            raise ValueError("Teams module requires graph_token")
+        return {"GRAPH_TOKEN": graph_token, "TEAMS_TOKEN": token}
+    return {"EXO_TOKEN": token}
+
+
+def parse_output(stdout: str) -> Any:
+    """Parse the JSON a cmdlet script printed.
+
+    Raises:
+        PowerShellExecutionError: If the output is not valid JSON
+    """
+    stdout = stdout.strip()
+    if not stdout or stdout == "null":
+        return None
+
+    try:
+        return json.loads(stdout)
+    except json.JSONDecodeError as e:
+        raise PowerShellExecutionError(
+            f"Failed to parse PowerShell output as JSON:\n{stdout}\nError: {e}"
+        )
+
+
+def build_batch_script(
+    module: str,
+    cmdlets: List[CmdletCall],
+    tenant_id: str,
+) -> str:
+    """Build a script that connects once and runs several cmdlets.
+
+    Each cmdlet runs in its own try/catch, and the script prints one JSON array
+    line with an {ok, output} or {ok, error} entry per cmdlet, in order.
+
+    Args:
+        module: The module to use (ExchangeOnline, Compliance, Teams)
+        cmdlets: Cmdlets to run
+        tenant_id: Azure AD tenant ID
+
+    Returns:
+        PowerShell script as a string
+    """
+    steps = ",\n".join(
+        "    {\n" + textwrap.indent(script.strip(), " " * 8) + "\n    }"
+        for script in (build_cmdlet_script(*call) for call in cmdlets)
+    )
+    connect = build_connect_script(module, tenant_id)
+    disconnect = build_disconnect_script(module)
+    return f'''{connect}$results = [System.Collections.Generic.List[object]]::new()
+$steps = @(
+{steps}
+)
 try {{
-    $result = {cmdlet}{param_str}
-    if ($null -eq $result) {{
-        Write-Output 'null'
-    }} else {{
-        $result | ConvertTo-Json -Depth 10
+    foreach ($step in $steps) {{
+        try {{
+            $output = & $step
+            $results.Add(@{{ ok = $true; output = (@($output) -join "`n") }})
+        }} catch {{
+            $results.Add(@{{ ok = $false; error = ($_ | Out-String) }})
+        }}
     }}
 }} finally {{
-    Disconnect-MicrosoftTeams -ErrorAction SilentlyContinue
+    {disconnect}
 }}
+ConvertTo-Json -InputObject $results.ToArray() -Depth 3 -Compress
 '''
-    else:
-        raise ValueError(f"Unsupported module: {module}")
+
+
+def _run_pwsh(
+    script: str,
+    token_env: Dict[str, str],
+    timeout: int = 120,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """Run a script in a one-off pwsh process and return its stdout.
+
+    Raises:
+        PowerShellExecutionError: If the process fails or times out
+        PowerShellCancelledError: If cancel is set while the process runs
+    """
+    # Set up environment with tokens
+    env = os.environ.copy()
+    env.update(token_env)
+
+    # Execute PowerShell
+    try:
+        proc = subprocess.Popen(
+            ["pwsh", "-NoProfile", "-NonInteractive", "-Command", script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+    except Exception as e:
+        raise PowerShellExecutionError(f"Failed to execute PowerShell: {e}")
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            stdout, stderr = proc.communicate(
+                timeout=min(CANCEL_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+            )
+            break
+        except subprocess.TimeoutExpired:
+            cancelled = cancel is not None and cancel.is_set()
+            if cancelled or time.monotonic() >= deadline:
+                proc.kill()
+                proc.communicate()
+                if cancelled:
+                    raise PowerShellCancelledError("PowerShell execution cancelled")
+                raise PowerShellExecutionError(
+                    f"PowerShell execution timed out after {timeout} seconds"
+                )
+
+    if proc.returncode != 0:
+        raise PowerShellExecutionError(f"PowerShell execution failed:\n{stderr}")
+
+    return stdout
 
 
 def execute_cmdlet(
@@ -144,6 +392,8 @@ def execute_cmdlet(
     tenant_id: str,
     token: str,
     graph_token: Optional[str] = None,
+    cancel: Optional[threading.Event] = None,
+    properties: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     """Execute a PowerShell cmdlet and return the result.
 
@@ -154,6 +404,8 @@ def execute_cmdlet(
         tenant_id: Azure AD tenant ID
         token: Access token for Exchange/Compliance
         graph_token: Graph API token (required for Teams)
+        cancel: Event that, once set, stops the execution
+        properties: Properties to keep (see build_cmdlet_script)
 
     Returns:
         Parsed JSON output from the cmdlet
@@ -162,45 +414,180 @@ def execute_cmdlet(
         PowerShellExecutionError: If execution fails
         ValueError: If Teams module requested without graph_token
     """
-    if module == "Teams" and not graph_token:
-        raise ValueError("Teams module requires graph_token")
+    # Tokens are passed through the environment, never the script
+    token_env = build_token_env(module, token, graph_token)
 
     # Build the script
-    script = build_script(module, cmdlet, params, tenant_id)
+    script = build_script(module, cmdlet, params, tenant_id, properties)
 
-    # Set up environment with tokens
-    env = os.environ.copy()
-    if module == "Teams":
-        env["GRAPH_TOKEN"] = graph_token
-        env["TEAMS_TOKEN"] = token
-    else:
-        env["EXO_TOKEN"] = token
+    # Parse JSON output
+    return parse_output(_run_pwsh(script, token_env, cancel=cancel))
 
-    # Execute PowerShell
+
+def execute_cmdlets(
+    module: str,
+    cmdlets: List[CmdletCall],
+    tenant_id: str,
+    token: str,
+    graph_token: Optional[str] = None,
+    cancel: Optional[threading.Event] = None,
+) -> List[Any]:
+    """Execute several cmdlets under one connection.
+
+    Args:
+        module: PowerShell module (ExchangeOnline, Compliance, Teams)
+        cmdlets: Cmdlets to run, in order; (cmdlet, params) pairs are accepted
+        tenant_id: Azure AD tenant ID
+        token: Access token for Exchange/Compliance
+        graph_token: Graph API token (required for Teams)
+        cancel: Event that, once set, stops the execution
+
+    Returns:
+        One entry per cmdlet, in order: its parsed JSON output, or the
+        PowerShellExecutionError it failed with.
+
+    Raises:
+        PowerShellExecutionError: If the connection or the process fails
+        ValueError: If Teams module requested without graph_token
+    """
+    token_env = build_token_env(module, token, graph_token)
+    cmdlets = [CmdletCall(*call) for call in cmdlets]
+    script = build_batch_script(module, cmdlets, tenant_id)
+    stdout = _run_pwsh(script, token_env, timeout=120 * len(cmdlets), cancel=cancel)
+
+    # The envelope is the last line; anything before it is host output
+    lines = [line for line in stdout.splitlines() if line.strip()]
     try:
-        proc = subprocess.run(
+        entries = json.loads(lines[-1]) if lines else None
+    except json.JSONDecodeError:
+        entries = None
+    if not isinstance(entries, list) or len(entries) != len(cmdlets):
+        raise PowerShellExecutionError(f"Failed to parse PowerShell batch output:\n{stdout}")
+
+    results: List[Any] = []
+    for entry in entries:
+        if not entry.get("ok"):
+            results.append(
+                PowerShellExecutionError(f"PowerShell execution failed:\n{entry.get('error')}")
+            )
+            continue
+        try:
+            results.append(parse_output(entry.get("output") or ""))
+        except PowerShellExecutionError as e:
+            results.append(e)
+    return results
+
+
+def put_until_stopped(lines: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """Put item on a bounded queue, blocking while it is full.
+
+    Returns:
+        False if stop was set first (the reader went away) and item was dropped.
+    """
+    while not stop.is_set():
+        try:
+            lines.put(item, timeout=CANCEL_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def parse_item(line: str) -> Any:
+    """Parse one ITEM_MARKER line of a streaming script's output.
+
+    Raises:
+        PowerShellExecutionError: If the line is not valid JSON
+    """
+    try:
+        return json.loads(line[len(ITEM_MARKER):])
+    except json.JSONDecodeError as e:
+        raise PowerShellExecutionError(
+            f"Failed to parse PowerShell output as JSON:\n{line}\nError: {e}"
+        )
+
+
+def _read_items(stdout, lines: queue.Queue, stop: threading.Event) -> None:
+    for line in stdout:
+        if line.startswith(ITEM_MARKER) and not put_until_stopped(lines, line.rstrip("\n"), stop):
+            return
+    # End of output: the process exited
+    put_until_stopped(lines, None, stop)
+
+
+def stream_cmdlet(
+    module: str,
+    cmdlet: str,
+    params: Dict[str, Any],
+    tenant_id: str,
+    token: str,
+    graph_token: Optional[str] = None,
+    cancel: Optional[threading.Event] = None,
+    properties: Optional[List[str]] = None,
+    timeout: float = 120,
+) -> Iterator[Any]:
+    """Execute a PowerShell cmdlet and yield its output objects as pwsh emits them.
+
+    Same arguments as execute_cmdlet. At most STREAM_BUFFER_LINES objects are
+    buffered; pwsh is paused while the caller falls behind, and killed if the
+    caller stops iterating.
+
+    Args:
+        timeout: Seconds allowed without output before the execution is abandoned
+
+    Raises:
+        PowerShellExecutionError: If execution fails, possibly after some
+            objects were yielded
+        PowerShellCancelledError: If cancel is set while the process runs
+        ValueError: If Teams module requested without graph_token
+    """
+    token_env = build_token_env(module, token, graph_token)
+    script = build_script(module, cmdlet, params, tenant_id, properties, stream=True)
+
+    env = os.environ.copy()
+    env.update(token_env)
+    try:
+        proc = subprocess.Popen(
             ["pwsh", "-NoProfile", "-NonInteractive", "-Command", script],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=120,
+            bufsize=1,
             env=env,
         )
-    except subprocess.TimeoutExpired:
-        raise PowerShellExecutionError("PowerShell execution timed out after 120 seconds")
     except Exception as e:
         raise PowerShellExecutionError(f"Failed to execute PowerShell: {e}")
 
-    if proc.returncode != 0:
-        raise PowerShellExecutionError(f"PowerShell execution failed:\n{proc.stderr}")
-
-    # Parse JSON output
-    stdout = proc.stdout.strip()
-    if not stdout or stdout == "null":
-        return None
+    lines: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=STREAM_BUFFER_LINES)
+    stderr: deque = deque(maxlen=50)
+    stop = threading.Event()
+    threading.Thread(target=_read_items, args=(proc.stdout, lines, stop), daemon=True).start()
+    threading.Thread(target=stderr.extend, args=(proc.stderr,), daemon=True).start()
 
     try:
-        return json.loads(stdout)
-    except json.JSONDecodeError as e:
-        raise PowerShellExecutionError(
-            f"Failed to parse PowerShell output as JSON:\n{stdout}\nError: {e}"
-        )
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise PowerShellCancelledError("PowerShell execution cancelled")
+            try:
+                line = lines.get(
+                    timeout=min(CANCEL_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+                )
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise PowerShellExecutionError(
+                        f"PowerShell execution produced no output for {timeout:g} seconds"
+                    )
+                continue
+            if line is None:
+                break
+            deadline = time.monotonic() + timeout
+            yield parse_item(line)
+
+        if proc.wait() != 0:
+            raise PowerShellExecutionError(f"PowerShell execution failed:\n{''.join(stderr)}")
+    finally:
+        stop.set()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
@@ -1,25 +1,114 @@
 """FastAPI service for PowerShell cmdlet execution."""
 
-from fastapi import FastAPI, HTTPException
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from schemas import (
+    ExecuteBatchRequest,
+    ExecuteBatchResponse,
+    ExecuteRequest,
+    ExecuteResponse,
+    HealthResponse,
+)
+from executor import (
+    CmdletCall,
+    PowerShellExecutionError,
+    build_token_env,
+    execute_cmdlet,
+    execute_cmdlets,
+    stream_cmdlet,
+)
+from execution_queue import CapacityExceededError, ClientDisconnectedError, ExecutionQueue
+from result_cache import DEFAULT_TTLS, ResultCache, parse_ttls
+from session_pool import SessionPool
+
+# Connected pwsh sessions kept warm, keyed by tenant and module. Each uses
+# roughly 150-250 MB; PS_SESSION_POOL_SIZE=0 runs every cmdlet in a fresh process.
+PS_SESSION_POOL_SIZE = int(os.environ.get("PS_SESSION_POOL_SIZE", "4"))
+PS_SESSION_IDLE_TTL = float(os.environ.get("PS_SESSION_IDLE_TTL", "900"))
+
+# Executions running at once, and how many more may wait before requests get 429
+PS_MAX_CONCURRENCY = int(
+    os.environ.get("PS_MAX_CONCURRENCY", str(max(PS_SESSION_POOL_SIZE, 1)))
+)
+PS_MAX_QUEUED = int(os.environ.get("PS_MAX_QUEUED", "16"))
+# Retry-After (seconds) sent with 429 responses
+PS_RETRY_AFTER = int(os.environ.get("PS_RETRY_AFTER", "5"))
+
+# Results of tenant-wide configuration cmdlets reused for a TTL. PS_RESULT_CACHE_TTLS
+# ("Get-OrganizationConfig=300,...") adds to or overrides the default TTLs;
+# PS_RESULT_CACHE_SIZE=0 disables the cache.
+PS_RESULT_CACHE_SIZE = int(os.environ.get("PS_RESULT_CACHE_SIZE", "1024"))
+PS_RESULT_CACHE_TTLS = {**DEFAULT_TTLS, **parse_ttls(os.environ.get("PS_RESULT_CACHE_TTLS", ""))}
+PS_RESULT_CACHE_DEFAULT_TTL = float(os.environ.get("PS_RESULT_CACHE_DEFAULT_TTL", "0"))
+
+session_pool = (
+    SessionPool(max_sessions=PS_SESSION_POOL_SIZE, idle_ttl=PS_SESSION_IDLE_TTL)
+    if PS_SESSION_POOL_SIZE > 0
+    else None
+)
+execution_queue = ExecutionQueue(max_workers=PS_MAX_CONCURRENCY, max_queued=PS_MAX_QUEUED)
+result_cache = (
+    ResultCache(
+        max_entries=PS_RESULT_CACHE_SIZE,
+        ttls=PS_RESULT_CACHE_TTLS,
+        default_ttl=PS_RESULT_CACHE_DEFAULT_TTL,
+    )
+    if PS_RESULT_CACHE_SIZE > 0
+    else None
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    execution_queue.shutdown()
+    if session_pool is not None:
+        session_pool.close()
 
-from schemas import ExecuteRequest, ExecuteResponse, HealthResponse
-from executor import execute_cmdlet, PowerShellExecutionError
 
 app = FastAPI(
     title="PowerShell Service",
     description="HTTP service for executing M365 PowerShell cmdlets",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
+@app.exception_handler(CapacityExceededError)
+async def capacity_exceeded_handler(request: Request, exc: CapacityExceededError):
+    """Tell the client to back off and retry when every worker is busy."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(PS_RETRY_AFTER)},
+    )
+
+
+@app.exception_handler(ClientDisconnectedError)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnectedError):
+    """The client is gone; nobody reads this response."""
+    return Response(status_code=499)
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return HealthResponse(status="ok")
+    return HealthResponse(
+        status="ok",
+        sessions=session_pool.stats() if session_pool is not None else None,
+        queue=execution_queue.stats(),
+        result_cache=result_cache.stats() if result_cache is not None else None,
+    )
 
 
 @app.post("/execute", response_model=ExecuteResponse)
-async def execute(request: ExecuteRequest):
+async def execute(request: ExecuteRequest, http_request: Request):
     """Execute a PowerShell cmdlet.
 
     Args:
@@ -28,16 +117,39 @@ async def execute(request: ExecuteRequest):
     Returns:
         ExecuteResponse with success status and data or error
     """
+    key = None
+    if result_cache is not None:
+        key = result_cache.key(
+            request.tenant_id,
+            request.module,
+            request.cmdlet,
+            request.params,
+            request.token,
+            request.properties,
+        )
+        if not request.no_cache:
+            hit, result = result_cache.get(key)
+            if hit:
+                return ExecuteResponse(success=True, data=result, cached=True)
+
+    run = session_pool.execute_cmdlet if session_pool is not None else execute_cmdlet
     try:
-        result = execute_cmdlet(
+        result = await execution_queue.submit(
+            run,
             module=request.module,
             cmdlet=request.cmdlet,
             params=request.params,
             tenant_id=request.tenant_id,
             token=request.token,
             graph_token=request.graph_token,
+            properties=request.properties,
+            is_disconnected=http_request.is_disconnected,
         )
+        if key is not None:
+            result_cache.put(key, result)
         return ExecuteResponse(success=True, data=result)
+    except (CapacityExceededError, ClientDisconnectedError):
+        raise
     except ValueError as e:
         # Invalid request (e.g., Teams without graph_token)
         raise HTTPException(status_code=400, detail=str(e))
@@ -47,3 +159,123 @@ async def execute(request: ExecuteRequest):
     except Exception as e:
         # Unexpected error
         return ExecuteResponse(success=False, error=f"Unexpected error: {e}")
+
+
+@app.post("/execute-batch", response_model=ExecuteBatchResponse)
+async def execute_batch(request: ExecuteBatchRequest, http_request: Request):
+    """Execute several cmdlets for one tenant and module under one connection.
+
+    Args:
+        request: Batch request with module, cmdlets, and auth
+
+    Returns:
+        ExecuteBatchResponse with one result or error per cmdlet, in order
+    """
+    responses: List[Optional[ExecuteResponse]] = [None] * len(request.cmdlets)
+    keys = [None] * len(request.cmdlets)
+    if result_cache is not None:
+        for index, item in enumerate(request.cmdlets):
+            keys[index] = result_cache.key(
+                request.tenant_id,
+                request.module,
+                item.cmdlet,
+                item.params,
+                request.token,
+                item.properties,
+            )
+            if not request.no_cache:
+                hit, result = result_cache.get(keys[index])
+                if hit:
+                    responses[index] = ExecuteResponse(success=True, data=result, cached=True)
+
+    # Only the cmdlets without a cached result are executed
+    missing = [index for index, response in enumerate(responses) if response is None]
+    if not missing:
+        return ExecuteBatchResponse(success=True, results=responses)
+
+    run = session_pool.execute_cmdlets if session_pool is not None else execute_cmdlets
+    try:
+        results = await execution_queue.submit(
+            run,
+            module=request.module,
+            cmdlets=[
+                CmdletCall(item.cmdlet, item.params, item.properties)
+                for item in (request.cmdlets[i] for i in missing)
+            ],
+            tenant_id=request.tenant_id,
+            token=request.token,
+            graph_token=request.graph_token,
+            is_disconnected=http_request.is_disconnected,
+        )
+    except (CapacityExceededError, ClientDisconnectedError):
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PowerShellExecutionError as e:
+        return ExecuteBatchResponse(success=False, error=str(e))
+    except Exception as e:
+        return ExecuteBatchResponse(success=False, error=f"Unexpected error: {e}")
+
+    for index, result in zip(missing, results):
+        if isinstance(result, PowerShellExecutionError):
+            responses[index] = ExecuteResponse(success=False, error=str(result))
+            continue
+        if keys[index] is not None:
+            result_cache.put(keys[index], result)
+        responses[index] = ExecuteResponse(success=True, data=result)
+
+    return ExecuteBatchResponse(success=True, results=responses)
+
+
+@app.post("/execute-stream")
+async def execute_stream(request: ExecuteRequest):
+    """Execute a PowerShell cmdlet and stream its output objects as NDJSON.
+
+    Objects are sent as pwsh emits them, so large result sets (every mailbox
+    of a tenant) are never held in memory. Each line is {"item": ...}; the
+    last line is {"done": true, "count": n}, or {"error": "..."} if the
+    execution failed, possibly after some items. The result cache is not used.
+
+    Args:
+        request: Execution request with module, cmdlet, params, and auth
+
+    Returns:
+        StreamingResponse of application/x-ndjson
+    """
+    try:
+        # Reject bad requests before the 200 status is sent
+        build_token_env(request.module, request.token, request.graph_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    run = session_pool.stream_cmdlet if session_pool is not None else stream_cmdlet
+    items = execution_queue.stream(
+        run,
+        module=request.module,
+        cmdlet=request.cmdlet,
+        params=request.params,
+        tenant_id=request.tenant_id,
+        token=request.token,
+        graph_token=request.graph_token,
+        properties=request.properties,
+    )
+    return StreamingResponse(_ndjson(items), media_type="application/x-ndjson")
+
+
+async def _ndjson(items: AsyncIterator[Any]) -> AsyncIterator[str]:
+    """Frame streamed cmdlet output as NDJSON, ending with a done or error line."""
+    count = 0
+    try:
+        async for item in items:
+            count += 1
+            yield json.dumps({"item": item}) + "\n"
+    except PowerShellExecutionError as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    except Exception as e:
+        yield json.dumps({"error": f"Unexpected error: {e}"}) + "\n"
+        return
+    finally:
+        # Cancels the execution if the client went away mid-stream
+        await items.aclose()
+    yield json.dumps({"done": True, "count": count}) + "\n"
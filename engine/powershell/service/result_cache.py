@@ -0,0 +1,137 @@
+"""TTL cache of cmdlet results.
+
+Tenant-wide configuration cmdlets (Get-OrganizationConfig, Get-TransportConfig,
+...) return the same data for every control that reads them and for
+back-to-back scans. ResultCache keeps successful results for a per-cmdlet TTL
+so repeated and concurrent requests skip the Exchange round trip altogether:
+
+- Entries are keyed by tenant, module, cmdlet, canonical (sorted JSON) params,
+  the projected properties, and a hash of the access token. A hit therefore requires the caller to
+  present the token that fetched the result, so the cache never answers a
+  request the caller couldn't have made itself. Workers share tokens through
+  the MSAL cache, so scans within a token's lifetime still share entries.
+- Only cmdlets with a TTL are cached; failures never are.
+- Requests can bypass the cache; their fresh result replaces the entry.
+- At most max_entries are kept, least recently used evicted first.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+CacheKey = Tuple[str, str, str, str, str, str]
+
+# Read-only, tenant-wide configuration cmdlets and how long (seconds) their
+# results are reused unless PS_RESULT_CACHE_TTLS overrides them
+DEFAULT_TTLS: Dict[str, float] = {
+    "Get-OrganizationConfig": 300,
+    "Get-AdminAuditLogConfig": 300,
+    "Get-ExternalInOutlook": 300,
+    "Get-TransportConfig": 300,
+    "Get-HostedOutboundSpamFilterPolicy": 300,
+    "Get-SharingPolicy": 300,
+    "Get-OwaMailboxPolicy": 300,
+    "Get-RoleAssignmentPolicy": 300,
+    "Get-AtpPolicyForO365": 300,
+    "Get-CsTenantFederationConfiguration": 300,
+    "Get-CsTeamsClientConfiguration": 300,
+}
+
+
+def parse_ttls(value: str) -> Dict[str, float]:
+    """Parse "Cmdlet=seconds,Cmdlet=seconds" into a TTL map."""
+    ttls = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        cmdlet, _, seconds = item.partition("=")
+        ttls[cmdlet.strip()] = float(seconds)
+    return ttls
+
+
+class ResultCache:
+    """Size-bounded LRU cache of cmdlet results with per-cmdlet TTLs."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 0.0,
+    ):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of results kept
+            ttls: Seconds to keep each cmdlet's results, by cmdlet name
+                  (case-insensitive). Defaults to DEFAULT_TTLS.
+            default_ttl: TTL of cmdlets not in ttls; 0 leaves them uncached
+        """
+        self.max_entries = max_entries
+        self.ttls = {
+            cmdlet.lower(): ttl for cmdlet, ttl in (DEFAULT_TTLS if ttls is None else ttls).items()
+        }
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ttl_for(self, cmdlet: str) -> float:
+        return self.ttls.get(cmdlet.lower(), self.default_ttl)
+
+    @staticmethod
+    def key(
+        tenant_id: str,
+        module: str,
+        cmdlet: str,
+        params: Dict[str, Any],
+        token: str,
+        properties: Optional[List[str]] = None,
+    ) -> CacheKey:
+        """Build a cache key; params are canonicalized so key order doesn't matter."""
+        return (
+            tenant_id.lower(),
+            module,
+            cmdlet.lower(),
+            json.dumps(params, sort_keys=True, default=str),
+            ",".join(sorted(properties)) if properties else "",
+            hashlib.sha256(token.encode()).hexdigest(),
+        )
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        """Look up a result.
+
+        Returns:
+            (hit, result). result is None on a miss.
+        """
+        if self.ttl_for(key[2]) <= 0:
+            return False, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key: CacheKey, result: Any) -> None:
+        """Store a successful result, if its cmdlet is cached."""
+        ttl = self.ttl_for(key[2])
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (result, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counts and entries, for the health endpoint."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
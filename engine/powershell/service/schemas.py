@@ -1,10 +1,10 @@
 """Pydantic schemas for PowerShell service API."""
 
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field, field_validator
 
-from executor import validate_tenant_id
+from executor import validate_properties, validate_tenant_id
 
 
 class ExecuteRequest(BaseModel):
@@ -20,6 +20,15 @@ class ExecuteRequest(BaseModel):
         default_factory=dict,
         description="Parameters to pass to the cmdlet",
     )
+    properties: Optional[List[str]] = Field(
+        default=None,
+        description="Properties to return (Select-Object); omit for full objects",
+    )
+
+    @field_validator("properties")
+    @classmethod
+    def check_property_names(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        return validate_properties(v) if v else v
     tenant_id: str = Field(description="Azure AD tenant ID (GUID or verified domain)")
 
     @field_validator("tenant_id")
@@ -31,6 +40,10 @@ class ExecuteRequest(BaseModel):
         default=None,
         description="Graph API token (required for Teams module)",
     )
+    no_cache: bool = Field(
+        default=False,
+        description="Bypass the result cache; the fresh result replaces any cached one",
+    )
 
 
 class ExecuteResponse(BaseModel):
@@ -39,9 +52,82 @@ class ExecuteResponse(BaseModel):
     success: bool = Field(description="Whether execution succeeded")
     data: Any = Field(default=None, description="Cmdlet output as JSON")
     error: Optional[str] = Field(default=None, description="Error message if failed")
+    cached: bool = Field(default=False, description="Whether data came from the result cache")
+
+
+class BatchCmdlet(BaseModel):
+    """One cmdlet of a batch request."""
+
+    cmdlet: str = Field(
+        description="PowerShell cmdlet to execute (e.g., Get-OrganizationConfig)"
+    )
+    params: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Parameters to pass to the cmdlet",
+    )
+    properties: Optional[List[str]] = Field(
+        default=None,
+        description="Properties to return (Select-Object); omit for full objects",
+    )
+
+    @field_validator("properties")
+    @classmethod
+    def check_property_names(cls, v: Optional[List[str]]) -> Optional[List[str]]:
+        return validate_properties(v) if v else v
+
+
+class ExecuteBatchRequest(BaseModel):
+    """Request to execute several cmdlets under one connection."""
+
+    module: Literal["ExchangeOnline", "Compliance", "Teams"] = Field(
+        description="PowerShell module to use"
+    )
+    cmdlets: List[BatchCmdlet] = Field(
+        min_length=1,
+        max_length=50,
+        description="Cmdlets to execute, in order",
+    )
+    tenant_id: str = Field(description="Azure AD tenant ID (GUID or verified domain)")
+
+    @field_validator("tenant_id")
+    @classmethod
+    def check_tenant_id_format(cls, v: str) -> str:
+        return validate_tenant_id(v)
+    token: str = Field(description="Access token for Exchange/Compliance")
+    graph_token: Optional[str] = Field(
+        default=None,
+        description="Graph API token (required for Teams module)",
+    )
+    no_cache: bool = Field(
+        default=False,
+        description="Bypass the result cache; the fresh result replaces any cached one",
+    )
+
+
+class ExecuteBatchResponse(BaseModel):
+    """Response from a batch execution."""
+
+    success: bool = Field(description="Whether the connection succeeded")
+    results: List[ExecuteResponse] = Field(
+        default_factory=list,
+        description="One result per requested cmdlet, in request order",
+    )
+    error: Optional[str] = Field(default=None, description="Error message if the batch failed")
 
 
 class HealthResponse(BaseModel):
     """Health check response."""
 
     status: str = "ok"
+    sessions: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="Session pool counts (idle, busy, max), if the pool is enabled",
+    )
+    queue: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="Executions running or queued, and the service's capacity",
+    )
+    result_cache: Optional[Dict[str, int]] = Field(
+        default=None,
+        description="Result cache hit/miss counts, if the cache is enabled",
+    )
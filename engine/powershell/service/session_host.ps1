@@ -0,0 +1,46 @@
+# Long-lived PowerShell session host for the service's session pool.
+#
+# Reads one JSON request per line from stdin:
+#   {"id": 1, "script": "...", "env": {"EXO_TOKEN": "..."}}
+# sets the given environment variables, runs the script in this session (so
+# imported modules and connections persist between requests), and writes one
+# response line to stdout. Responses carry a marker prefix so that anything
+# else a cmdlet writes to the host is ignored by the reader:
+#   __AUTOAUDIT_RESPONSE__{"id": 1, "ok": true, "output": "..."}
+#   __AUTOAUDIT_RESPONSE__{"id": 1, "ok": false, "error": "..."}
+#
+# Requests with "stream": true write each line of the script's output as soon
+# as it is produced instead of collecting it into "output"; their response
+# line follows the last one. Streaming scripts mark their own output lines.
+
+$ProgressPreference = 'SilentlyContinue'
+$marker = '__AUTOAUDIT_RESPONSE__'
+
+while ($null -ne ($line = [Console]::In.ReadLine())) {
+    if (-not $line.Trim()) {
+        continue
+    }
+    $request = $line | ConvertFrom-Json
+    try {
+        if ($request.env) {
+            foreach ($property in $request.env.PSObject.Properties) {
+                [Environment]::SetEnvironmentVariable($property.Name, [string]$property.Value)
+            }
+        }
+        $script = [scriptblock]::Create($request.script)
+        if ($request.stream) {
+            & $script | ForEach-Object {
+                [Console]::Out.WriteLine([string]$_)
+                [Console]::Out.Flush()
+            }
+            $response = @{ id = $request.id; ok = $true; output = '' }
+        } else {
+            $output = & $script
+            $response = @{ id = $request.id; ok = $true; output = (@($output) -join "`n") }
+        }
+    } catch {
+        $response = @{ id = $request.id; ok = $false; error = ($_ | Out-String) }
+    }
+    [Console]::Out.WriteLine($marker + ($response | ConvertTo-Json -Compress -Depth 3))
+    [Console]::Out.Flush()
+}
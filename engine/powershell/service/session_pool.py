@@ -0,0 +1,534 @@
+"""Pool of long-lived, connected PowerShell sessions.
+
+A one-off pwsh process spends 10-30 seconds importing ExchangeOnlineManagement
+and connecting before it runs a cmdlet, then throws the connection away. The
+pool keeps pwsh processes running session_host.ps1 instead, one per
+(tenant, module), already imported and connected, and runs each cmdlet on an
+idle one:
+
+- A session serves one cmdlet at a time; concurrent requests for the same
+  tenant and module get separate sessions.
+- At most max_sessions are kept. When a new one is needed the least recently
+  used idle session is closed; if every session is busy the new one is used
+  once and closed.
+- Idle sessions are closed after idle_ttl seconds, and every session after
+  max_age seconds.
+- Sessions idle for more than health_check_interval are probed before reuse
+  and replaced if the probe fails.
+- Each session remembers the token it connected with. A request carrying a
+  different token (the caller refreshed it) reconnects the session first.
+
+Tokens live only in the environment of their own tenant's session processes.
+"""
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from executor import (
+    CANCEL_POLL_INTERVAL,
+    ITEM_MARKER,
+    STREAM_BUFFER_LINES,
+    CmdletCall,
+    PowerShellCancelledError,
+    PowerShellExecutionError,
+    build_cmdlet_script,
+    build_connect_script,
+    build_disconnect_script,
+    build_stream_script,
+    build_token_env,
+    parse_item,
+    parse_output,
+    put_until_stopped,
+    validate_properties,
+    validate_tenant_id,
+)
+
+logger = logging.getLogger(__name__)
+
+SESSION_HOST_SCRIPT = Path(__file__).parent / "session_host.ps1"
+RESPONSE_MARKER = "__AUTOAUDIT_RESPONSE__"
+
+# Cheap probes run on a session before reusing it after a quiet period
+HEALTH_SCRIPTS = {
+    "ExchangeOnline": (
+        "if (-not (Get-ConnectionInformation | Where-Object { $_.State -eq 'Connected' })) "
+        "{ throw 'Exchange Online session is not connected' }"
+    ),
+    "Compliance": (
+        "if (-not (Get-ConnectionInformation | Where-Object { $_.State -eq 'Connected' })) "
+        "{ throw 'Compliance session is not connected' }"
+    ),
+    # MicrosoftTeams has no connection-state cmdlet; check the process answers
+    "Teams": "'ok'",
+}
+
+SessionKey = Tuple[str, str]
+
+
+class PowerShellSession:
+    """One pwsh process running session_host.ps1 for a tenant and module."""
+
+    def __init__(self, tenant_id: str, module: str, command: Optional[List[str]] = None):
+        """Start the session process.
+
+        Args:
+            tenant_id: Tenant the session connects to
+            module: PowerShell module (ExchangeOnline, Compliance, Teams)
+            command: Command line of the session host. Defaults to pwsh
+                     running session_host.ps1.
+        """
+        self.tenant_id = tenant_id
+        self.module = module
+        self.token: Optional[str] = None
+        self.created_at = self.last_used = self.last_checked = time.monotonic()
+        self._next_id = 0
+        # Bounded, so a streaming script is paused while its reader falls behind
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=STREAM_BUFFER_LINES)
+        self._stopped = threading.Event()
+        self._stderr: deque = deque(maxlen=50)
+
+        if command is None:
+            command = ["pwsh", "-NoProfile", "-NonInteractive", "-File", str(SESSION_HOST_SCRIPT)]
+        try:
+            self._proc = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+                env=os.environ.copy(),
+            )
+        except Exception as e:
+            raise PowerShellExecutionError(f"Failed to execute PowerShell: {e}")
+
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+    @property
+    def key(self) -> SessionKey:
+        return (self.tenant_id, self.module)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.poll() is None
+
+    def _read_stdout(self) -> None:
+        for line in self._proc.stdout:
+            if line.startswith((RESPONSE_MARKER, ITEM_MARKER)):
+                if not put_until_stopped(self._lines, line.rstrip("\n"), self._stopped):
+                    return
+        # End of output: the process exited
+        put_until_stopped(self._lines, None, self._stopped)
+
+    def _read_stderr(self) -> None:
+        for line in self._proc.stderr:
+            self._stderr.append(line)
+
+    def run(
+        self,
+        script: str,
+        env: Optional[Dict[str, str]] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+    ) -> str:
+        """Run a script in the session and return what it wrote to the output stream.
+
+        Args:
+            script: PowerShell script to run
+            env: Environment variables to set in the session first
+            timeout: Seconds to wait for the script to finish
+            cancel: Event that, once set, stops waiting and closes the session
+
+        Raises:
+            PowerShellExecutionError: If the script fails, times out or the
+                session exits. The session is closed unless the script itself
+                failed.
+            PowerShellCancelledError: If cancel is set before the script finishes.
+        """
+        request_id = self._send(script, env)
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._next_line(deadline, timeout, cancel)
+            if line.startswith(RESPONSE_MARKER):
+                response = json.loads(line[len(RESPONSE_MARKER):])
+                # Responses to earlier, timed-out requests can't arrive (the
+                # session is closed on timeout), but skip them defensively
+                if response.get("id") == request_id:
+                    break
+
+        if not response.get("ok"):
+            raise PowerShellExecutionError(f"PowerShell execution failed:\n{response.get('error')}")
+        return response.get("output") or ""
+
+    def stream(
+        self,
+        script: str,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+    ) -> Iterator[Any]:
+        """Run a streaming script (see build_stream_script) and yield its objects.
+
+        Args:
+            script: PowerShell script writing ITEM_MARKER lines
+            timeout: Seconds allowed between objects
+            cancel: Event that, once set, stops waiting and closes the session
+
+        Raises:
+            Same as run(). A caller that stops iterating early must close the
+            session: it is still running the script.
+        """
+        request_id = self._send(script, None, stream=True)
+        while True:
+            line = self._next_line(time.monotonic() + timeout, timeout, cancel)
+            if line.startswith(ITEM_MARKER):
+                yield parse_item(line)
+                continue
+            response = json.loads(line[len(RESPONSE_MARKER):])
+            if response.get("id") != request_id:
+                continue
+            if not response.get("ok"):
+                raise PowerShellExecutionError(
+                    f"PowerShell execution failed:\n{response.get('error')}"
+                )
+            return
+
+    def _send(self, script: str, env: Optional[Dict[str, str]], stream: bool = False) -> int:
+        """Write a request to the session host; returns its id."""
+        self._next_id += 1
+        request = {"id": self._next_id, "script": script, "env": env or {}, "stream": stream}
+        try:
+            self._proc.stdin.write(json.dumps(request) + "\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            self.close()
+            raise PowerShellExecutionError(
+                f"PowerShell session exited unexpectedly:\n{''.join(self._stderr)}"
+            )
+        return self._next_id
+
+    def _next_line(
+        self, deadline: float, timeout: float, cancel: Optional[threading.Event]
+    ) -> str:
+        """Wait for the host's next marked output line."""
+        while True:
+            try:
+                line = self._lines.get(
+                    timeout=min(CANCEL_POLL_INTERVAL, max(0.0, deadline - time.monotonic()))
+                )
+            except queue.Empty:
+                # The script can't be interrupted in place; the session goes
+                if cancel is not None and cancel.is_set():
+                    self.close()
+                    raise PowerShellCancelledError("PowerShell execution cancelled")
+                if time.monotonic() >= deadline:
+                    self.close()
+                    raise PowerShellExecutionError(
+                        f"PowerShell execution timed out after {timeout:g} seconds"
+                    )
+                continue
+            if line is None:
+                self.close()
+                raise PowerShellExecutionError(
+                    f"PowerShell session exited unexpectedly:\n{''.join(self._stderr)}"
+                )
+            return line
+
+    def connect(
+        self,
+        env: Dict[str, str],
+        token: str,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+    ) -> None:
+        """(Re)connect the session's module with the given tokens."""
+        self.run(
+            build_connect_script(self.module, self.tenant_id),
+            env=env,
+            timeout=timeout,
+            cancel=cancel,
+        )
+        self.token = token
+        self.last_checked = time.monotonic()
+
+    def check_health(self, timeout: float = 30) -> bool:
+        """Probe the session; False if the process or its connection is gone."""
+        if not self.alive:
+            return False
+        try:
+            self.run(HEALTH_SCRIPTS[self.module], timeout=timeout)
+        except PowerShellExecutionError as e:
+            logger.info("PowerShell session for %s/%s failed health check: %s", *self.key, e)
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    def close(self, disconnect: bool = True) -> None:
+        """Disconnect (best effort, unless disconnect is False) and stop the process."""
+        if disconnect and self.alive and self.token is not None:
+            self.token = None
+            try:
+                self.run(build_disconnect_script(self.module), timeout=10)
+            except PowerShellExecutionError:
+                pass
+        if self.alive:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        self._stopped.set()
+        for stream in (self._proc.stdin, self._proc.stdout, self._proc.stderr):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+class SessionPool:
+    """Connected PowerShell sessions keyed by (tenant_id, module)."""
+
+    def __init__(
+        self,
+        max_sessions: int = 4,
+        idle_ttl: float = 900.0,
+        max_age: float = 4 * 3600.0,
+        health_check_interval: float = 60.0,
+        command: Optional[List[str]] = None,
+    ):
+        """Initialize the pool.
+
+        Args:
+            max_sessions: Maximum number of sessions kept (each is a pwsh process)
+            idle_ttl: Seconds an idle session is kept
+            max_age: Seconds after which a session is replaced
+            health_check_interval: Idle seconds after which a session is probed before reuse
+            command: Session host command line (for tests); defaults to pwsh
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+        self.command = command
+        # Idle sessions, least recently used first
+        self._idle: "OrderedDict[PowerShellSession, None]" = OrderedDict()
+        self._busy = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _expired(self, session: PowerShellSession, now: float) -> bool:
+        return (
+            not session.alive
+            or now - session.last_used > self.idle_ttl
+            or now - session.created_at > self.max_age
+        )
+
+    def _sweep(self) -> List[PowerShellSession]:
+        """Remove expired idle sessions (caller holds the lock); returns them to close."""
+        now = time.monotonic()
+        expired = [session for session in self._idle if self._expired(session, now)]
+        for session in expired:
+            del self._idle[session]
+        return expired
+
+    def _acquire(self, tenant_id: str, module: str) -> Tuple[PowerShellSession, bool]:
+        """Take an idle session for the key, or start one.
+
+        Returns:
+            (session, pooled). Unpooled sessions are closed after use.
+        """
+        to_close: List[PowerShellSession] = []
+        session = None
+        with self._lock:
+            to_close.extend(self._sweep())
+            # Most recently used first: it is the most likely to still be healthy
+            for candidate in reversed(self._idle):
+                if candidate.key == (tenant_id, module):
+                    session = candidate
+                    break
+            if session is not None:
+                del self._idle[session]
+                pooled = True
+            else:
+                while self._idle and len(self._idle) + self._busy >= self.max_sessions:
+                    to_close.append(self._idle.popitem(last=False)[0])
+                pooled = not self._closed and len(self._idle) + self._busy < self.max_sessions
+            if pooled:
+                self._busy += 1
+
+        for expired in to_close:
+            expired.close()
+
+        try:
+            if session is None:
+                session = PowerShellSession(tenant_id, module, self.command)
+            elif time.monotonic() - session.last_checked > self.health_check_interval:
+                if not session.check_health():
+                    session.close()
+                    session = PowerShellSession(tenant_id, module, self.command)
+        except Exception:
+            if pooled:
+                with self._lock:
+                    self._busy -= 1
+            raise
+        return session, pooled
+
+    def _release(self, session: PowerShellSession, pooled: bool) -> None:
+        to_close: List[PowerShellSession] = []
+        with self._lock:
+            if pooled:
+                self._busy -= 1
+            if pooled and not self._closed and session.alive:
+                session.last_used = time.monotonic()
+                self._idle[session] = None
+            else:
+                to_close.append(session)
+            to_close.extend(self._sweep())
+        for expired in to_close:
+            expired.close()
+
+    def execute_cmdlet(
+        self,
+        module: str,
+        cmdlet: str,
+        params: Dict[str, Any],
+        tenant_id: str,
+        token: str,
+        graph_token: Optional[str] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+        properties: Optional[List[str]] = None,
+    ) -> Any:
+        """Execute a PowerShell cmdlet on a connected session.
+
+        Same contract as executor.execute_cmdlet.
+
+        Raises:
+            PowerShellExecutionError: If execution fails
+            ValueError: If Teams module requested without graph_token
+        """
+        [result] = self.execute_cmdlets(
+            module,
+            [CmdletCall(cmdlet, params, properties)],
+            tenant_id,
+            token,
+            graph_token,
+            timeout=timeout,
+            cancel=cancel,
+        )
+        if isinstance(result, PowerShellExecutionError):
+            raise result
+        return result
+
+    def execute_cmdlets(
+        self,
+        module: str,
+        cmdlets: List[CmdletCall],
+        tenant_id: str,
+        token: str,
+        graph_token: Optional[str] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+    ) -> List[Any]:
+        """Execute several cmdlets, in order, on one connected session.
+
+        Same contract as executor.execute_cmdlets: one entry per cmdlet, its
+        parsed output or the PowerShellExecutionError it failed with.
+
+        Raises:
+            PowerShellExecutionError: If the session cannot be started or connected
+            PowerShellCancelledError: If cancel is set before the batch finishes
+            ValueError: If Teams module requested without graph_token
+        """
+        # Validate the request before starting a session for it
+        token_env = build_token_env(module, token, graph_token)
+        tenant_id = validate_tenant_id(tenant_id)
+        if module not in HEALTH_SCRIPTS:
+            raise ValueError(f"Unsupported module: {module}")
+        cmdlets = [CmdletCall(*call) for call in cmdlets]
+        for call in cmdlets:
+            validate_properties(call.properties or [])
+
+        results: List[Any] = []
+        session, pooled = self._acquire(tenant_id, module)
+        try:
+            # A changed token means the caller refreshed it: reconnect with it
+            if session.token != token:
+                session.connect(token_env, token, timeout=timeout, cancel=cancel)
+            for call in cmdlets:
+                if cancel is not None and cancel.is_set():
+                    raise PowerShellCancelledError("PowerShell execution cancelled")
+                if not session.alive:
+                    results.append(
+                        PowerShellExecutionError("PowerShell session exited before the cmdlet ran")
+                    )
+                    continue
+                try:
+                    output = session.run(
+                        build_cmdlet_script(*call), timeout=timeout, cancel=cancel
+                    )
+                    results.append(parse_output(output))
+                except PowerShellCancelledError:
+                    raise
+                except PowerShellExecutionError as e:
+                    results.append(e)
+        finally:
+            self._release(session, pooled)
+        return results
+
+    def stream_cmdlet(
+        self,
+        module: str,
+        cmdlet: str,
+        params: Dict[str, Any],
+        tenant_id: str,
+        token: str,
+        graph_token: Optional[str] = None,
+        timeout: float = 120,
+        cancel: Optional[threading.Event] = None,
+        properties: Optional[List[str]] = None,
+    ) -> Iterator[Any]:
+        """Execute a cmdlet on a connected session, yielding its objects as they come.
+
+        Same contract as executor.stream_cmdlet. A session whose stream is
+        abandoned part-way is closed rather than returned to the pool.
+        """
+        token_env = build_token_env(module, token, graph_token)
+        tenant_id = validate_tenant_id(tenant_id)
+        if module not in HEALTH_SCRIPTS:
+            raise ValueError(f"Unsupported module: {module}")
+        script = build_stream_script(cmdlet, params, properties)
+
+        session, pooled = self._acquire(tenant_id, module)
+        try:
+            if session.token != token:
+                session.connect(token_env, token, timeout=timeout, cancel=cancel)
+            yield from session.stream(script, timeout=timeout, cancel=cancel)
+        except GeneratorExit:
+            # The caller stopped reading; the session is still running the script
+            session.close(disconnect=False)
+            raise
+        finally:
+            self._release(session, pooled)
+
+    def stats(self) -> Dict[str, int]:
+        """Session counts, for the health endpoint."""
+        with self._lock:
+            return {"idle": len(self._idle), "busy": self._busy, "max": self.max_sessions}
+
+    def close(self) -> None:
+        """Close every idle session; busy sessions are closed when released."""
+        with self._lock:
+            self._closed = True
+            sessions = list(self._idle)
+            self._idle.clear()
+        for session in sessions:
+            session.close()
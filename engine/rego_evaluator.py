@@ -0,0 +1,200 @@
+"""In-process Rego policy evaluation.
+
+Evaluates the policies under POLICIES_DIR inside the worker process with the
+embeddable rego-cpp engine (the regopy package) instead of POSTing every
+control to the OPA sidecar. It exposes the same evaluate_policy /
+evaluate_policies / health_check interface as OPAClient, so the tasks do not
+care which one they get - see create_policy_client() in opa_client.py.
+
+Each Rego package gets its own interpreter. Our policies never reference
+other packages, and rego-cpp is more reliable with one module per interpreter
+than with the whole policy tree loaded at once.
+
+rego-cpp does not yet cover every corner of OPA. When it errors on a policy
+the evaluator raises EmbeddedEvaluationError, or hands that package to the
+fallback OPAClient if one is configured (EMBEDDED_POLICY_FALLBACK).
+"""
+
+import asyncio
+import re
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from worker.config import settings
+
+if TYPE_CHECKING:
+    from opa_client import OPAClient
+
+_PACKAGE_RE = re.compile(r"^package\s+(\S+)", re.MULTILINE)
+
+
+class EmbeddedEvaluationError(Exception):
+    """Raised when the embedded Rego engine cannot evaluate a policy."""
+
+    pass
+
+
+class EmbeddedPolicyEvaluator:
+    """Evaluates Rego policies in-process with rego-cpp."""
+
+    def __init__(
+        self,
+        policies_dir: str | Path | None = None,
+        fallback: "OPAClient | None" = None,
+    ):
+        """Initialize the embedded evaluator.
+
+        Args:
+            policies_dir: Root of the policy tree. Defaults to POLICIES_DIR from settings.
+            fallback: Optional OPA client used for packages the embedded engine
+                      cannot evaluate.
+        """
+        self.policies_dir = Path(policies_dir or settings.POLICIES_DIR)
+        self.fallback = fallback
+        self._policy_files: dict[str, Path] | None = None
+        self._interpreters: dict = {}
+        # rego-cpp interpreters are not thread-safe, so each package's evaluations
+        # run one at a time; different packages evaluate in parallel
+        self._package_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _index_policies(self) -> dict[str, Path]:
+        """Map each Rego package name to the file that declares it."""
+        if self._policy_files is None:
+            policy_files = {}
+            for rego_path in sorted(self.policies_dir.rglob("*.rego")):
+                match = _PACKAGE_RE.search(rego_path.read_text(encoding="utf-8"))
+                if match:
+                    policy_files[match.group(1)] = rego_path
+            self._policy_files = policy_files
+        return self._policy_files
+
+    def _package_lock(self, package: str) -> threading.Lock:
+        """The lock serializing use of one package's interpreter."""
+        with self._lock:
+            return self._package_locks.setdefault(package, threading.Lock())
+
+    def _get_interpreter(self, package: str):
+        """Get the interpreter for a package, loading its module on first use.
+
+        Returns:
+            The interpreter, or None if no policy declares the package.
+        """
+        if package in self._interpreters:
+            return self._interpreters[package]
+
+        with self._lock:
+            rego_path = self._index_policies().get(package)
+        if rego_path is None:
+            return None
+
+        try:
+            from regopy import Interpreter
+        except ImportError as e:
+            raise EmbeddedEvaluationError(
+                "The embedded policy evaluator requires the regopy package.\n"
+                "Install it with: pip install 'autoaudit-worker[embedded]'"
+            ) from e
+
+        interpreter = Interpreter()
+        try:
+            interpreter.add_module(str(rego_path), rego_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            raise EmbeddedEvaluationError(f"Failed to load {rego_path.name}: {e}") from e
+
+        self._interpreters[package] = interpreter
+        return interpreter
+
+    def evaluate_sync(self, package_path: str, input_data: dict) -> dict:
+        """Evaluate a package's result rule synchronously.
+
+        Args:
+            package_path: The OPA package path (e.g., "cis/microsoft_365_foundations/v3_1_0/control_1_1_1")
+            input_data: The data to evaluate (facts collected from the cloud)
+
+        Returns:
+            The package's result document, or {} if it is undefined
+            (the same as OPA's REST API).
+
+        Raises:
+            EmbeddedEvaluationError: If rego-cpp fails to evaluate the policy.
+        """
+        # Imported here: opa_client imports this module from create_policy_client()
+        from opa_client import rego_result_ref
+
+        package = package_path.replace("/", ".")
+        with self._package_lock(package):
+            interpreter = self._get_interpreter(package)
+            if interpreter is None:
+                return {}
+
+            try:
+                interpreter.set_input(input_data)
+                output = interpreter.query(f"x := {rego_result_ref(package_path)}")
+            except Exception as e:
+                raise EmbeddedEvaluationError(f"Failed to evaluate {package}: {e}") from e
+
+            if not output.ok():
+                raise EmbeddedEvaluationError(f"Failed to evaluate {package}: {output}")
+
+            if not output.results:
+                return {}
+            return output[0].bindings.get("x", {})
+
+    async def evaluate_policy(self, package_path: str, input_data: dict) -> dict:
+        """Evaluate a policy against input data.
+
+        Same contract as OPAClient.evaluate_policy. Evaluation runs in a worker
+        thread so the event loop stays free for collector I/O.
+        """
+        try:
+            return await asyncio.to_thread(self.evaluate_sync, package_path, input_data)
+        except EmbeddedEvaluationError:
+            if self.fallback is None:
+                raise
+            return await self.fallback.evaluate_policy(package_path, input_data)
+
+    async def evaluate_policies(
+        self, package_paths: list[str], input_data: dict
+    ) -> dict[str, dict]:
+        """Evaluate several policies against the same input.
+
+        Same contract as OPAClient.evaluate_policies. Packages the embedded
+        engine cannot evaluate are sent to the fallback client in one batch.
+        """
+
+        def evaluate_all() -> tuple[dict[str, dict], dict[str, EmbeddedEvaluationError]]:
+            results, errors = {}, {}
+            for path in package_paths:
+                try:
+                    results[path] = self.evaluate_sync(path, input_data)
+                except EmbeddedEvaluationError as e:
+                    errors[path] = e
+            return results, errors
+
+        results, errors = await asyncio.to_thread(evaluate_all)
+        if errors:
+            if self.fallback is None:
+                raise next(iter(errors.values()))
+            results.update(await self.fallback.evaluate_policies(list(errors), input_data))
+
+        return {path: results[path] for path in package_paths}
+
+    async def health_check(self) -> bool:
+        """Check that the policy tree is readable and the engine is installed.
+
+        Returns:
+            True if policies were found and regopy can be imported, False otherwise.
+        """
+        try:
+            import regopy  # noqa: F401
+
+            return bool(await asyncio.to_thread(self._index_policies))
+        except Exception:
+            return False
+
+    async def aclose(self) -> None:
+        """Close the fallback client's connection pool on the running loop."""
+        if self.fallback is not None:
+            await self.fallback.aclose()
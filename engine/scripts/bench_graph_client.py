@@ -0,0 +1,189 @@
+"""Graph client latency benchmark against a local mock Graph server.
+
+Compares the pooled GraphClient (one keep-alive connection pool per client)
+with the previous behaviour of opening a fresh connection for every request.
+No tenant or credentials are needed - the script starts its own mock server
+that serves paginated /users responses.
+
+Usage:
+    cd engine
+    python -m scripts.bench_graph_client
+    python -m scripts.bench_graph_client --requests 500 --pages 50 --latency-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Add parent to path for imports when running as module
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from collectors.graph_client import GraphClient
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    """Serves /users in pages of page_size items, linking pages with @odata.nextLink."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle + delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+    page_size = 100
+    total_pages = 50
+    latency = 0.0
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+        url = urlparse(self.path)
+        page = int(parse_qs(url.query).get("page", ["0"])[0])
+        body: dict = {
+            "value": [
+                {"id": f"user-{page}-{i}", "userPrincipalName": f"user{page}.{i}@contoso.com"}
+                for i in range(self.page_size)
+            ]
+        }
+        if page + 1 < self.total_pages:
+            host, port = self.server.server_address[:2]
+            body["@odata.nextLink"] = f"http://{host}:{port}/v1.0/users?page={page + 1}"
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def start_mock_server(total_pages: int, latency_ms: float) -> ThreadingHTTPServer:
+    """Start the mock Graph server on a free localhost port."""
+    MockGraphHandler.total_pages = total_pages
+    MockGraphHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockGraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def mock_client(base_url: str) -> GraphClient:
+    """Create a GraphClient pointed at the mock server with a dummy token."""
+    client = GraphClient("contoso.onmicrosoft.com", "bench-client", "bench-secret")
+    client.GRAPH_BASE_URL = f"{base_url}/v1.0"
+    client.GRAPH_BETA_URL = f"{base_url}/beta"
+    client._access_token = "mock-token"
+    return client
+
+
+async def bench_per_request(base_url: str, requests: int) -> list[float]:
+    """Latency per call when every request opens its own connection pool."""
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with mock_client(base_url) as client:
+            await client.get("/users", params={"page": "0"})
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_pooled(base_url: str, requests: int) -> list[float]:
+    """Latency per call on one long-lived pooled client."""
+    timings = []
+    async with mock_client(base_url) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.get("/users", params={"page": "0"})
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_all_pages(base_url: str, pooled: bool) -> float:
+    """Wall-clock time for get_all_pages over the whole mock /users collection."""
+    start = time.perf_counter()
+    if pooled:
+        async with mock_client(base_url) as client:
+            await client.get_all_pages("/users")
+    else:
+        # Replay the pagination with a fresh client per page
+        endpoint, params = "/users", None
+        while endpoint:
+            async with mock_client(base_url) as client:
+                response = await client.get(endpoint, params=params)
+            next_link = response.get("@odata.nextLink")
+            endpoint = next_link.replace(client.GRAPH_BASE_URL, "") if next_link else None
+            params = None
+    return time.perf_counter() - start
+
+
+def summarize(label: str, timings: list[float]) -> dict:
+    """Print and return p50/p95/mean latency in milliseconds."""
+    ordered = sorted(timings)
+    stats = {
+        "mode": label,
+        "requests": len(ordered),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+    print(
+        f"  {label:<12} p50={stats['p50_ms']:>8.3f} ms  "
+        f"p95={stats['p95_ms']:>8.3f} ms  mean={stats['mean_ms']:>8.3f} ms"
+    )
+    return stats
+
+
+async def run(requests: int, pages: int, latency_ms: float) -> dict:
+    server = start_mock_server(pages, latency_ms)
+    host, port = server.server_address[:2]
+    base_url = f"http://{host}:{port}"
+
+    try:
+        print(f"Mock Graph server: {base_url} ({pages} pages, {latency_ms} ms server latency)")
+        print(f"\nPer-call latency over {requests} sequential GETs:")
+        per_request = summarize("per-request", await bench_per_request(base_url, requests))
+        pooled = summarize("pooled", await bench_pooled(base_url, requests))
+
+        print(f"\nget_all_pages over {pages} pages:")
+        per_request_pages = await bench_all_pages(base_url, pooled=False)
+        pooled_pages = await bench_all_pages(base_url, pooled=True)
+        print(f"  {'per-request':<12} {per_request_pages * 1000:>10.1f} ms")
+        print(f"  {'pooled':<12} {pooled_pages * 1000:>10.1f} ms")
+    finally:
+        server.shutdown()
+
+    return {
+        "per_call": [per_request, pooled],
+        "all_pages_ms": {
+            "per_request": round(per_request_pages * 1000, 1),
+            "pooled": round(pooled_pages * 1000, 1),
+        },
+    }
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark GraphClient against a mock Graph server")
+    parser.add_argument("--requests", type=int, default=200, help="Sequential GETs per mode")
+    parser.add_argument("--pages", type=int, default=50, help="Pages served by the mock /users endpoint")
+    parser.add_argument(
+        "--latency-ms", type=float, default=0.0, help="Artificial server-side latency per request"
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.pages, args.latency_ms))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+        print(f"\nSaved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+"""Rego policy evaluation benchmark at tenant scale.
+
+Runs every policy under engine/policies against synthetic collector output
+with 1k, 10k and 100k users, groups, policies, ... and prints a latency and
+allocation table. It exits non-zero when a policy slows down, so quadratic
+comprehensions are caught before they reach production:
+
+- Growth: time per evaluation grows much faster than the input. For example,
+  10x the users but more than 30x the time (--max-growth 3) is a failure.
+  This needs no baseline.
+- Regression: with --baseline, a policy more than --threshold slower than in
+  an earlier run's --output JSON.
+
+Inputs are synthesized per policy. When engine/samples has output of the
+policy's collector, every list in it is grown to the target size by cloning
+its items (ids and UPNs made unique) and top-level counts are scaled with
+them. Otherwise the shape is inferred from the policy's `input.<key>`
+references: keys that look like counts, flags or percentages get scalars,
+and every other key gets a list of generic directory objects. Inferred inputs
+rarely make a policy compliant, but they still make it walk every list, which
+is what the benchmark measures.
+
+Policies are evaluated with `opa bench` (latency and allocations per
+evaluation) when the opa binary is on PATH, or else in-process with rego-cpp
+(pip install '.[embedded]'; latency only).
+
+Usage:
+    cd engine
+    python -m scripts.bench_policies
+    python -m scripts.bench_policies --sizes 1000,10000 --policy 5.2.3.4
+    python -m scripts.bench_policies -o bench.json
+    python -m scripts.bench_policies --baseline bench.json --threshold 0.5
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ENGINE_ROOT = Path(__file__).resolve().parent.parent
+POLICIES_DIR = ENGINE_ROOT / "policies"
+SAMPLES_DIR = ENGINE_ROOT / "samples"
+
+# Add parent to path for imports when running as module
+sys.path.insert(0, str(ENGINE_ROOT))
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+_PACKAGE_RE = re.compile(r"^package\s+(\S+)", re.MULTILINE)
+_INPUT_KEY_RE = re.compile(
+    r"\binput\.([A-Za-z_][A-Za-z0-9_]*)|object\.get\(\s*input\s*,\s*\"([A-Za-z0-9_]+)\""
+)
+# Top-level keys that hold a count, flag or percentage rather than a list
+_SCALAR_KEY_RE = re.compile(
+    r"(^total_|_count$|^count_|_percentage$|^is_|^has_|_enabled$|_disabled$|_required$"
+    r"|_allowed$|_blocked$|_days$|_quota$|_state$|_id$|_found$|^allow|^collector_error$)"
+)
+
+
+def _unique(key: str, value: str, copy_index: int) -> str:
+    """Make an identifier-like string of a cloned item unique."""
+    if "@" in value:
+        local, domain = value.split("@", 1)
+        return f"{local}{copy_index}@{domain}"
+    if key.endswith(("id", "Id")) or key in ("displayName", "name"):
+        return f"{value}-{copy_index}"
+    return value
+
+
+def _clone(item, copy_index: int):
+    if copy_index == 0 or not isinstance(item, dict):
+        return copy.deepcopy(item)
+    return {
+        key: _unique(key, value, copy_index) if isinstance(value, str) else copy.deepcopy(value)
+        for key, value in item.items()
+    }
+
+
+def scale_sample(data: dict, size: int) -> dict:
+    """Grow every top-level list of a collector sample to size items.
+
+    Items are cloned round-robin; integer counts are scaled by the same
+    factor as the lists so totals stay consistent with them.
+    """
+    lists = {key: value for key, value in data.items() if isinstance(value, list) and value}
+    if not lists:
+        return copy.deepcopy(data)
+    factor = size / max(len(value) for value in lists.values())
+
+    scaled = {}
+    for key, value in data.items():
+        if key in lists:
+            scaled[key] = [
+                _clone(value[i % len(value)], i // len(value)) for i in range(size)
+            ]
+        elif isinstance(value, int) and not isinstance(value, bool):
+            scaled[key] = round(value * factor)
+        else:
+            scaled[key] = copy.deepcopy(value)
+    return scaled
+
+
+def input_keys(rego_source: str) -> list[str]:
+    """Top-level input keys a policy reads, in order of first use."""
+    keys: dict[str, None] = {}
+    for match in _INPUT_KEY_RE.finditer(rego_source):
+        keys[match.group(1) or match.group(2)] = None
+    return list(keys)
+
+
+def _generic_item(index: int) -> dict:
+    return {
+        "id": f"00000000-0000-0000-0000-{index:012d}",
+        "displayName": f"Object {index}",
+        "userPrincipalName": f"user{index}@contoso.com",
+        "name": f"object-{index}",
+        "state": "enabled",
+        "enabled": True,
+    }
+
+
+def infer_input(rego_source: str, size: int) -> dict:
+    """Synthesize an input of the given size from the keys a policy reads."""
+    data: dict = {}
+    for key in input_keys(rego_source):
+        if not _SCALAR_KEY_RE.search(key):
+            data[key] = [_generic_item(i) for i in range(size)]
+        elif key.startswith(("total_", "count_")) or key.endswith(("_count", "_quota", "_days")):
+            data[key] = size
+        elif key.endswith("_percentage"):
+            data[key] = 100.0
+        elif key.endswith("_id"):
+            data[key] = _generic_item(0)["id"]
+        elif key.endswith("_state"):
+            data[key] = "enabled"
+        elif key == "collector_error":
+            continue
+        else:
+            data[key] = True
+    return data
+
+
+def load_samples() -> dict[str, dict]:
+    """Collector samples on disk, by collector id."""
+    samples = {}
+    for sample_path in sorted(SAMPLES_DIR.glob("*.json")):
+        with open(sample_path, encoding="utf-8") as f:
+            sample = json.load(f)
+        if "collector_id" in sample:
+            samples[sample["collector_id"]] = sample.get("data", {})
+    return samples
+
+
+def policy_collectors() -> dict[Path, str]:
+    """The collector feeding each policy file, from the benchmarks' metadata.json."""
+    collectors = {}
+    for metadata_path in sorted(POLICIES_DIR.rglob("metadata.json")):
+        with open(metadata_path, encoding="utf-8") as f:
+            metadata = json.load(f)
+        for control in metadata.get("controls", []):
+            if control.get("policy_file") and control.get("data_collector_id"):
+                collectors[metadata_path.parent / control["policy_file"]] = control[
+                    "data_collector_id"
+                ]
+    return collectors
+
+
+def _json_documents(text: str) -> list[dict]:
+    """Parse a stream of concatenated (possibly pretty-printed) JSON documents."""
+    decoder = json.JSONDecoder()
+    documents = []
+    index = 0
+    while True:
+        while index < len(text) and text[index].isspace():
+            index += 1
+        if index == len(text):
+            return documents
+        document, index = decoder.raw_decode(text, index)
+        documents.append(document)
+
+
+class BenchTimeout(Exception):
+    """An evaluation ran past the timeout or took its evaluator down (out of memory)."""
+
+    pass
+
+
+class OPABench:
+    """Times a policy with `opa bench`, which also reports allocations."""
+
+    name = "opa"
+
+    def __init__(self, opa: str, count: int, timeout: float):
+        self.opa = opa
+        self.count = count
+        self.timeout = timeout
+
+    def run(self, rego_path: Path, package: str, input_path: Path) -> dict:
+        try:
+            result = subprocess.run(
+                [
+                    self.opa,
+                    "bench",
+                    "--format",
+                    "json",
+                    "--benchmem",
+                    "--count",
+                    str(self.count),
+                    "-d",
+                    str(rego_path),
+                    "-i",
+                    str(input_path),
+                    f"data.{package}.result",
+                ],
+                capture_output=True,
+                text=True,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            raise BenchTimeout(f"timed out after {self.timeout:g} s")
+        if result.returncode < 0:
+            raise BenchTimeout(f"opa killed by signal {-result.returncode}")
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+        # One Go testing.BenchmarkResult per --count run
+        runs = _json_documents(result.stdout)
+        ns_per_op = statistics.median(run["T"] / run["N"] for run in runs)
+        return {
+            "ms_per_op": ns_per_op / 1e6,
+            "allocs_per_op": statistics.median(run["MemAllocs"] / run["N"] for run in runs),
+            "bytes_per_op": statistics.median(run["MemBytes"] / run["N"] for run in runs),
+        }
+
+
+def _time_embedded(conn, package_path: str, input_path: str, min_time: float) -> None:
+    """Child process body of EmbeddedBench: time one package and send back the result."""
+    from rego_evaluator import EmbeddedPolicyEvaluator
+
+    try:
+        evaluator = EmbeddedPolicyEvaluator(POLICIES_DIR)
+        with open(input_path, encoding="utf-8") as f:
+            input_data = json.load(f)
+        # The first evaluation also loads the module
+        evaluator.evaluate_sync(package_path, input_data)
+        timings = []
+        deadline = time.perf_counter() + min_time
+        # Evaluations slower than min_time (100k users) are timed once
+        while not timings or time.perf_counter() < deadline:
+            start = time.perf_counter()
+            evaluator.evaluate_sync(package_path, input_data)
+            timings.append(time.perf_counter() - start)
+        conn.send(("ok", statistics.median(timings) * 1000))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    finally:
+        conn.close()
+
+
+class EmbeddedBench:
+    """Times a policy with rego-cpp; allocations are not visible to Python.
+
+    Each measurement runs in a child process so a policy that exhausts memory
+    or runs past the timeout fails its measurement instead of the benchmark.
+    """
+
+    name = "embedded"
+
+    def __init__(self, min_time: float, timeout: float):
+        import regopy  # noqa: F401
+
+        self.min_time = min_time
+        self.timeout = timeout
+
+    def run(self, rego_path: Path, package: str, input_path: Path) -> dict:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        process = multiprocessing.Process(
+            target=_time_embedded,
+            args=(sender, package.replace(".", "/"), str(input_path), self.min_time),
+        )
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(self.timeout):
+                if process.is_alive():
+                    raise BenchTimeout(f"timed out after {self.timeout:g} s")
+                raise BenchTimeout(f"evaluator died (exit code {process.exitcode})")
+            status, value = receiver.recv()
+        except EOFError:
+            process.join()
+            raise BenchTimeout(f"evaluator died (exit code {process.exitcode})")
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            receiver.close()
+        if status == "error":
+            raise RuntimeError(value)
+        return {"ms_per_op": value, "allocs_per_op": None, "bytes_per_op": None}
+
+
+def create_bench(evaluator: str, count: int, min_time: float, timeout: float):
+    """The requested evaluator, or opa bench if available and embedded otherwise."""
+    opa = shutil.which("opa")
+    if evaluator == "opa" or (evaluator == "auto" and opa):
+        if opa is None:
+            sys.exit("opa binary not on PATH")
+        return OPABench(opa, count, timeout)
+    try:
+        return EmbeddedBench(min_time, timeout)
+    except ImportError as e:
+        sys.exit(f"No policy evaluator available (install opa or regopy): {e}")
+
+
+def check_growth(results: list[dict], max_growth: float, min_ms: float) -> list[str]:
+    """Policies whose time grows more than max_growth times faster than their input."""
+    failures = []
+    by_policy: dict[str, list[dict]] = {}
+    for row in results:
+        if row.get("ms_per_op") is not None:
+            by_policy.setdefault(row["policy"], []).append(row)
+    for policy, rows in by_policy.items():
+        rows.sort(key=lambda row: row["size"])
+        for smaller, larger in zip(rows, rows[1:]):
+            if larger["ms_per_op"] < min_ms:
+                continue
+            growth = larger["ms_per_op"] / max(smaller["ms_per_op"], 1e-9)
+            input_growth = larger["size"] / smaller["size"]
+            if growth > input_growth * max_growth:
+                failures.append(
+                    f"{policy}: {growth:.0f}x slower for {input_growth:.0f}x the input "
+                    f"({smaller['size']} -> {larger['size']}: "
+                    f"{smaller['ms_per_op']:.3f} -> {larger['ms_per_op']:.3f} ms)"
+                )
+    return failures
+
+
+def check_regressions(
+    results: list[dict], baseline: list[dict], threshold: float, min_ms: float
+) -> list[str]:
+    """Policies more than threshold slower than in the baseline run."""
+    previous = {(row["policy"], row["size"]): row for row in baseline}
+    failures = []
+    for row in results:
+        before = previous.get((row["policy"], row["size"]))
+        if before is None or row.get("ms_per_op") is None or before.get("ms_per_op") is None:
+            continue
+        if row["ms_per_op"] < min_ms:
+            continue
+        if row["ms_per_op"] > before["ms_per_op"] * (1 + threshold):
+            failures.append(
+                f"{row['policy']} at {row['size']}: {before['ms_per_op']:.3f} -> "
+                f"{row['ms_per_op']:.3f} ms"
+            )
+    return failures
+
+
+def _format(value: float | None, spec: str) -> str:
+    return "n/a" if value is None else format(value, spec)
+
+
+def format_table(results: list[dict]) -> str:
+    """Markdown table of latency and allocations per policy and size."""
+    lines = [
+        "| Policy | Input | Size | ms/op | allocs/op | KiB/op |",
+        "| --- | --- | ---: | ---: | ---: | ---: |",
+    ]
+    for row in results:
+        if "error" in row:
+            lines.append(
+                f"| {row['policy']} | {row['input']} | {row['size']} | error: {row['error']} | | |"
+            )
+            continue
+        kib = row["bytes_per_op"] / 1024 if row["bytes_per_op"] is not None else None
+        lines.append(
+            f"| {row['policy']} | {row['input']} | {row['size']} | "
+            f"{row['ms_per_op']:.3f} | {_format(row['allocs_per_op'], ',.0f')} | "
+            f"{_format(kib, ',.1f')} |"
+        )
+    return "\n".join(lines)
+
+
+def run(bench, sizes: list[int], policy_filter: str | None) -> list[dict]:
+    samples = load_samples()
+    collectors = policy_collectors()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.json"
+        for rego_path in sorted(POLICIES_DIR.rglob("*.rego")):
+            policy = str(rego_path.relative_to(POLICIES_DIR))
+            if policy_filter and policy_filter not in policy:
+                continue
+            source = rego_path.read_text(encoding="utf-8")
+            match = _PACKAGE_RE.search(source)
+            if match is None:
+                continue
+            sample = samples.get(collectors.get(rego_path, ""))
+            for size in sizes:
+                if sample is not None:
+                    input_data = scale_sample(sample, size)
+                else:
+                    input_data = infer_input(source, size)
+                input_path.write_text(json.dumps(input_data))
+                row = {
+                    "policy": policy,
+                    "input": "sample" if sample is not None else "inferred",
+                    "size": size,
+                }
+                try:
+                    row.update(bench.run(rego_path, match.group(1), input_path))
+                except BenchTimeout as e:
+                    row["error"] = str(e)
+                    row["timed_out"] = True
+                except Exception as e:
+                    row["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+                results.append(row)
+                print(
+                    f"  {policy:<90} {size:>7}  "
+                    + (f"{row['ms_per_op']:>10.3f} ms" if "error" not in row else row["error"])
+                )
+                if row.get("timed_out"):
+                    # Larger inputs would only take longer
+                    break
+    return results
+
+
+def main() -> None:
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark Rego policies on synthetic tenants")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma-separated numbers of users/groups/policies per input",
+    )
+    parser.add_argument("--policy", help="Only benchmark policy files whose path contains this")
+    parser.add_argument(
+        "--evaluator", choices=["auto", "opa", "embedded"], default="auto", help="Policy evaluator"
+    )
+    parser.add_argument("--count", type=int, default=3, help="opa bench runs per measurement")
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="Embedded: seconds to time each measurement"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=300.0,
+        help="Seconds a measurement may take before the policy fails",
+    )
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        default=3.0,
+        help="Fail when time grows this many times faster than the input",
+    )
+    parser.add_argument("--baseline", type=Path, help="Earlier --output JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="Allowed slowdown against the baseline (0.5 = 50%%)",
+    )
+    parser.add_argument(
+        "--min-ms", type=float, default=1.0, help="Ignore timings below this many ms (noise)"
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Write results as JSON to this file")
+    parser.add_argument("--table", type=Path, help="Write the markdown table to this file")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    bench = create_bench(args.evaluator, args.count, args.min_time, args.timeout)
+    print(f"Evaluator: {bench.name}, sizes: {sizes}")
+    results = run(bench, sizes, args.policy)
+
+    table = format_table(results)
+    print(f"\n{table}")
+    if args.table:
+        args.table.write_text(table + "\n")
+    if args.output:
+        args.output.write_text(
+            json.dumps({"evaluator": bench.name, "sizes": sizes, "results": results}, indent=2)
+        )
+        print(f"\nSaved to: {args.output}")
+
+    failures = [
+        f"{row['policy']} at {row['size']}: {row['error']}"
+        for row in results
+        if row.get("timed_out")
+    ]
+    failures += check_growth(results, args.max_growth, args.min_ms)
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("evaluator") != bench.name:
+            print(f"\nBaseline was measured with {baseline.get('evaluator')}, not {bench.name}")
+        failures += check_regressions(
+            results, baseline.get("results", []), args.threshold, args.min_ms
+        )
+    if failures:
+        print("\nPolicy performance regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Tests for the policy benchmark's input synthesis and regression checks."""
+
+from scripts.bench_policies import (
+    _json_documents,
+    check_growth,
+    check_regressions,
+    infer_input,
+    input_keys,
+    scale_sample,
+)
+
+
+def test_scale_sample_grows_lists_with_unique_identities() -> None:
+    sample = {
+        "admin_accounts": [
+            {"id": "a", "userPrincipalName": "admin@contoso.com", "admin_roles": ["Global"]},
+            {"id": "b", "userPrincipalName": "sec@contoso.com", "admin_roles": []},
+        ],
+        "total_admin_accounts": 2,
+        "admin_accounts_with_high_footprint_licenses": 1,
+        "compliant_hint": True,
+    }
+
+    scaled = scale_sample(sample, 6)
+
+    accounts = scaled["admin_accounts"]
+    assert len(accounts) == 6
+    assert len({account["id"] for account in accounts}) == 6
+    assert len({account["userPrincipalName"] for account in accounts}) == 6
+    assert accounts[2]["userPrincipalName"] == "admin1@contoso.com"
+    assert scaled["total_admin_accounts"] == 6
+    assert scaled["admin_accounts_with_high_footprint_licenses"] == 3
+    assert scaled["compliant_hint"] is True
+
+
+def test_infer_input_from_policy_references() -> None:
+    source = """
+    compliant if {
+      input.total_users > 0
+      input.mfa_capable_count == input.total_users
+      some p in input.conditional_access_policies
+      object.get(input, "is_enabled", false)
+    }
+    """
+
+    assert input_keys(source) == [
+        "total_users",
+        "mfa_capable_count",
+        "conditional_access_policies",
+        "is_enabled",
+    ]
+    data = infer_input(source, 50)
+    assert data["total_users"] == 50
+    assert data["mfa_capable_count"] == 50
+    assert len(data["conditional_access_policies"]) == 50
+    assert data["is_enabled"] is True
+
+
+def test_superlinear_growth_fails() -> None:
+    results = [
+        {"policy": "linear.rego", "size": 1000, "ms_per_op": 2.0},
+        {"policy": "linear.rego", "size": 10000, "ms_per_op": 21.0},
+        {"policy": "quadratic.rego", "size": 1000, "ms_per_op": 2.0},
+        {"policy": "quadratic.rego", "size": 10000, "ms_per_op": 200.0},
+        {"policy": "noise.rego", "size": 1000, "ms_per_op": 0.001},
+        {"policy": "noise.rego", "size": 10000, "ms_per_op": 0.5},
+    ]
+
+    failures = check_growth(results, max_growth=3.0, min_ms=1.0)
+
+    assert len(failures) == 1
+    assert failures[0].startswith("quadratic.rego: 100x slower for 10x the input")
+
+
+def test_regression_against_baseline() -> None:
+    baseline = [
+        {"policy": "a.rego", "size": 1000, "ms_per_op": 10.0},
+        {"policy": "b.rego", "size": 1000, "ms_per_op": 10.0},
+    ]
+    results = [
+        {"policy": "a.rego", "size": 1000, "ms_per_op": 14.0},
+        {"policy": "b.rego", "size": 1000, "ms_per_op": 16.0},
+        {"policy": "c.rego", "size": 1000, "ms_per_op": 99.0},
+    ]
+
+    assert check_regressions(results, baseline, threshold=0.5, min_ms=1.0) == [
+        "b.rego at 1000: 10.000 -> 16.000 ms"
+    ]
+
+
+def test_json_documents_reads_pretty_printed_stream() -> None:
+    text = '{\n  "N": 10,\n  "T": 500\n}\n{"N": 20, "T": 900}\n'
+    assert _json_documents(text) == [{"N": 10, "T": 500}, {"N": 20, "T": 900}]
@@ -0,0 +1,54 @@
+"""Tests for the bounded-concurrency gather helper."""
+
+import asyncio
+
+import pytest
+
+from collectors.concurrency import gather_bounded
+
+
+def test_gather_bounded_keeps_order_and_limit() -> None:
+    inflight = 0
+    peak = 0
+
+    async def work(item: int) -> int:
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        # Later items finish first, so ordering can't come from completion order
+        await asyncio.sleep(0.001 * (10 - item))
+        inflight -= 1
+        return item * 2
+
+    results = asyncio.run(gather_bounded(work, range(10), limit=3))
+
+    assert results == [item * 2 for item in range(10)]
+    assert peak == 3
+
+
+def test_gather_bounded_captures_errors_per_item() -> None:
+    async def work(item: int) -> int:
+        if item == 2:
+            raise ValueError("bad item")
+        return item
+
+    results = asyncio.run(gather_bounded(work, range(4), return_exceptions=True))
+
+    assert results[:2] == [0, 1]
+    assert isinstance(results[2], ValueError)
+    assert results[3] == 3
+
+
+def test_gather_bounded_raises_and_cancels_the_rest() -> None:
+    finished = []
+
+    async def work(item: int) -> int:
+        if item == 0:
+            raise ValueError("bad item")
+        await asyncio.sleep(1)
+        finished.append(item)
+        return item
+
+    with pytest.raises(ValueError):
+        asyncio.run(gather_bounded(work, range(5), limit=5))
+    assert finished == []
@@ -0,0 +1,100 @@
+"""Tests for the policy decision cache."""
+
+import asyncio
+
+from decision_cache import DecisionCache, evaluate_with_cache, input_digest, policy_digest
+
+
+class RecordingEvaluator:
+    """Stands in for OPAClient and records which packages it was asked for."""
+
+    def __init__(self, result: dict | None = None):
+        self.evaluated: list[str] = []
+        self.result = result
+
+    async def evaluate_policy(self, package_path: str, input_data: dict) -> dict:
+        self.evaluated.append(package_path)
+        if self.result is not None:
+            return self.result
+        return {"compliant": True, "details": {"package": package_path}}
+
+    async def evaluate_policies(self, package_paths: list[str], input_data: dict) -> dict:
+        return {path: await self.evaluate_policy(path, input_data) for path in package_paths}
+
+
+def test_input_digest_ignores_key_order() -> None:
+    assert input_digest({"a": 1, "b": [{"x": 1, "y": 2}]}) == input_digest(
+        {"b": [{"y": 2, "x": 1}], "a": 1}
+    )
+    assert input_digest({"a": 1}) != input_digest({"a": 2})
+
+
+def test_repeat_evaluations_are_served_from_the_cache(tmp_path) -> None:
+    policy_a = tmp_path / "a.rego"
+    policy_b = tmp_path / "b.rego"
+    policy_a.write_text("package a\n")
+    policy_b.write_text("package b\n")
+    policies = {"pkg/a": policy_a, "pkg/b": policy_b}
+    cache = DecisionCache()
+    evaluator = RecordingEvaluator()
+
+    first = asyncio.run(evaluate_with_cache(evaluator, cache, policies, {"users": [1, 2]}))
+    second = asyncio.run(evaluate_with_cache(evaluator, cache, policies, {"users": [1, 2]}))
+
+    assert evaluator.evaluated == ["pkg/a", "pkg/b"]
+    assert first["pkg/a"]["details"] == {"package": "pkg/a"}
+    assert second["pkg/a"]["details"] == {"package": "pkg/a", "decision_cache": "hit"}
+    assert cache.stats() == {"hits": 2, "misses": 2}
+
+
+def test_changed_input_or_policy_is_reevaluated(tmp_path) -> None:
+    policy = tmp_path / "a.rego"
+    policy.write_text("package a\n")
+    cache = DecisionCache()
+    evaluator = RecordingEvaluator()
+
+    asyncio.run(evaluate_with_cache(evaluator, cache, {"pkg/a": policy}, {"users": [1]}))
+    asyncio.run(evaluate_with_cache(evaluator, cache, {"pkg/a": policy}, {"users": [1, 2]}))
+    digest = policy_digest(policy)
+    policy.write_text("package a\n\nresult := {}\n")
+    assert policy_digest(policy) != digest
+    asyncio.run(evaluate_with_cache(evaluator, cache, {"pkg/a": policy}, {"users": [1, 2]}))
+
+    assert evaluator.evaluated == ["pkg/a"] * 3
+
+
+def test_policies_without_a_file_are_always_evaluated(tmp_path) -> None:
+    cache = DecisionCache()
+    evaluator = RecordingEvaluator()
+    policies = {"pkg/a": None, "pkg/b": tmp_path / "missing.rego"}
+
+    for _ in range(2):
+        asyncio.run(evaluate_with_cache(evaluator, cache, policies, {}))
+
+    assert evaluator.evaluated == ["pkg/a", "pkg/b"] * 2
+
+
+def test_results_without_a_decision_are_not_cached(tmp_path) -> None:
+    policy = tmp_path / "a.rego"
+    policy.write_text("package a\n")
+    cache = DecisionCache()
+    # An undefined package evaluates to an empty result
+    evaluator = RecordingEvaluator(result={})
+
+    for _ in range(2):
+        asyncio.run(evaluate_with_cache(evaluator, cache, {"pkg/a": policy}, {}))
+
+    assert evaluator.evaluated == ["pkg/a"] * 2
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_least_recently_used_decisions_are_evicted() -> None:
+    cache = DecisionCache(max_entries=2)
+
+    async def run() -> dict:
+        await cache.put_many({"k1": {"n": 1}, "k2": {"n": 2}})
+        await cache.get_many(["k1"])
+        await cache.put_many({"k3": {"n": 3}})
+        return await cache.get_many(["k1", "k2", "k3"])
+
+    assert asyncio.run(run()) == {"k1": {"n": 1}, "k3": {"n": 3}}
@@ -0,0 +1,85 @@
+"""Tests for the DNS security records collector with the resolver replaced."""
+
+import asyncio
+
+import dns.resolver
+import pytest
+
+from collectors.exchange.dns import dns_security_records
+from collectors.exchange.dns.dns_security_records import DnsSecurityRecordsDataCollector
+
+
+class FakeRdata:
+    def __init__(self, *strings: bytes):
+        self.strings = strings
+
+
+class FakeResolver:
+    """Answers from a dict of name -> TXT rdata list or exception."""
+
+    def __init__(self, answers: dict):
+        self.answers = answers
+        self.queries: list[tuple[str, float]] = []
+
+    async def resolve(self, name: str, rdtype: str, lifetime: float):
+        self.queries.append((name, lifetime))
+        answer = self.answers.get(name, dns.resolver.NXDOMAIN())
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class FakeGraphClient:
+    def __init__(self, domains: list[dict]):
+        self.domains = domains
+
+    async def get_domains(self) -> list[dict]:
+        return self.domains
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    fake = FakeResolver(
+        {
+            "contoso.com": [FakeRdata(b"google-site-verification=x"), FakeRdata(b"v=spf1 ", b"-all")],
+            "_dmarc.contoso.com": [FakeRdata(b"v=DMARC1; p=reject; pct=100")],
+            "fabrikam.com": dns.resolver.NoAnswer(),
+            "_dmarc.fabrikam.com": dns.resolver.Timeout(),
+        }
+    )
+    monkeypatch.setattr(dns_security_records, "get_resolver", lambda: fake)
+    return fake
+
+
+def test_collect_maps_answers_and_errors_per_domain(resolver) -> None:
+    client = FakeGraphClient(
+        [
+            {"id": "contoso.com", "isVerified": True, "isDefault": True},
+            {"id": "fabrikam.com", "isVerified": True},
+            {"id": "unverified.com", "isVerified": False},
+        ]
+    )
+
+    data = asyncio.run(DnsSecurityRecordsDataCollector().collect(client))
+
+    assert data["total_domains"] == 2
+    contoso, fabrikam = data["domains"]
+    assert contoso["domain"] == "contoso.com"
+    assert contoso["spf_record"] == "v=spf1 -all"
+    assert contoso["dmarc_policy"] == {"v": "DMARC1", "p": "reject", "pct": "100"}
+    assert contoso["spf_error"] is None
+    assert fabrikam["spf_error"] == "No TXT records"
+    assert fabrikam["dmarc_error"] == "DNS query timeout"
+    assert all(name != "unverified.com" for name, _ in resolver.queries)
+
+
+def test_collect_times_out_queries_past_the_budget(resolver, monkeypatch) -> None:
+    monkeypatch.setattr(DnsSecurityRecordsDataCollector, "DNS_TIMEOUT_BUDGET", 0.0)
+    client = FakeGraphClient([{"id": "contoso.com", "isVerified": True}])
+
+    data = asyncio.run(DnsSecurityRecordsDataCollector().collect(client))
+
+    [record] = data["domains"]
+    assert record["spf_error"] == "DNS query timeout"
+    assert record["dmarc_error"] == "DNS query timeout"
+    assert resolver.queries == []
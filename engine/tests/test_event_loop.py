@@ -0,0 +1,59 @@
+"""Tests for the worker's persistent per-process event loop."""
+
+import asyncio
+import threading
+
+from worker import event_loop
+from worker.event_loop import ProcessEventLoop
+
+
+def test_process_loop_is_reused_across_runs() -> None:
+    process_loop = ProcessEventLoop(max_inflight=4)
+    try:
+
+        async def running_loop() -> asyncio.AbstractEventLoop:
+            return asyncio.get_running_loop()
+
+        assert process_loop.run(running_loop()) is process_loop.run(running_loop())
+    finally:
+        process_loop.close()
+
+
+def test_process_loop_limits_inflight_coroutines() -> None:
+    process_loop = ProcessEventLoop(max_inflight=2)
+    active = 0
+    peak = 0
+
+    async def control() -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+
+    try:
+        # One thread per Celery task, as with the threads pool
+        threads = [threading.Thread(target=process_loop.run, args=(control(),)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        process_loop.close()
+
+    assert peak == 2
+
+
+def test_run_async_uses_process_loop_when_persistent(monkeypatch) -> None:
+    monkeypatch.setattr(event_loop.settings, "WORKER_EVENT_LOOP", "persistent")
+
+    async def on_process_loop() -> bool:
+        return event_loop.current_process_loop() is not None
+
+    try:
+        assert event_loop.run_async(on_process_loop()) is True
+    finally:
+        event_loop.shutdown_process_loop()
+
+    monkeypatch.setattr(event_loop.settings, "WORKER_EVENT_LOOP", "per_task")
+    assert event_loop.run_async(on_process_loop()) is False
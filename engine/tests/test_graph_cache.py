@@ -0,0 +1,158 @@
+"""Tests for the scan-scoped Graph read cache."""
+
+import asyncio
+
+import httpx
+
+from collectors.graph_cache import GraphReadCache, get_scan_cache
+from collectors.graph_client import GraphClient
+
+
+def _client(handler, cache: GraphReadCache) -> GraphClient:
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = GraphClient(
+        "contoso.onmicrosoft.com", "client-id", "secret", http_client=http_client, cache=cache
+    )
+    client._access_token = "test-token"
+    return client
+
+
+def test_key_merges_url_and_params() -> None:
+    assert GraphReadCache.key(
+        "GET", "https://graph.microsoft.com/v1.0/users?$select=id&$top=5"
+    ) == GraphReadCache.key(
+        "get", "https://graph.microsoft.com/v1.0/users", {"$top": "5", "$select": "id"}
+    )
+
+
+def test_clients_of_a_scan_share_responses() -> None:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"value": [{"id": "role-1"}]})
+
+    cache = GraphReadCache()
+
+    async def run() -> None:
+        for _ in range(3):
+            roles = await _client(handler, cache).get_directory_roles()
+            # Callers get their own copy
+            roles[0]["id"] = "mutated"
+
+    asyncio.run(run())
+    assert requests == ["/v1.0/directoryRoles"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["coalesced"], stats["misses"], stats["entries"]) == (2, 0, 1, 1)
+
+
+def test_concurrent_identical_requests_are_coalesced() -> None:
+    requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"value": []})
+
+    cache = GraphReadCache()
+    client = _client(handler, cache)
+
+    async def run() -> None:
+        await asyncio.gather(*(client.get("/domains") for _ in range(5)))
+
+    asyncio.run(run())
+    assert requests == ["/v1.0/domains"]
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_waiters_refetch_when_the_fetching_request_is_cancelled() -> None:
+    cache = GraphReadCache()
+    key = cache.key("GET", "https://graph.microsoft.com/v1.0/domains")
+    fetches = []
+
+    async def fetch() -> dict:
+        fetches.append(len(fetches))
+        await asyncio.sleep(0.01)
+        return {"value": [len(fetches)]}
+
+    async def run() -> dict:
+        leader = asyncio.create_task(cache.get_or_fetch(key, fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch(key, fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await asyncio.wait_for(waiter, timeout=1)
+
+    assert asyncio.run(run()) == {"value": [2]}
+    assert fetches == [0, 1]
+
+
+def test_failures_are_not_cached() -> None:
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(403, json={"error": {"code": "Forbidden"}})
+        return httpx.Response(200, json={"value": []})
+
+    cache = GraphReadCache()
+    client = _client(handler, cache)
+
+    async def run() -> dict:
+        try:
+            await client.get("/domains")
+        except httpx.HTTPStatusError:
+            pass
+        return await client.get("/domains")
+
+    assert asyncio.run(run()) == {"value": []}
+    assert len(calls) == 2
+
+
+def test_scan_cache_is_reused_per_scan() -> None:
+    assert get_scan_cache(101) is get_scan_cache(101)
+    assert get_scan_cache(101) is not get_scan_cache(102)
+
+
+def test_streamed_pages_bypass_the_cache() -> None:
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"value": [{"id": "user-1"}]})
+
+    cache = GraphReadCache()
+
+    async def run() -> None:
+        client = _client(handler, cache)
+        for _ in range(2):
+            async for _page in client.iter_pages("/users"):
+                pass
+
+    asyncio.run(run())
+    assert len(requests) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used_beyond_its_limits() -> None:
+    def key(name: str):
+        return GraphReadCache.key("GET", f"https://graph.microsoft.com/v1.0/{name}")
+
+    cache = GraphReadCache(max_entries=2)
+    cache.put(key("a"), {"value": 1})
+    cache.put(key("b"), {"value": 2})
+    cache.get(key("a"))
+    cache.put(key("c"), {"value": 3})
+    assert cache.get(key("b")) is None
+    assert cache.get(key("a")) == {"value": 1}
+
+    # Bounded by the JSON size of what it holds; an oversized response isn't kept
+    cache = GraphReadCache(max_bytes=40)
+    cache.put(key("a"), {"value": "x" * 10})
+    cache.put(key("b"), {"value": "y" * 10})
+    cache.put(key("huge"), {"value": "z" * 100})
+    assert cache.get(key("huge")) is None
+    assert cache.get(key("a")) is None
+    assert cache.get(key("b")) == {"value": "y" * 10}
+    assert cache.stats()["bytes"] <= 40
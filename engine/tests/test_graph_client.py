@@ -0,0 +1,314 @@
+"""Tests for GraphClient request handling against a mocked Graph transport."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from collectors.graph_client import GraphBatchError, GraphClient
+from collectors.graph_throttle import (
+    _ACQUIRE_SCRIPT,
+    _RELEASE_SCRIPT,
+    GraphThrottle,
+    aclose_redis,
+)
+
+
+def _client(handler, **kwargs) -> GraphClient:
+    """GraphClient wired to an httpx.MockTransport with a dummy token."""
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = GraphClient(
+        "contoso.onmicrosoft.com", "client-id", "client-secret", http_client=http_client, **kwargs
+    )
+    client._access_token = "test-token"
+    return client
+
+
+def test_requests_share_one_http_client() -> None:
+    seen_clients = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.headers["Authorization"] == "Bearer test-token"
+        return httpx.Response(200, json={"value": [{"id": request.url.path}]})
+
+    async def run() -> None:
+        client = _client(handler)
+        for _ in range(3):
+            await client.get("/users")
+            seen_clients.add(id(client._get_http_client()))
+
+    asyncio.run(run())
+    assert len(seen_clients) == 1
+
+
+def test_context_manager_closes_owned_pool() -> None:
+    async def run() -> GraphClient:
+        async with GraphClient("contoso.onmicrosoft.com", "client-id", "secret") as client:
+            pool = client._get_http_client()
+            assert not pool.is_closed
+        assert pool.is_closed
+        return client
+
+    asyncio.run(run())
+
+
+def test_context_manager_leaves_injected_pool_open() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={})
+
+    async def run() -> httpx.AsyncClient:
+        client = _client(handler)
+        async with client:
+            await client.get("/organization")
+        return client._http_client
+
+    pool = asyncio.run(run())
+    assert not pool.is_closed
+
+
+def test_get_all_pages_follows_next_link() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", "0"))
+        body = {"value": [{"id": f"user-{page}"}]}
+        if page < 2:
+            body["@odata.nextLink"] = f"{GraphClient.GRAPH_BASE_URL}/users?page={page + 1}"
+        return httpx.Response(200, json=body)
+
+    items = asyncio.run(_client(handler).get_all_pages("/users"))
+    assert [item["id"] for item in items] == ["user-0", "user-1", "user-2"]
+
+
+def test_throttled_request_is_retried_after_retry_after() -> None:
+    attempts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) < 3:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"value": []})
+
+    client = _client(handler, throttle=GraphThrottle("retry.onmicrosoft.com"))
+    assert asyncio.run(client.get("/users")) == {"value": []}
+    assert len(attempts) == 3
+
+
+def test_throttled_request_gives_up_after_max_retries() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, headers={"Retry-After": "0"})
+
+    client = _client(handler, throttle=GraphThrottle("giveup.onmicrosoft.com"))
+    client.MAX_RETRIES = 1
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.get("/users"))
+
+
+def test_throttle_halves_limit_once_per_burst_and_grows_back() -> None:
+    throttle = GraphThrottle("aimd.onmicrosoft.com")
+
+    async def run() -> list[float]:
+        limits = []
+        # A burst of 429s from the same moment counts as one decrease
+        for _ in range(3):
+            await throttle.on_throttled(0)
+        limits.append(throttle._local_state().limit)
+        for _ in range(8):
+            await throttle.on_success()
+        limits.append(throttle._local_state().limit)
+        return limits
+
+    halved, grown = asyncio.run(run())
+    assert halved == GraphThrottle.INITIAL_LIMIT * GraphThrottle.DECREASE_FACTOR
+    assert halved + 0.9 < grown <= halved + 1
+
+
+def test_throttle_slots_cap_concurrency() -> None:
+    throttle = GraphThrottle("slots.onmicrosoft.com")
+    throttle._local_state().limit = 2
+    active = 0
+    peak = 0
+
+    async def request() -> None:
+        nonlocal active, peak
+        async with throttle.slot():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run() -> None:
+        await asyncio.gather(*(request() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_redis_slot_is_one_acquire_and_one_release(monkeypatch) -> None:
+    throttle = GraphThrottle("leases.onmicrosoft.com", redis_url="redis://localhost:6379/0")
+    calls = []
+
+    async def run_script(script, keys, args):
+        calls.append((script, keys[0], args))
+        # Paused for 10 ms on the first attempt, then the slot is free
+        return 10 if len(calls) == 1 else 0
+
+    monkeypatch.setattr(throttle, "_run_script", run_script)
+
+    async def run() -> None:
+        async with throttle.slot():
+            pass
+
+    asyncio.run(run())
+    assert [script for script, _, _ in calls] == [_ACQUIRE_SCRIPT, _ACQUIRE_SCRIPT, _RELEASE_SCRIPT]
+    # Every call targets the same lease of the same holder
+    holder = calls[0][2][1]
+    assert {key for _, key, _ in calls} == {throttle._key("leases")}
+    assert calls[1][2][1] == holder and calls[2][2] == [holder]
+
+
+def test_throttles_on_a_loop_share_one_redis_client() -> None:
+    async def run() -> bool:
+        first = GraphThrottle("first.onmicrosoft.com", redis_url="redis://localhost:6379/0")
+        second = GraphThrottle("second.onmicrosoft.com", redis_url="redis://localhost:6379/0")
+        try:
+            return first._get_redis() is second._get_redis()
+        finally:
+            await aclose_redis()
+
+    assert asyncio.run(run())
+
+
+def _batch_handler(sub_handler, seen_batches: list):
+    """Serve $batch calls by answering each sub-request with sub_handler(url)."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("/$batch")
+        sub_requests = json.loads(request.content)["requests"]
+        seen_batches.append([sub["url"] for sub in sub_requests])
+        responses = []
+        for sub in sub_requests:
+            status, body, headers = sub_handler(sub["url"])
+            responses.append({"id": sub["id"], "status": status, "headers": headers, "body": body})
+        return httpx.Response(200, json={"responses": responses})
+
+    return handler
+
+
+def test_batch_splits_into_chunks_of_twenty() -> None:
+    seen_batches: list = []
+
+    def sub_handler(url: str):
+        user_id = url.split("/")[2].split("?")[0]
+        return 200, {"id": user_id, "displayName": f"User {user_id}"}, {}
+
+    client = _client(_batch_handler(sub_handler, seen_batches))
+    user_ids = [f"u{i}" for i in range(45)]
+    users = asyncio.run(client.get_users_by_ids(user_ids, select="id,displayName"))
+
+    assert [len(batch) for batch in seen_batches] == [20, 20, 5]
+    assert seen_batches[0][0] == "/users/u0?$select=id,displayName"
+    assert list(users) == user_ids
+    assert users["u44"]["displayName"] == "User u44"
+
+
+def test_batch_retries_only_throttled_items() -> None:
+    seen_batches: list = []
+    throttled_once: set = set()
+
+    def sub_handler(url: str):
+        if url.endswith("u1") and url not in throttled_once:
+            throttled_once.add(url)
+            return 429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": "0"}
+        return 200, {"id": url.rsplit("/", 1)[1]}, {}
+
+    client = _client(
+        _batch_handler(sub_handler, seen_batches), throttle=GraphThrottle("batch.onmicrosoft.com")
+    )
+    users = asyncio.run(client.get_users_by_ids(["u0", "u1", "u2"]))
+
+    assert seen_batches == [["/users/u0", "/users/u1", "/users/u2"], ["/users/u1"]]
+    assert {user_id: user["id"] for user_id, user in users.items()} == {
+        "u0": "u0",
+        "u1": "u1",
+        "u2": "u2",
+    }
+
+
+def test_batch_item_failure_raises() -> None:
+    def sub_handler(url: str):
+        return 404, {"error": {"code": "Request_ResourceNotFound", "message": "gone"}}, {}
+
+    client = _client(_batch_handler(sub_handler, []))
+    with pytest.raises(GraphBatchError, match="404"):
+        asyncio.run(client.get_users_by_ids(["deleted-user"]))
+
+
+def test_batch_response_missing_from_reply_raises() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        sub_requests = json.loads(request.content)["requests"]
+        # Graph answers the first sub-request only
+        first = sub_requests[0]
+        return httpx.Response(
+            200, json={"responses": [{"id": first["id"], "status": 200, "body": {}}]}
+        )
+
+    client = _client(handler)
+    requests = [{"method": "GET", "url": "/users/a"}, {"method": "GET", "url": "/users/b"}]
+    with pytest.raises(GraphBatchError, match="/users/b failed with 0: missing from"):
+        asyncio.run(client.batch(requests))
+
+
+def _paged_handler(total_pages: int, requested: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get("page", "0"))
+        requested.append(page)
+        body = {"value": [{"id": f"user-{page}-{i}"} for i in range(3)]}
+        if page + 1 < total_pages:
+            body["@odata.nextLink"] = f"{GraphClient.GRAPH_BASE_URL}/users?page={page + 1}"
+        return httpx.Response(200, json=body)
+
+    return handler
+
+
+def test_iter_pages_reports_truncation_at_page_cap() -> None:
+    requested: list = []
+    client = _client(_paged_handler(5, requested))
+
+    async def run():
+        pages = client.iter_pages("/users", max_pages=2)
+        seen = [page async for page in pages]
+        return pages, seen
+
+    pages, seen = asyncio.run(run())
+    assert len(seen) == 2
+    assert pages.truncated
+    assert pages.next_link.endswith("/users?page=2")
+    assert requested == [0, 1]
+
+
+def test_iter_pages_prefetches_next_page() -> None:
+    requested: list = []
+    client = _client(_paged_handler(3, requested))
+
+    async def run() -> list:
+        requested_while_processing = []
+        async for _ in client.iter_pages("/users"):
+            # Let the prefetch task run while this page is "processed"
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            requested_while_processing.append(list(requested))
+        return requested_while_processing
+
+    assert asyncio.run(run()) == [[0, 1], [0, 1, 2], [0, 1, 2]]
+
+
+def test_iter_items_streams_every_item() -> None:
+    client = _client(_paged_handler(3, []))
+
+    async def run() -> int:
+        count = 0
+        async for _ in client.iter_items("/users"):
+            count += 1
+        return count
+
+    assert asyncio.run(run()) == 9
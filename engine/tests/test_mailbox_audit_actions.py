@@ -0,0 +1,46 @@
+"""Tests for the mailbox audit actions collector with a streamed mailbox list."""
+
+import asyncio
+
+from collectors.exchange.mailbox.mailbox_audit_actions import (
+    REQUIRED_AUDIT_ACTIONS,
+    MailboxAuditActionsDataCollector,
+)
+
+
+class FakePowerShellClient:
+    """Streams a fixed list of mailboxes."""
+
+    def __init__(self, mailboxes: list[dict]):
+        self.mailboxes = mailboxes
+
+    async def stream_cmdlet(self, module: str, cmdlet: str, select: list[str] | None = None):
+        for mailbox in self.mailboxes:
+            yield mailbox
+
+
+def _mailbox(upn: str, **overrides) -> dict:
+    mailbox = {prop: sorted(actions) for prop, actions in REQUIRED_AUDIT_ACTIONS.items()}
+    return {"UserPrincipalName": upn, "AuditEnabled": True, **mailbox, **overrides}
+
+
+def test_only_mailboxes_missing_actions_are_reported() -> None:
+    client = FakePowerShellClient(
+        [
+            _mailbox("adele@contoso.com"),
+            _mailbox("alex@contoso.com", AuditOwner=["Update", "HardDelete"]),
+            _mailbox("megan@contoso.com", AuditAdmin=None, AuditDelegate="Create"),
+        ]
+    )
+
+    data = asyncio.run(MailboxAuditActionsDataCollector().collect(client))
+
+    assert data["total_user_mailboxes"] == 3
+    assert data["non_compliant_count"] == 2
+    alex, megan = data["non_compliant_mailboxes"]
+    assert alex["UserPrincipalName"] == "alex@contoso.com"
+    assert set(alex["missing"]) == {"AuditOwner"}
+    assert "MailboxLogin" in alex["missing"]["AuditOwner"]
+    assert "Update" not in alex["missing"]["AuditOwner"]
+    assert megan["missing"]["AuditAdmin"] == sorted(REQUIRED_AUDIT_ACTIONS["AuditAdmin"])
+    assert "Create" not in megan["missing"]["AuditDelegate"]
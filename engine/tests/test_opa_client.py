@@ -0,0 +1,141 @@
+"""Tests for OPAClient request building and response handling."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import opa_client as opa_client_module
+from opa_client import OPAClient, rego_result_ref
+
+
+@pytest.fixture
+def opa_requests(monkeypatch):
+    """Route OPAClient HTTP calls to a handler and record the requests it sees."""
+    seen: list[httpx.Request] = []
+    responses: dict[str, dict] = {}
+    real_async_client = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json=responses.get(request.url.path, {}))
+
+    def mock_async_client(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        return real_async_client(*args, **kwargs)
+
+    monkeypatch.setattr(opa_client_module.httpx, "AsyncClient", mock_async_client)
+    return seen, responses
+
+
+def test_result_ref_quotes_every_segment() -> None:
+    ref = rego_result_ref("essential_eight/asd_essential_eight/v2025/control_e8_mac_2_1")
+    assert ref == (
+        'data["essential_eight"]["asd_essential_eight"]["v2025"]["control_e8_mac_2_1"]["result"]'
+    )
+
+
+def test_evaluate_policies_sends_input_once(opa_requests) -> None:
+    seen, responses = opa_requests
+    responses["/v1/query"] = {
+        "result": [
+            {
+                "x0": [{"compliant": True, "message": "ok"}],
+                "x1": [],
+            }
+        ]
+    }
+    paths = [
+        "cis/microsoft_365_foundations/v6_0_0/control_1_2_1",
+        "cis/microsoft_365_foundations/v6_0_0/control_5_1_3_1",
+    ]
+
+    results = asyncio.run(
+        OPAClient("http://opa:8181").evaluate_policies(paths, {"groups": [{"id": "g1"}]})
+    )
+
+    assert len(seen) == 1
+    body = json.loads(seen[0].content)
+    assert body["input"] == {"groups": [{"id": "g1"}]}
+    assert body["query"].count("x0 :=") == 1 and body["query"].count("x1 :=") == 1
+    assert results == {
+        paths[0]: {"compliant": True, "message": "ok"},
+        paths[1]: {},
+    }
+
+
+def test_evaluate_policies_with_no_packages_skips_opa(opa_requests) -> None:
+    seen, _ = opa_requests
+    assert asyncio.run(OPAClient("http://opa:8181").evaluate_policies([], {})) == {}
+    assert seen == []
+
+
+def test_pool_is_shared_by_the_tasks_of_one_loop(monkeypatch) -> None:
+    created = []
+    real_async_client = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"result": {"compliant": True}})
+
+    def mock_async_client(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        created.append(real_async_client(*args, **kwargs))
+        return created[-1]
+
+    monkeypatch.setattr(opa_client_module.httpx, "AsyncClient", mock_async_client)
+    client = OPAClient("http://opa:8181")
+
+    async def run_controls() -> list[dict]:
+        try:
+            return await asyncio.gather(
+                *(client.evaluate_policy(f"pkg/control_{i}", {}) for i in range(5))
+            )
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run_controls()) == [{"compliant": True}] * 5
+    # A second loop gets its own pool
+    asyncio.run(run_controls())
+    assert len(created) == 2
+    assert all(pool.is_closed for pool in created)
+
+
+def test_connection_errors_are_retried(monkeypatch) -> None:
+    attempts = []
+    real_async_client = httpx.AsyncClient
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) < 3:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"result": {"compliant": False}})
+
+    def mock_async_client(*args, **kwargs):
+        kwargs["transport"] = httpx.MockTransport(handler)
+        return real_async_client(*args, **kwargs)
+
+    monkeypatch.setattr(opa_client_module.httpx, "AsyncClient", mock_async_client)
+    monkeypatch.setattr(OPAClient, "RETRY_BASE_DELAY", 0.0)
+
+    result = asyncio.run(OPAClient("http://opa:8181", max_retries=3).evaluate_policy("pkg", {}))
+    assert result == {"compliant": False}
+    assert len(attempts) == 3
+
+    attempts.clear()
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(OPAClient("http://opa:8181", max_retries=1).evaluate_policy("pkg", {}))
+    assert len(attempts) == 2
+
+
+def test_socket_path_uses_a_unix_socket_transport() -> None:
+    client = OPAClient("http://opa", socket_path="/run/opa/opa.sock")
+
+    async def transport_socket():
+        try:
+            pool = client._http_client()._transport._pool
+            return pool._uds
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(transport_socket()) == "/run/opa/opa.sock"
@@ -0,0 +1,186 @@
+"""Tests for PowerShellClient's HTTP service path, with the service mocked."""
+
+import asyncio
+import functools
+import json
+
+import httpx
+import pytest
+
+from collectors import powershell_client
+from collectors.powershell_client import PowerShellClient, PowerShellExecutionError
+from collectors.service_router import ServiceRouter
+
+
+class FakeTokenCache:
+    async def acquire_token(self, tenant_id, client_id, client_secret, scope):
+        return f"token-for-{scope}"
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """Route the client's service requests to a handler set by the test."""
+    state = {"handler": None, "requests": []}
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        state["requests"].append(request)
+        return state["handler"](request)
+
+    monkeypatch.setattr(
+        powershell_client.httpx,
+        "AsyncClient",
+        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handle)),
+    )
+    monkeypatch.setattr(PowerShellClient, "_service_retry_delay", lambda self, response, attempt: 0)
+    return state
+
+
+def make_client() -> PowerShellClient:
+    return PowerShellClient(
+        "contoso.onmicrosoft.com",
+        "client",
+        "secret",
+        service_url="http://powershell-service:8001",
+        token_cache=FakeTokenCache(),
+    )
+
+
+def test_run_cmdlet_retries_when_service_is_at_capacity(service) -> None:
+    responses = iter(
+        [
+            httpx.Response(429, headers={"Retry-After": "1"}),
+            httpx.Response(200, json={"success": True, "data": {"Name": "contoso"}}),
+        ]
+    )
+    service["handler"] = lambda request: next(responses)
+
+    result = asyncio.run(make_client().run_cmdlet("ExchangeOnline", "Get-OrganizationConfig"))
+
+    assert result == {"Name": "contoso"}
+    assert len(service["requests"]) == 2
+
+
+def test_run_cmdlets_returns_errors_in_place(service) -> None:
+    service["handler"] = lambda request: httpx.Response(
+        200,
+        json={
+            "success": True,
+            "results": [
+                {"success": True, "data": {"Name": "contoso"}},
+                {"success": False, "error": "cmdlet failed"},
+            ],
+        },
+    )
+
+    org, transport = asyncio.run(
+        make_client().run_cmdlets(
+            "ExchangeOnline", [("Get-OrganizationConfig", {}), ("Get-TransportConfig", {})]
+        )
+    )
+
+    assert org == {"Name": "contoso"}
+    assert isinstance(transport, PowerShellExecutionError)
+    [request] = service["requests"]
+    assert request.url.path == "/execute-batch"
+
+
+def test_run_cmdlet_sends_property_projection(service) -> None:
+    service["handler"] = lambda request: httpx.Response(200, json={"success": True, "data": []})
+
+    asyncio.run(
+        make_client().run_cmdlet(
+            "ExchangeOnline", "Get-SafeLinksPolicy", select=["Name", "ScanUrls"], Identity="x"
+        )
+    )
+
+    body = json.loads(service["requests"][0].content)
+    assert body["properties"] == ["Name", "ScanUrls"]
+    assert body["params"] == {"Identity": "x"}
+
+
+def test_docker_script_projects_properties() -> None:
+    client = make_client()
+    script = client._build_script("ExchangeOnline", "Get-SafeLinksPolicy", {}, ["Name", "ScanUrls"])
+
+    assert "Get-SafeLinksPolicy | Select-Object -Property Name, ScanUrls" in script
+    assert "ConvertTo-Json -Depth 3" in script
+    with pytest.raises(ValueError, match="Invalid property name"):
+        client._build_script("ExchangeOnline", "Get-SafeLinksPolicy", {}, ["Name; Remove-Item"])
+
+
+def test_stream_cmdlet_yields_ndjson_items(service) -> None:
+    lines = [{"item": {"Identity": "a"}}, {"item": {"Identity": "b"}}, {"done": True, "count": 2}]
+    service["handler"] = lambda request: httpx.Response(
+        200, content="".join(json.dumps(line) + "\n" for line in lines)
+    )
+
+    async def collect():
+        client = make_client()
+        return [item async for item in client.stream_cmdlet("ExchangeOnline", "Get-EXOMailbox")]
+
+    assert asyncio.run(collect()) == [{"Identity": "a"}, {"Identity": "b"}]
+    assert service["requests"][0].url.path == "/execute-stream"
+
+
+def test_stream_cmdlet_raises_on_error_or_truncated_stream(service) -> None:
+    async def collect():
+        client = make_client()
+        return [item async for item in client.stream_cmdlet("ExchangeOnline", "Get-EXOMailbox")]
+
+    service["handler"] = lambda request: httpx.Response(
+        200, content='{"item": {"Identity": "a"}}\n{"error": "session exited"}\n'
+    )
+    with pytest.raises(PowerShellExecutionError, match="session exited"):
+        asyncio.run(collect())
+
+    service["handler"] = lambda request: httpx.Response(200, content='{"item": {}}\n')
+    with pytest.raises(PowerShellExecutionError, match="ended before"):
+        asyncio.run(collect())
+
+
+def test_requests_fail_over_to_the_next_replica(service) -> None:
+    router = ServiceRouter(["http://ps-a:8001", "http://ps-b:8001", "http://ps-c:8001"])
+    home, second, _ = router.rank("contoso.onmicrosoft.com")
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if f"http://{request.url.host}:8001" == home:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"success": True, "data": {"Name": "contoso"}})
+
+    service["handler"] = handle
+    client = PowerShellClient(
+        "contoso.onmicrosoft.com",
+        "client",
+        "secret",
+        service_url=",".join(router.urls),
+        token_cache=FakeTokenCache(),
+        service_router=router,
+    )
+
+    assert asyncio.run(client.run_cmdlet("ExchangeOnline", "Get-OrganizationConfig")) == {
+        "Name": "contoso"
+    }
+    assert [f"http://{request.url.host}:8001" for request in service["requests"]] == [home, second]
+    # The down replica is skipped until its cooldown ends
+    asyncio.run(client.run_cmdlet("ExchangeOnline", "Get-OrganizationConfig"))
+    assert f"http://{service['requests'][-1].url.host}:8001" == second
+
+
+def test_requests_share_one_pool_until_closed(service) -> None:
+    service["handler"] = lambda request: httpx.Response(
+        200, json={"success": True, "data": {"Name": "contoso"}}
+    )
+    client = make_client()
+
+    async def run() -> list[httpx.AsyncClient]:
+        pools = []
+        async with client:
+            for _ in range(2):
+                await client.run_cmdlet("ExchangeOnline", "Get-OrganizationConfig")
+                pools.append(client._http_client())
+        return pools
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert first.is_closed
+    assert len(service["requests"]) == 2
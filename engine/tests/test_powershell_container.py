@@ -0,0 +1,112 @@
+"""Tests for the long-lived PowerShell container, with docker replaced by a fake CLI.
+
+The fake records every invocation. `docker run -i` blocks reading stdin like
+the container's cat, `docker inspect` reports it running until then, and
+`docker exec` (and a one-off `docker run`) answer with the container name and the
+token they were given.
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+import textwrap
+
+import pytest
+
+from collectors import powershell_container
+from collectors.powershell_client import PowerShellClient
+
+FAKE_DOCKER = textwrap.dedent(
+    """
+    import json, os, sys
+
+    state = os.environ["FAKE_DOCKER_STATE"]
+    args = sys.argv[1:]
+    with open(os.path.join(state, "calls.jsonl"), "a") as calls:
+        calls.write(json.dumps(args) + "\\n")
+
+    if args[0] == "images":
+        print("0123456789ab")
+    elif args[0] == "run" and "-i" in args:
+        name = args[args.index("--name") + 1]
+        running = os.path.join(state, name)
+        open(running, "w").close()
+        sys.stdin.read()
+        os.remove(running)
+    elif args[0] == "inspect":
+        print("true" if os.path.exists(os.path.join(state, args[-1])) else "false")
+    elif args[0] == "exec":
+        name = args[args.index("pwsh") - 1]
+        print(json.dumps({"container": name, "token": os.environ.get("EXO_TOKEN")}))
+    elif args[0] == "run":
+        print(json.dumps({"container": None, "token": os.environ.get("EXO_TOKEN")}))
+    """
+)
+
+
+class FakeTokenCache:
+    async def acquire_token(self, tenant_id, client_id, client_secret, scope):
+        return "secret-token"
+
+
+@pytest.fixture
+def docker(tmp_path, monkeypatch):
+    """Put a fake docker CLI first on PATH; returns the calls it received."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "docker"
+    script.write_text(f"#!{sys.executable}\n{FAKE_DOCKER}")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_DOCKER_STATE", str(tmp_path))
+    monkeypatch.setattr(powershell_container, "_checked_images", set())
+
+    def calls():
+        lines = (tmp_path / "calls.jsonl").read_text().splitlines()
+        return [json.loads(line) for line in lines]
+
+    yield calls
+    powershell_container.shutdown_container()
+
+
+def make_client(**kwargs) -> PowerShellClient:
+    return PowerShellClient(
+        "contoso.onmicrosoft.com", "client", "secret", token_cache=FakeTokenCache(), **kwargs
+    )
+
+
+def test_cmdlets_share_one_container_per_process(docker) -> None:
+    async def run_twice():
+        first = await make_client().run_cmdlet("ExchangeOnline", "Get-OrganizationConfig")
+        second = await make_client().run_cmdlet("ExchangeOnline", "Get-TransportConfig")
+        return first, second
+
+    first, second = asyncio.run(run_twice())
+
+    assert first["container"] == second["container"]
+    assert first["token"] == "secret-token"
+    calls = docker()
+    assert [call[0] for call in calls].count("run") == 1
+    # The image is checked once, not by every client
+    assert [call[0] for call in calls].count("images") == 1
+    # Tokens reach docker through its environment, never its command line
+    assert not any("secret-token" in arg for call in calls for arg in call)
+
+
+def test_shutdown_removes_the_container(docker, tmp_path) -> None:
+    result = asyncio.run(make_client().run_cmdlet("ExchangeOnline", "Get-OrganizationConfig"))
+    assert (tmp_path / result["container"]).exists()
+
+    powershell_container.shutdown_container()
+
+    assert not (tmp_path / result["container"]).exists()
+
+
+def test_per_cmdlet_mode_runs_a_new_container(docker) -> None:
+    client = make_client(docker_mode="per_cmdlet")
+    asyncio.run(client.run_cmdlet("ExchangeOnline", "Get-OrganizationConfig"))
+
+    [run] = [call for call in docker() if call[0] == "run"]
+    assert run[:4] == ["run", "--rm", "-e", "EXO_TOKEN"]
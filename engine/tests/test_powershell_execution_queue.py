@@ -0,0 +1,112 @@
+"""Tests for the PowerShell service's bounded execution queue."""
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "powershell" / "service"))
+
+from execution_queue import (  # noqa: E402
+    CapacityExceededError,
+    ClientDisconnectedError,
+    ExecutionQueue,
+)
+
+
+def blocking(release: threading.Event, cancel: threading.Event) -> str:
+    """Stand-in for a pwsh execution: runs until released or cancelled."""
+    while not release.is_set():
+        if cancel.wait(0.01):
+            return "cancelled"
+    return "done"
+
+
+def test_queue_runs_work_off_the_event_loop() -> None:
+    async def main():
+        queue = ExecutionQueue(max_workers=2, max_queued=0)
+        release = threading.Event()
+        task = asyncio.ensure_future(queue.submit(blocking, release))
+        # The loop stays responsive while the work blocks its thread
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        release.set()
+        return await task, queue
+
+    result, queue = asyncio.run(main())
+
+    assert result == "done"
+    assert queue.stats()["pending"] == 0
+
+
+def test_queue_rejects_work_over_capacity() -> None:
+    async def main():
+        queue = ExecutionQueue(max_workers=1, max_queued=1)
+        release = threading.Event()
+        running = [asyncio.ensure_future(queue.submit(blocking, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(CapacityExceededError):
+            await queue.submit(blocking, release)
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(main()) == ["done", "done"]
+
+
+def test_queue_cancels_work_when_client_disconnects() -> None:
+    cancelled = threading.Event()
+
+    def work(cancel: threading.Event) -> None:
+        cancel.wait(5)
+        cancelled.set()
+
+    async def is_disconnected() -> bool:
+        return True
+
+    async def main():
+        queue = ExecutionQueue(max_workers=1, max_queued=0)
+        with pytest.raises(ClientDisconnectedError):
+            await queue.submit(work, is_disconnected=is_disconnected)
+
+    asyncio.run(main())
+
+    assert cancelled.wait(1)
+
+
+def test_stream_relays_items_and_cancels_when_consumer_stops() -> None:
+    finished = threading.Event()
+
+    def numbers(cancel: threading.Event):
+        try:
+            for index in range(1000):
+                if cancel.is_set():
+                    return
+                yield index
+        finally:
+            finished.set()
+
+    async def main():
+        queue = ExecutionQueue(max_workers=1, max_queued=0)
+        items = queue.stream(numbers)
+        with pytest.raises(CapacityExceededError):
+            queue.stream(numbers)
+        first = []
+        async for item in items:
+            first.append(item)
+            if len(first) == 3:
+                break
+        await items.aclose()
+        # The worker thread is freed once the generator has stopped
+        for _ in range(100):
+            if queue.stats()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return first, queue
+
+    first, queue = asyncio.run(main())
+
+    assert first == [0, 1, 2]
+    assert finished.wait(1)
+    assert queue.stats()["pending"] == 0
@@ -0,0 +1,83 @@
+"""Tests for the PowerShell service's cmdlet result cache."""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "powershell" / "service"))
+
+from result_cache import ResultCache, parse_ttls  # noqa: E402
+
+TENANT = "contoso.onmicrosoft.com"
+
+
+def key(cmdlet="Get-OrganizationConfig", params=None, token="token-1", properties=None):
+    return ResultCache.key(TENANT, "ExchangeOnline", cmdlet, params or {}, token, properties)
+
+
+def test_cache_keys_canonicalize_params() -> None:
+    assert key(params={"A": 1, "B": "x"}) == key(params={"B": "x", "A": 1})
+    assert key(params={"A": 1}) != key(params={"A": 2})
+    # Results are only served to callers presenting the same token
+    assert key(token="token-1") != key(token="token-2")
+    # A projection is a different result
+    assert key() != key(properties=["Name"])
+
+
+def test_cache_stores_only_cmdlets_with_a_ttl() -> None:
+    cache = ResultCache(ttls={"Get-OrganizationConfig": 60})
+    cache.put(key(), {"Name": "contoso"})
+    cache.put(key("Get-EXOMailbox"), [{"Name": "user"}])
+
+    assert cache.get(key("get-organizationconfig")) == (True, {"Name": "contoso"})
+    assert cache.get(key("Get-EXOMailbox")) == (False, None)
+
+
+def test_cache_expires_and_evicts_least_recently_used(monkeypatch) -> None:
+    cache = ResultCache(max_entries=2, ttls={"Get-A": 60, "Get-B": 60, "Get-C": 60})
+    for cmdlet in ("Get-A", "Get-B"):
+        cache.put(key(cmdlet), cmdlet)
+    cache.get(key("Get-A"))
+    cache.put(key("Get-C"), "Get-C")
+
+    assert cache.get(key("Get-B")) == (False, None)
+    assert cache.get(key("Get-A")) == (True, "Get-A")
+
+    now = time.monotonic()
+    monkeypatch.setattr("result_cache.time.monotonic", lambda: now + 61)
+    assert cache.get(key("Get-A")) == (False, None)
+
+
+def test_parse_ttls() -> None:
+    assert parse_ttls("Get-A=60, Get-B=5.5,") == {"Get-A": 60.0, "Get-B": 5.5}
+
+
+def test_execute_endpoint_serves_repeats_from_cache(monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    calls = []
+
+    def fake_execute(cancel=None, **kwargs):
+        calls.append(kwargs["cmdlet"])
+        return {"Name": "contoso"}
+
+    monkeypatch.setattr(main, "session_pool", None)
+    monkeypatch.setattr(main, "execute_cmdlet", fake_execute)
+    monkeypatch.setattr(main, "result_cache", ResultCache(ttls={"Get-OrganizationConfig": 60}))
+    client = TestClient(main.app)
+    body = {
+        "module": "ExchangeOnline",
+        "cmdlet": "Get-OrganizationConfig",
+        "tenant_id": TENANT,
+        "token": "token-1",
+    }
+
+    first = client.post("/execute", json=body).json()
+    second = client.post("/execute", json=body).json()
+    bypassed = client.post("/execute", json={**body, "no_cache": True}).json()
+
+    assert (first["cached"], second["cached"], bypassed["cached"]) == (False, True, False)
+    assert second["data"] == {"Name": "contoso"}
+    assert calls == ["Get-OrganizationConfig", "Get-OrganizationConfig"]
@@ -0,0 +1,254 @@
+"""Tests for the PowerShell service session pool, with pwsh replaced by a fake host.
+
+The fake host speaks session_host.ps1's protocol: connect scripts record the
+token they were given, and cmdlet scripts answer with the cmdlet name, the
+connected token and the host's pid.
+"""
+
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "powershell" / "service"))
+
+from executor import (  # noqa: E402
+    PowerShellExecutionError,
+    build_cmdlet_script,
+    build_stream_script,
+)
+from session_pool import SessionPool  # noqa: E402
+
+TENANT = "contoso.onmicrosoft.com"
+
+FAKE_HOST = textwrap.dedent(
+    """
+    import json, os, re, sys
+
+    MARKER = "__AUTOAUDIT_RESPONSE__"
+    ITEM = "__AUTOAUDIT_ITEM__"
+    token = None
+    for line in sys.stdin:
+        request = json.loads(line)
+        script = request["script"]
+        os.environ.update(request["env"])
+        response = {"id": request["id"], "ok": True, "output": ""}
+        # Stray host output must be ignored by the reader
+        print("WARNING: something chatty")
+        if "Connect-" in script:
+            token = os.environ.get("EXO_TOKEN")
+        elif "Get-Fail" in script:
+            response = {"id": request["id"], "ok": False, "error": "cmdlet failed"}
+        elif "Get-Hang" in script:
+            continue
+        elif request.get("stream"):
+            count = re.search(r"-Count (\\d+)", script)
+            for index in range(int(count.group(1)) if count else 3):
+                print(ITEM + json.dumps({"index": index, "pid": os.getpid()}))
+        elif "$result" in script:
+            cmdlet = re.search(r"\\$result = (\\S+)", script).group(1)
+            output = {"cmdlet": cmdlet, "token": token, "pid": os.getpid()}
+            response["output"] = json.dumps(output)
+        print(MARKER + json.dumps(response), flush=True)
+    """
+)
+
+
+@pytest.fixture
+def pool():
+    pool = SessionPool(max_sessions=2, command=[sys.executable, "-c", FAKE_HOST])
+    yield pool
+    pool.close()
+
+
+def run(pool, cmdlet, token="token-1", tenant_id=TENANT, module="ExchangeOnline", **kwargs):
+    return pool.execute_cmdlet(
+        module=module, cmdlet=cmdlet, params={}, tenant_id=tenant_id, token=token, **kwargs
+    )
+
+
+def test_pool_reuses_connected_session(pool) -> None:
+    first = run(pool, "Get-OrganizationConfig")
+    second = run(pool, "Get-TransportConfig")
+
+    assert first["cmdlet"] == "Get-OrganizationConfig"
+    assert first["token"] == "token-1"
+    assert second["pid"] == first["pid"]
+    assert pool.stats() == {"idle": 1, "busy": 0, "max": 2}
+
+
+def test_pool_reconnects_on_new_token(pool) -> None:
+    first = run(pool, "Get-OrganizationConfig", token="token-1")
+    second = run(pool, "Get-OrganizationConfig", token="token-2")
+
+    assert second["pid"] == first["pid"]
+    assert second["token"] == "token-2"
+
+
+def test_pool_evicts_least_recently_used_session(pool) -> None:
+    a = run(pool, "Get-OrganizationConfig", tenant_id="a.onmicrosoft.com")
+    run(pool, "Get-OrganizationConfig", tenant_id="b.onmicrosoft.com")
+    run(pool, "Get-OrganizationConfig", tenant_id="c.onmicrosoft.com")
+
+    assert pool.stats()["idle"] == 2
+    # Tenant a's session was the least recently used, so it was closed
+    assert run(pool, "Get-OrganizationConfig", tenant_id="a.onmicrosoft.com")["pid"] != a["pid"]
+
+
+def test_pool_drops_idle_sessions_after_ttl(pool) -> None:
+    first = run(pool, "Get-OrganizationConfig")
+    pool.idle_ttl = 0
+
+    assert run(pool, "Get-OrganizationConfig")["pid"] != first["pid"]
+
+
+def test_cmdlet_error_keeps_session(pool) -> None:
+    first = run(pool, "Get-OrganizationConfig")
+    with pytest.raises(PowerShellExecutionError, match="cmdlet failed"):
+        run(pool, "Get-Fail")
+
+    assert run(pool, "Get-OrganizationConfig")["pid"] == first["pid"]
+
+
+def test_timeout_replaces_session(pool) -> None:
+    first = run(pool, "Get-OrganizationConfig")
+    with pytest.raises(PowerShellExecutionError, match="timed out"):
+        run(pool, "Get-Hang", timeout=0.5)
+
+    assert pool.stats()["idle"] == 0
+    assert run(pool, "Get-OrganizationConfig")["pid"] != first["pid"]
+
+
+def test_teams_requires_graph_token(pool) -> None:
+    with pytest.raises(ValueError, match="graph_token"):
+        run(pool, "Get-CsTenant", module="Teams")
+    assert pool.stats() == {"idle": 0, "busy": 0, "max": 2}
+
+
+def test_batch_runs_cmdlets_in_order_on_one_session(pool) -> None:
+    results = pool.execute_cmdlets(
+        module="ExchangeOnline",
+        cmdlets=[("Get-OrganizationConfig", {}), ("Get-Fail", {}), ("Get-TransportConfig", {})],
+        tenant_id=TENANT,
+        token="token-1",
+    )
+
+    first, failed, last = results
+    assert first["cmdlet"] == "Get-OrganizationConfig"
+    assert isinstance(failed, PowerShellExecutionError)
+    assert last["cmdlet"] == "Get-TransportConfig"
+    assert last["pid"] == first["pid"]
+
+
+def test_execute_batch_endpoint_returns_per_cmdlet_results(pool, monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "session_pool", pool)
+    response = TestClient(main.app).post(
+        "/execute-batch",
+        json={
+            "module": "ExchangeOnline",
+            "cmdlets": [{"cmdlet": "Get-OrganizationConfig"}, {"cmdlet": "Get-Fail"}],
+            "tenant_id": TENANT,
+            "token": "token-1",
+        },
+    )
+
+    body = response.json()
+    assert body["success"] is True
+    assert [item["success"] for item in body["results"]] == [True, False]
+    assert body["results"][0]["data"]["cmdlet"] == "Get-OrganizationConfig"
+    assert "cmdlet failed" in body["results"][1]["error"]
+
+
+def test_cmdlet_script_projects_properties() -> None:
+    script = build_cmdlet_script("Get-AntiPhishPolicy", {}, ["Name", "IsDefault"])
+
+    assert "$result = Get-AntiPhishPolicy | Select-Object -Property Name, IsDefault" in script
+    assert "ConvertTo-Json -Depth 3" in script
+    assert "ConvertTo-Json -Depth 10" in build_cmdlet_script("Get-AntiPhishPolicy", {})
+
+
+def test_invalid_property_names_are_rejected(pool, monkeypatch) -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with pytest.raises(ValueError, match="Invalid property name"):
+        run(pool, "Get-OrganizationConfig", properties=["Name", "$(Remove-Item x)"])
+    assert pool.stats() == {"idle": 0, "busy": 0, "max": 2}
+
+    monkeypatch.setattr(main, "session_pool", pool)
+    response = TestClient(main.app).post(
+        "/execute",
+        json={
+            "module": "ExchangeOnline",
+            "cmdlet": "Get-OrganizationConfig",
+            "properties": ["Name; Remove-Item x"],
+            "tenant_id": TENANT,
+            "token": "token-1",
+        },
+    )
+    assert response.status_code == 422
+
+
+def test_stream_script_writes_one_marked_line_per_object() -> None:
+    script = build_stream_script("Get-EXOMailbox", {"ResultSize": "Unlimited"}, ["Identity"])
+
+    assert 'Get-EXOMailbox -ResultSize "Unlimited" | Select-Object -Property Identity' in script
+    assert "'__AUTOAUDIT_ITEM__' + ($_ | ConvertTo-Json -Depth 3 -Compress)" in script
+
+
+def stream(pool, token="token-1", **params):
+    return pool.stream_cmdlet(
+        module="ExchangeOnline",
+        cmdlet="Get-EXOMailbox",
+        params=params,
+        tenant_id=TENANT,
+        token=token,
+    )
+
+
+def test_stream_yields_items_and_keeps_session(pool) -> None:
+    items = list(stream(pool))
+
+    assert [item["index"] for item in items] == [0, 1, 2]
+    assert pool.stats() == {"idle": 1, "busy": 0, "max": 2}
+    assert run(pool, "Get-OrganizationConfig")["pid"] == items[0]["pid"]
+
+
+def test_abandoned_stream_closes_session(pool) -> None:
+    items = stream(pool, Count=5000)
+    first = next(items)
+    items.close()
+
+    assert pool.stats() == {"idle": 0, "busy": 0, "max": 2}
+    assert run(pool, "Get-OrganizationConfig")["pid"] != first["pid"]
+
+
+def test_execute_stream_endpoint_returns_ndjson(pool, monkeypatch) -> None:
+    import json
+
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "session_pool", pool)
+    response = TestClient(main.app).post(
+        "/execute-stream",
+        json={
+            "module": "ExchangeOnline",
+            "cmdlet": "Get-EXOMailbox",
+            "params": {"Count": 2},
+            "tenant_id": TENANT,
+            "token": "token-1",
+        },
+    )
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["item"]["index"] for line in lines[:-1]] == [0, 1]
+    assert lines[-1] == {"done": True, "count": 2}
@@ -0,0 +1,197 @@
+"""Tests for the in-process Rego evaluator.
+
+Every policy under engine/policies has a compliant and a non-compliant input
+in policy_inputs.json, shaped like its collector's output. Each is evaluated
+embedded and checked for the expected outcome; the parity check also runs
+them through a real OPA server and needs the `opa` binary on PATH (the same
+CLI the OPA eval workflow installs). Without it only the embedded-only checks
+run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import shutil
+import socket
+import subprocess
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+pytest.importorskip("regopy")
+
+from opa_client import OPAClient  # noqa: E402
+from rego_evaluator import EmbeddedEvaluationError, EmbeddedPolicyEvaluator  # noqa: E402
+
+ENGINE_ROOT = Path(__file__).resolve().parent.parent
+POLICIES_DIR = ENGINE_ROOT / "policies"
+
+_REGO_FILES = sorted(POLICIES_DIR.rglob("*.rego"))
+_REGO_IDS = [str(p.relative_to(POLICIES_DIR)) for p in _REGO_FILES]
+
+# Compliant and non-compliant input of each policy, by path under POLICIES_DIR
+with open(Path(__file__).parent / "policy_inputs.json", encoding="utf-8") as _f:
+    _POLICY_INPUTS: dict[str, dict[str, dict]] = json.load(_f)
+
+_CASES = [
+    pytest.param(rego_path, case, id=f"{rego_id}-{case}")
+    for rego_path, rego_id in zip(_REGO_FILES, _REGO_IDS)
+    for case in ("compliant", "non_compliant")
+    if case in _POLICY_INPUTS.get(rego_id, {})
+]
+
+# Inputs rego-cpp can't evaluate. The embedded evaluator must raise for these
+# (so they go to the OPA fallback) rather than return a wrong decision.
+_EMBEDDED_UNSUPPORTED = {
+    ("cis/microsoft-365-foundations/v6.0.0/2.1.11_Comprehensive_Attachment_Filtering_Applied.rego",
+     "compliant"): "output is not valid JSON",
+    ("cis/microsoft-365-foundations/v6.0.0/2.1.11_Comprehensive_Attachment_Filtering_Applied.rego",
+     "non_compliant"): "output is not valid JSON",
+    ("cis/microsoft-365-foundations/v6.0.0/5.1.3.1_dynamic_guest_group_exists.rego",
+     "compliant"): "double quotes in membershipRule are not escaped in the output",
+}
+
+# Policies that report non-compliant whatever the input. 2.1.15 compares
+# NotifyOutboundSpamRecipients to a set, which no JSON array equals.
+_NEVER_COMPLIANT = {
+    "cis/microsoft-365-foundations/v6.0.0/2.1.15_Outbound_AntiSpam_MessageLimits_InPlace.rego",
+}
+
+
+def _package_path(rego_path: Path) -> str:
+    for line in rego_path.read_text(encoding="utf-8").splitlines():
+        if line.startswith("package "):
+            return line.split()[1].replace(".", "/")
+    raise AssertionError(f"{rego_path} has no package declaration")
+
+
+def _rego_id(rego_path: Path) -> str:
+    return str(rego_path.relative_to(POLICIES_DIR))
+
+
+@pytest.fixture(scope="module")
+def embedded() -> EmbeddedPolicyEvaluator:
+    return EmbeddedPolicyEvaluator(POLICIES_DIR)
+
+
+@pytest.fixture(scope="module")
+def opa_server():
+    """Start `opa run --server` over the policy tree on a free port."""
+    opa = shutil.which("opa")
+    if opa is None:
+        pytest.skip("opa binary not on PATH")
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    proc = subprocess.Popen(
+        [opa, "run", "--server", f"--addr=127.0.0.1:{port}", str(POLICIES_DIR)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                if httpx.get(f"{base_url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        else:
+            pytest.fail("OPA server did not become healthy")
+        yield OPAClient(base_url)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+@pytest.mark.parametrize("rego_id", _REGO_IDS)
+def test_every_policy_has_inputs(rego_id):
+    assert set(_POLICY_INPUTS.get(rego_id, {})) == {"compliant", "non_compliant"}, (
+        f"add a compliant and a non_compliant input for {rego_id} to policy_inputs.json"
+    )
+
+
+def test_known_gaps_are_current():
+    cases = {(_rego_id(param.values[0]), param.values[1]) for param in _CASES}
+    assert set(_EMBEDDED_UNSUPPORTED) <= cases
+    assert _NEVER_COMPLIANT <= set(_REGO_IDS)
+
+
+@pytest.mark.parametrize(("rego_path", "case"), _CASES)
+def test_embedded_outcome(rego_path, case, embedded):
+    rego_id = _rego_id(rego_path)
+    package_path = _package_path(rego_path)
+    input_data = _POLICY_INPUTS[rego_id][case]
+
+    if (rego_id, case) in _EMBEDDED_UNSUPPORTED:
+        with pytest.raises(EmbeddedEvaluationError):
+            embedded.evaluate_sync(package_path, input_data)
+        return
+
+    result = embedded.evaluate_sync(package_path, input_data)
+    expected = case == "compliant" and rego_id not in _NEVER_COMPLIANT
+    assert result["compliant"] is expected, result["message"]
+
+
+@pytest.mark.parametrize(("rego_path", "case"), _CASES)
+def test_embedded_matches_opa_server(rego_path, case, embedded, opa_server):
+    rego_id = _rego_id(rego_path)
+    package_path = _package_path(rego_path)
+    input_data = _POLICY_INPUTS[rego_id][case]
+
+    expected = asyncio.run(opa_server.evaluate_policy(package_path, input_data))
+    if (rego_id, case) in _EMBEDDED_UNSUPPORTED:
+        # Sent to the OPA fallback, so OPA's decision is the one that counts
+        with pytest.raises(EmbeddedEvaluationError):
+            embedded.evaluate_sync(package_path, input_data)
+        return
+
+    assert embedded.evaluate_sync(package_path, input_data) == expected
+
+
+def test_unknown_package_is_undefined(embedded):
+    assert embedded.evaluate_sync("cis/no_such_benchmark/v0/control_0", {}) == {}
+
+
+def test_evaluates_policy_result(embedded):
+    result = embedded.evaluate_sync(
+        "cis/microsoft_365_foundations/v6_0_0/control_5_2_3_4",
+        {
+            "total_users": 4,
+            "mfa_capable_count": 3,
+            "mfa_registered_count": 3,
+            "mfa_not_registered_count": 1,
+            "mfa_registration_percentage": 75.0,
+        },
+    )
+    assert result["compliant"] is False
+    assert result["message"] == "3 of 4 users are MFA capable"
+
+
+def test_evaluate_policies_sends_unsupported_packages_to_fallback():
+    class FailingEvaluator(EmbeddedPolicyEvaluator):
+        def evaluate_sync(self, package_path, input_data):
+            if package_path.endswith("unsupported"):
+                raise EmbeddedEvaluationError("not supported")
+            return {"compliant": True}
+
+    class RecordingFallback:
+        def __init__(self):
+            self.calls = []
+
+        async def evaluate_policies(self, package_paths, input_data):
+            self.calls.append(package_paths)
+            return {path: {"compliant": False} for path in package_paths}
+
+    fallback = RecordingFallback()
+    evaluator = FailingEvaluator(POLICIES_DIR, fallback=fallback)
+    results = asyncio.run(evaluator.evaluate_policies(["a/supported", "b/unsupported"], {}))
+
+    assert results == {"a/supported": {"compliant": True}, "b/unsupported": {"compliant": False}}
+    assert fallback.calls == [["b/unsupported"]]
@@ -0,0 +1,94 @@
+"""Tests for the run_scan orchestrator with the database and broker replaced."""
+
+from contextlib import contextmanager
+
+import pytest
+
+from worker import tasks
+
+METADATA = {
+    "controls": [
+        {"control_id": "1.1", "automation_status": "ready", "data_collector_id": "entra.users"},
+        {"control_id": "1.2", "automation_status": "ready", "data_collector_id": "entra.users"},
+        {"control_id": "2.1", "automation_status": "ready", "data_collector_id": "entra.roles"},
+        {"control_id": "3.1", "automation_status": "manual", "notes": "Check by hand"},
+        {"control_id": "3.2", "automation_status": "ready"},
+    ]
+}
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    """Record the database writes and dispatched signatures of one run_scan call."""
+    calls: dict[str, list] = {"sessions": [], "bulk": [], "remaining": [], "groups": []}
+
+    @contextmanager
+    def fake_session():
+        calls["sessions"].append(object())
+        yield FakeSession()
+
+    class FakeSession:
+        def commit(self):
+            pass
+
+    scan = {
+        "framework": "cis",
+        "benchmark": "microsoft-365-foundations",
+        "version": "v6.0.0",
+        "tenant_id": "tenant",
+        "client_id": "client",
+        "client_secret": "secret",
+    }
+    pending = [
+        {"id": i, "control_id": control_id}
+        for i, control_id in enumerate(["1.1", "1.2", "2.1", "3.1", "3.2", "9.9"], start=1)
+    ]
+
+    class FakeGroup:
+        def __init__(self, signatures):
+            self.signatures = list(signatures)
+
+        def apply_async(self):
+            calls["groups"].append(self.signatures)
+
+    monkeypatch.setattr(tasks, "get_db_session", fake_session)
+    monkeypatch.setattr(tasks, "get_scan", lambda session, scan_id: scan)
+    monkeypatch.setattr(tasks, "get_pending_scan_results", lambda session, scan_id: pending)
+    monkeypatch.setattr(tasks, "update_scan_status", lambda *args, **kwargs: None)
+    monkeypatch.setattr(tasks, "load_metadata", lambda *args: METADATA)
+    monkeypatch.setattr(
+        tasks,
+        "bulk_update_scan_results",
+        lambda session, scan_id, outcomes: calls["bulk"].append(outcomes),
+    )
+    monkeypatch.setattr(
+        tasks,
+        "set_scan_remaining",
+        lambda session, scan_id, remaining: calls["remaining"].append(remaining),
+    )
+    monkeypatch.setattr(tasks, "group", FakeGroup)
+    return calls
+
+
+def test_run_scan_writes_outcomes_and_dispatches_in_bulk(orchestrator) -> None:
+    summary = tasks.run_scan(42)
+
+    assert summary["dispatched"] == 3
+    assert summary["collector_groups"] == 2
+    assert summary["skipped"] == 1
+
+    # One transaction for the status update, one for every skip/error outcome
+    assert len(orchestrator["sessions"]) == 2
+    assert len(orchestrator["bulk"]) == 1
+    assert {(o["result_id"], o["status"]) for o in orchestrator["bulk"][0]} == {
+        (4, "skipped"),
+        (5, "error"),
+        (6, "error"),
+    }
+    assert orchestrator["remaining"] == [3]
+
+    [signatures] = orchestrator["groups"]
+    assert sorted(sig.kwargs["collector_id"] for sig in signatures) == [
+        "entra.roles",
+        "entra.users",
+    ]
@@ -0,0 +1,81 @@
+"""Tests for tenant-affinity routing across PowerShell service replicas."""
+
+import asyncio
+
+from collectors.service_router import ServiceRouter, get_service_router, parse_service_urls
+
+REPLICAS = [f"http://powershell-{index}:8001" for index in range(4)]
+TENANTS = [f"tenant{index}.onmicrosoft.com" for index in range(400)]
+
+
+def homes(router: ServiceRouter) -> dict[str, str]:
+    return {tenant: router.rank(tenant)[0] for tenant in TENANTS}
+
+
+def test_parse_service_urls() -> None:
+    assert parse_service_urls(" http://a:8001/, http://b:8001 ,") == [
+        "http://a:8001",
+        "http://b:8001",
+    ]
+
+
+def test_tenants_keep_their_replica_and_spread_out() -> None:
+    router = ServiceRouter(REPLICAS)
+
+    assert homes(router) == homes(ServiceRouter(list(reversed(REPLICAS))))
+    assert router.rank("TENANT0.onmicrosoft.com") == router.rank("tenant0.onmicrosoft.com")
+    counts = [list(homes(router).values()).count(replica) for replica in REPLICAS]
+    assert min(counts) > len(TENANTS) / len(REPLICAS) / 2
+
+
+def test_changing_replicas_only_moves_their_tenants() -> None:
+    router = ServiceRouter(REPLICAS)
+    before = homes(router)
+
+    router.set_replicas(REPLICAS + ["http://powershell-4:8001"])
+    added = homes(router)
+    moved = [tenant for tenant in TENANTS if added[tenant] != before[tenant]]
+    # Only tenants whose new home is the new replica move
+    assert moved and all(added[tenant] == "http://powershell-4:8001" for tenant in moved)
+
+    router.set_replicas(REPLICAS[1:])
+    removed = homes(router)
+    assert all(
+        removed[tenant] == before[tenant]
+        for tenant in TENANTS
+        if before[tenant] != REPLICAS[0]
+    )
+
+
+def test_down_replicas_are_tried_last_until_they_recover() -> None:
+    router = ServiceRouter(REPLICAS, down_cooldown=60)
+    tenant = TENANTS[0]
+    home, second = router.rank(tenant)[:2]
+
+    router.mark_down(home)
+    candidates = asyncio.run(router.candidates(tenant))
+    assert candidates[0] == second
+    assert candidates[-1] == home
+
+    router.mark_up(home)
+    assert asyncio.run(router.candidates(tenant))[0] == home
+
+
+def test_discovery_turns_addresses_into_replicas(monkeypatch) -> None:
+    router = ServiceRouter(["http://powershell-service:8001"], discover=True)
+
+    async def getaddrinfo(host, port, type):
+        assert (host, port) == ("powershell-service", 8001)
+        return [(None, None, None, "", (address, port)) for address in ("10.0.0.2", "10.0.0.1")]
+
+    async def candidates():
+        monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+        return await router.candidates(TENANTS[0])
+
+    assert sorted(asyncio.run(candidates())) == ["http://10.0.0.1:8001", "http://10.0.0.2:8001"]
+
+
+def test_routers_are_shared_per_setting() -> None:
+    assert get_service_router("http://a:8001,http://b:8001") is get_service_router(
+        "http://a:8001,http://b:8001"
+    )
@@ -0,0 +1,98 @@
+"""Tests for the shared MSAL token cache."""
+
+import asyncio
+import threading
+
+import pytest
+
+from collectors.token_cache import TokenAcquisitionError, TokenCache
+
+
+class FakeApp:
+    """Stands in for ConfidentialClientApplication and counts token requests."""
+
+    def __init__(self, result: dict | None = None):
+        self.calls: list[list[str]] = []
+        self.result = result
+
+    def acquire_token_for_client(self, scopes: list[str]) -> dict:
+        self.calls.append(scopes)
+        if self.result is not None:
+            return self.result
+        return {"access_token": f"token-for-{scopes[0]}", "expires_in": 3599}
+
+
+@pytest.fixture
+def fake_app(monkeypatch) -> FakeApp:
+    app = FakeApp()
+    monkeypatch.setattr(TokenCache, "_get_app", lambda self, *args: app)
+    return app
+
+
+def test_token_is_fetched_once_per_scope(fake_app) -> None:
+    cache = TokenCache()
+
+    async def run() -> list[str]:
+        return [
+            await cache.acquire_token("tenant", "client", "secret", scope)
+            for scope in ["graph/.default", "graph/.default", "exo/.default", "graph/.default"]
+        ]
+
+    tokens = asyncio.run(run())
+    assert tokens == [
+        "token-for-graph/.default",
+        "token-for-graph/.default",
+        "token-for-exo/.default",
+        "token-for-graph/.default",
+    ]
+    assert fake_app.calls == [["graph/.default"], ["exo/.default"]]
+
+
+def test_concurrent_callers_share_one_acquisition(fake_app) -> None:
+    cache = TokenCache()
+    threads = [
+        threading.Thread(
+            target=cache.acquire_token_sync, args=("tenant", "client", "secret", "graph/.default")
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert fake_app.calls == [["graph/.default"]]
+
+
+def test_expired_token_is_refetched(fake_app) -> None:
+    cache = TokenCache()
+    fake_app.result = {"access_token": "short-lived", "expires_in": TokenCache.EXPIRY_MARGIN}
+
+    cache.acquire_token_sync("tenant", "client", "secret", "graph/.default")
+    cache.acquire_token_sync("tenant", "client", "secret", "graph/.default")
+
+    assert len(fake_app.calls) == 2
+
+
+def test_failed_acquisition_raises(fake_app) -> None:
+    fake_app.result = {"error": "invalid_client", "error_description": "AADSTS7000215"}
+
+    with pytest.raises(TokenAcquisitionError, match="AADSTS7000215"):
+        TokenCache().acquire_token_sync("tenant", "client", "bad-secret", "graph/.default")
+
+
+def test_wrong_secret_misses_the_cache(monkeypatch) -> None:
+    apps: dict[str, FakeApp] = {}
+
+    def get_app(self, tenant_id, client_id, client_secret):
+        return apps.setdefault(client_secret, FakeApp())
+
+    monkeypatch.setattr(TokenCache, "_get_app", get_app)
+    cache = TokenCache()
+
+    cache.acquire_token_sync("tenant", "client", "secret", "graph/.default")
+    apps["revoked"] = FakeApp({"error": "invalid_client", "error_description": "AADSTS7000215"})
+
+    with pytest.raises(TokenAcquisitionError, match="AADSTS7000215"):
+        asyncio.run(cache.acquire_token("tenant", "client", "revoked", "graph/.default"))
+    assert cache._redis_key("tenant", "client", "a") != cache._redis_key("tenant", "client", "b")
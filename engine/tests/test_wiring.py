@@ -48,7 +48,7 @@ _PACKAGE_RE = re.compile(r"^package\s+(\S+)", re.MULTILINE)
 
 
 def _expected_package(framework: str, slug: str, version: str, control_id: str) -> str:
-    """Replicate the package-path logic from worker/tasks.py:380-395."""
+    """Replicate the package-path logic from worker/tasks.py:_build_package_path."""
     framework_normalized = framework.replace("-", "_")
     benchmark_normalized = slug.replace("-", "_")
     version_normalized = version.replace(".", "_")
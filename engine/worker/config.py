@@ -1,6 +1,7 @@
 """Configuration for the Celery worker."""
 
 import os
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
@@ -16,6 +17,45 @@ class WorkerSettings(BaseSettings):
 
     # OPA (Open Policy Agent)
     OPA_URL: str = "http://localhost:8181"
+    # Reach a co-located OPA over this Unix domain socket (opa run --addr unix://PATH)
+    # instead of TCP; OPA_URL then only supplies the Host header
+    OPA_SOCKET_PATH: str | None = None
+    # Seconds before an OPA query times out, and retries after a connection error
+    OPA_TIMEOUT: float = 30.0
+    OPA_MAX_RETRIES: int = 3
+
+    # Policy evaluator: "http" queries the OPA sidecar at OPA_URL, "embedded" evaluates
+    # policies from POLICIES_DIR in-process with rego-cpp (pip install '.[embedded]').
+    POLICY_EVALUATOR: Literal["http", "embedded"] = "http"
+
+    # Embedded mode only: send policies rego-cpp cannot evaluate to the OPA sidecar
+    EMBEDDED_POLICY_FALLBACK: bool = True
+
+    # Reuse policy decisions when a control's collector output, Rego file and package are
+    # unchanged since an earlier evaluation (decision_cache.py). Decisions are kept in
+    # REDIS_URL, least recently used evicted beyond DECISION_CACHE_MAX_ENTRIES. The worker's
+    # POLICIES_DIR must hold the same policies OPA evaluates.
+    DECISION_CACHE_ENABLED: bool = False
+    DECISION_CACHE_MAX_ENTRIES: int = 100_000
+    DECISION_CACHE_TTL: int = 7 * 24 * 3600
+
+    # Event loop per task ("per_task", asyncio.run in every task) or one long-lived loop per
+    # worker process ("persistent") shared by every task that process runs. Pair
+    # "persistent" with the threads pool (CELERY_POOL=threads) so one process can run
+    # many collector groups at once.
+    WORKER_EVENT_LOOP: Literal["per_task", "persistent"] = "per_task"
+
+    # Persistent loop only: collector groups allowed in flight per worker process
+    MAX_INFLIGHT_EVALUATIONS: int = 100
+
+    # Share the per-tenant Graph throttling governor (concurrency limit and Retry-After
+    # pauses) across worker processes through REDIS_URL. When False each process
+    # governs its own Graph traffic.
+    GRAPH_THROTTLE_SHARED: bool = True
+
+    # Share MSAL access tokens across worker processes through REDIS_URL. Tokens are always
+    # cached in process memory; this only adds the cross-process copy.
+    MSAL_TOKEN_CACHE_SHARED: bool = True
 
     # Encryption key for decrypting credentials
     ENCRYPTION_KEY: str = ""
@@ -23,9 +63,19 @@ class WorkerSettings(BaseSettings):
     # Policies directory
     POLICIES_DIR: str = os.path.join(os.path.dirname(__file__), "..", "policies")
 
-    # PowerShell service URL (optional - if set, uses HTTP instead of Docker)
+    # PowerShell service URL (optional - if set, uses HTTP instead of Docker). A
+    # comma-separated list names several replicas; each tenant is routed to the same
+    # replica so its warm PowerShell sessions are reused.
     POWERSHELL_SERVICE_URL: str | None = None
 
+    # Treat every address the service host names resolve to as a replica (e.g. a
+    # scaled Compose service or a Kubernetes headless service), re-resolving every 30s
+    POWERSHELL_SERVICE_DISCOVERY: bool = False
+
+    # Without POWERSHELL_SERVICE_URL: run cmdlets in one long-lived container per worker
+    # process ("container", removed on shutdown) or start a container per cmdlet ("per_cmdlet")
+    POWERSHELL_DOCKER_MODE: Literal["container", "per_cmdlet"] = "container"
+
     # Performance mode: PowerShell-based controls (Exchange/Compliance/Teams) are much slower
     # than Graph-based controls. Default is True to preserve full scan coverage.
     ENABLE_POWERSHELL_CONTROLS: bool = True
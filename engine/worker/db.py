@@ -43,10 +43,13 @@ from sqlalchemy.orm import Session, sessionmaker
 
 from worker.config import settings
 
-# Convert async URL to sync URL for worker
+# Convert async URL to sync URL for worker. Name the driver we install (psycopg2):
+# SQLAlchemy 2.1 maps a bare postgresql:// to psycopg 3.
 sync_database_url = settings.DATABASE_URL.replace(
     "postgresql+asyncpg://", "postgresql://"
 )
+if sync_database_url.startswith("postgresql://"):
+    sync_database_url = sync_database_url.replace("postgresql://", "postgresql+psycopg2://", 1)
 
 # Create sync engine and session factory
 engine = create_engine(sync_database_url, pool_pre_ping=True)
@@ -261,8 +264,11 @@ def update_scan_result(
     status: str,
     message: str | None = None,
     evidence: dict | None = None,
-) -> None:
-    """Update a scan result record.
+) -> bool:
+    """Update a pending scan result record.
+
+    Only results still in 'pending' are updated, so a redelivered task cannot
+    record the same control twice (and throw off the scan counters).
 
     Args:
         session: Database session
@@ -270,6 +276,9 @@ def update_scan_result(
         status: New status (passed, failed, error)
         message: Human-readable result message
         evidence: Details from OPA evaluation
+
+    Returns:
+        True if the result moved out of 'pending', False if it was already recorded
     """
     updates = ["status = :status", "updated_at = now()"]
     params = {"result_id": result_id, "status": status}
@@ -282,37 +291,133 @@ def update_scan_result(
         updates.append("evidence = CAST(:evidence AS jsonb)")
         params["evidence"] = json.dumps(evidence)
 
-    session.execute(
-        text(f"UPDATE scan_result SET {', '.join(updates)} WHERE id = :result_id"),
+    result = session.execute(
+        text(
+            f"UPDATE scan_result SET {', '.join(updates)} "
+            "WHERE id = :result_id AND status = 'pending'"
+        ),
         params,
     )
+    return result.rowcount > 0
 
 
-def finalize_scan_if_complete(session: Session, scan_id: int) -> bool:
-    """Check if all controls are evaluated and finalize scan if complete.
+def bulk_update_scan_results(session: Session, scan_id: int, outcomes: list[dict]) -> None:
+    """Record many scan result outcomes with one UPDATE and one counter update.
 
-    This function uses SELECT FOR UPDATE to prevent race conditions when
-    multiple tasks complete simultaneously.
+    Used by the orchestrator for controls that never get dispatched (skipped,
+    missing metadata, no collector). Like update_scan_result, only results still
+    in 'pending' are touched, and only those count towards skipped_count and
+    error_count.
 
     Args:
         session: Database session
-        scan_id: The scan ID to check
+        scan_id: The scan the results belong to
+        outcomes: List of {"result_id": int, "status": "skipped" | "error", "message": str}
+    """
+    if not outcomes:
+        return
+
+    result = session.execute(
+        text("""
+            UPDATE scan_result AS sr
+            SET status = v.status, message = v.message, updated_at = now()
+            FROM unnest(
+                CAST(:result_ids AS integer[]),
+                CAST(:statuses AS varchar[]),
+                CAST(:messages AS text[])
+            ) AS v(id, status, message)
+            WHERE sr.id = v.id AND sr.scan_id = :scan_id AND sr.status = 'pending'
+            RETURNING sr.status
+        """),
+        {
+            "scan_id": scan_id,
+            "result_ids": [o["result_id"] for o in outcomes],
+            "statuses": [o["status"] for o in outcomes],
+            "messages": [o["message"] for o in outcomes],
+        },
+    )
+    statuses = [row.status for row in result]
+
+    session.execute(
+        text("""
+            UPDATE scan
+            SET skipped_count = skipped_count + :skipped,
+                error_count = error_count + :errors
+            WHERE id = :scan_id
+        """),
+        {
+            "scan_id": scan_id,
+            "skipped": statuses.count("skipped"),
+            "errors": statuses.count("error"),
+        },
+    )
+
+
+def set_scan_remaining(session: Session, scan_id: int, remaining: int) -> None:
+    """Set how many dispatched controls a scan is still waiting on."""
+    session.execute(
+        text("UPDATE scan SET remaining_count = :remaining WHERE id = :scan_id"),
+        {"scan_id": scan_id, "remaining": remaining},
+    )
+
+
+def decrement_scan_remaining(session: Session, scan_id: int, amount: int = 1) -> int | None:
+    """Atomically decrement a scan's remaining_count and return the new value.
+
+    The UPDATE holds the scan row lock until commit, so concurrent tasks
+    decrement one after another and exactly one of them sees zero.
 
     Returns:
-        True if scan was finalized, False if still pending controls
+        The new remaining_count, or None if the scan has no counter
+        (scans started before remaining_count existed).
     """
-    # Check if there are any pending controls remaining
     result = session.execute(
         text("""
-            SELECT COUNT(*) as pending_count
-            FROM scan_result
-            WHERE scan_id = :scan_id AND status = 'pending'
+            UPDATE scan
+            SET remaining_count = remaining_count - :amount
+            WHERE id = :scan_id
+            RETURNING remaining_count
         """),
-        {"scan_id": scan_id},
+        {"scan_id": scan_id, "amount": amount},
     )
-    pending_count = result.scalar()
+    row = result.fetchone()
+    return row.remaining_count if row else None
+
+
+def finalize_scan_if_complete(session: Session, scan_id: int, completed: int = 0) -> bool:
+    """Record completed controls and finalize the scan if none remain.
 
-    if pending_count > 0:
+    Completion is tracked with the scan's remaining_count counter, so the last
+    task finalizes in O(1). Scans without a counter fall back to counting
+    pending results (covered by the partial index on pending scan_result rows).
+
+    This function uses SELECT FOR UPDATE to prevent race conditions when
+    multiple tasks complete simultaneously.
+
+    Args:
+        session: Database session
+        scan_id: The scan ID to check
+        completed: Number of controls the caller just moved out of 'pending'
+
+    Returns:
+        True if scan was finalized, False if still pending controls
+    """
+    remaining = decrement_scan_remaining(session, scan_id, completed)
+
+    if remaining is None:
+        # Check if there are any pending controls remaining
+        result = session.execute(
+            text("""
+                SELECT COUNT(*) as pending_count
+                FROM scan_result
+                WHERE scan_id = :scan_id AND status = 'pending'
+            """),
+            {"scan_id": scan_id},
+        )
+        if result.scalar() > 0:
+            # Still have pending controls
+            return False
+    elif remaining > 0:
         # Still have pending controls
         return False
 
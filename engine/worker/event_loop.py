@@ -0,0 +1,156 @@
+"""Event loop management for Celery tasks.
+
+By default every task wraps its coroutine in asyncio.run(), which builds and
+tears down an event loop per task. With WORKER_EVENT_LOOP=persistent each
+worker process instead keeps one event loop running in a background thread.
+Tasks hand their coroutines to it with run_async() and block until they
+finish, so with the threads pool many tasks share one loop. That loop can then
+hold resources that outlive a task, such as the Graph and OPA connection
+pools, and drive many collectors at once. MAX_INFLIGHT_EVALUATIONS caps how many
+coroutines run concurrently in one process.
+
+The loop is created lazily in the process that first needs it (after the
+prefork fork, never in the parent) and stopped on worker shutdown.
+"""
+
+import asyncio
+import os
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
+import httpx
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+from worker.config import settings
+
+T = TypeVar("T")
+
+
+class ProcessEventLoop:
+    """An event loop running forever in a daemon thread of this process."""
+
+    def __init__(self, max_inflight: int):
+        """Start the loop thread.
+
+        Args:
+            max_inflight: Maximum number of coroutines submitted with run() that
+                          may execute at the same time.
+        """
+        self.loop = asyncio.new_event_loop()
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self._graph_http_client: httpx.AsyncClient | None = None
+        self._thread = threading.Thread(
+            target=self._run_forever, name="worker-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def _run_forever(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the loop and block the calling thread until it finishes."""
+
+        async def limited() -> T:
+            async with self._semaphore:
+                return await coro
+
+        return asyncio.run_coroutine_threadsafe(limited(), self.loop).result()
+
+    def is_current(self) -> bool:
+        """True when called from a coroutine running on this loop."""
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def graph_http_client(self) -> httpx.AsyncClient:
+        """The Graph connection pool shared by every GraphClient on this loop."""
+        if self._graph_http_client is None:
+            from collectors.graph_client import GraphClient
+
+            self._graph_http_client = GraphClient.create_http_client()
+        return self._graph_http_client
+
+    def close(self) -> None:
+        """Close shared resources, then stop the loop and its thread."""
+        if self._graph_http_client is not None:
+            asyncio.run_coroutine_threadsafe(self._graph_http_client.aclose(), self.loop).result()
+            self._graph_http_client = None
+        asyncio.run_coroutine_threadsafe(_close_shared_clients(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_process_loop: ProcessEventLoop | None = None
+_process_loop_pid: int | None = None
+_process_loop_lock = threading.Lock()
+
+
+def get_process_loop() -> ProcessEventLoop:
+    """Get this process's persistent event loop, starting it on first use."""
+    global _process_loop, _process_loop_pid
+    with _process_loop_lock:
+        # A loop inherited across fork has no running thread in the child
+        if _process_loop is None or _process_loop_pid != os.getpid():
+            _process_loop = ProcessEventLoop(settings.MAX_INFLIGHT_EVALUATIONS)
+            _process_loop_pid = os.getpid()
+        return _process_loop
+
+
+def current_process_loop() -> ProcessEventLoop | None:
+    """The persistent loop if the caller is running on it, otherwise None."""
+    if _process_loop is not None and _process_loop_pid == os.getpid() and _process_loop.is_current():
+        return _process_loop
+    return None
+
+
+async def _close_shared_clients() -> None:
+    """Close the policy client's, decision cache's and Graph throttle's connections
+    on the running loop."""
+    from collectors.graph_throttle import aclose_redis
+    from decision_cache import get_decision_cache
+    from opa_client import opa_client
+
+    await opa_client.aclose()
+    await aclose_redis()
+    decision_cache = get_decision_cache()
+    if decision_cache is not None:
+        await decision_cache.aclose()
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a task's coroutine according to WORKER_EVENT_LOOP and return its result."""
+    if settings.WORKER_EVENT_LOOP == "persistent":
+        return get_process_loop().run(coro)
+
+    async def run_and_close() -> T:
+        try:
+            return await coro
+        finally:
+            # This loop ends with the task; don't leave its OPA and Redis connections behind
+            await _close_shared_clients()
+
+    return asyncio.run(run_and_close())
+
+
+def shutdown_process_loop() -> None:
+    """Stop this process's persistent loop, if it was started."""
+    global _process_loop, _process_loop_pid
+    with _process_loop_lock:
+        if _process_loop is not None and _process_loop_pid == os.getpid():
+            _process_loop.close()
+        _process_loop = None
+        _process_loop_pid = None
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _on_worker_shutdown(**kwargs) -> None:
+    shutdown_process_loop()
+    # The process's PowerShell container (Docker mode) goes with it
+    from collectors.powershell_container import shutdown_container
+
+    shutdown_container()
@@ -1,11 +1,15 @@
 """Celery tasks for compliance scanning."""
 
-import asyncio
 import json
 from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
 
+from celery import group
+
+from collectors.graph_cache import get_scan_cache
+from collectors.token_cache import configure_token_cache
+from decision_cache import configure_decision_cache, evaluate_with_cache, get_decision_cache
 from worker.celery_app import celery_app
 from worker.config import settings
 from worker.db import (
@@ -15,10 +19,24 @@ from worker.db import (
     update_scan_status,
     increment_scan_progress,
     increment_scan_error_count,
-    increment_scan_skipped_count,
     update_scan_result,
+    bulk_update_scan_results,
+    set_scan_remaining,
     finalize_scan_if_complete,
 )
+from worker.event_loop import current_process_loop, run_async
+
+# Tokens are reused across controls and scans; share them across worker processes too
+if settings.MSAL_TOKEN_CACHE_SHARED:
+    configure_token_cache(settings.REDIS_URL)
+
+# Unchanged inputs to unchanged policies are answered from earlier decisions
+if settings.DECISION_CACHE_ENABLED:
+    configure_decision_cache(
+        settings.REDIS_URL,
+        max_entries=settings.DECISION_CACHE_MAX_ENTRIES,
+        ttl=settings.DECISION_CACHE_TTL,
+    )
 
 
 def load_metadata(framework: str, benchmark: str, version: str) -> dict:
@@ -40,12 +58,9 @@ def load_metadata(framework: str, benchmark: str, version: str) -> dict:
         return json.load(f)
 
 
-def get_control_metadata(metadata: dict, control_id: str) -> dict | None:
-    """Get control metadata by control_id from the metadata dict."""
-    for control in metadata.get("controls", []):
-        if control["control_id"] == control_id:
-            return control
-    return None
+def index_controls(metadata: dict) -> dict[str, dict]:
+    """Map control_id to control metadata for O(1) lookups."""
+    return {control["control_id"]: control for control in metadata.get("controls", [])}
 
 
 @celery_app.task(name="worker.tasks.run_scan")
@@ -55,11 +70,14 @@ def run_scan(scan_id: int) -> dict:
     This task:
     1. Updates scan status to "running"
     2. Gets pending ScanResult records
-    3. Dispatches evaluate_control tasks for each pending result
-    4. Returns immediately (fire-and-forget)
+    3. Records every skipped/error outcome in one transaction
+    4. Groups ready controls by data_collector_id and dispatches one
+       evaluate_collector_group task per collector as a single Celery group
+    5. Returns immediately (fire-and-forget)
 
-    Each evaluate_control task writes results directly to PostgreSQL.
-    The last task to complete will finalize the scan.
+    Each evaluate_collector_group task writes results directly to PostgreSQL
+    and decrements the scan's remaining_count. The task that takes it to zero
+    finalizes the scan.
 
     Args:
         scan_id: The scan ID to process
@@ -105,23 +123,25 @@ def run_scan(scan_id: int) -> dict:
         "client_secret": scan["client_secret"],
     }
 
-    # Dispatch all tasks for parallel execution (fire-and-forget)
+    # Ready controls grouped by collector so each collector runs once per scan
+    collector_groups: dict[str, list[dict]] = {}
+    # Skip/error outcomes, written together once every result is classified
+    outcomes: list[dict] = []
     dispatched = 0
     skipped = 0
+    controls_by_id = index_controls(metadata)
 
     for result in pending_results:
-        control = get_control_metadata(metadata, result["control_id"])
+        control = controls_by_id.get(result["control_id"])
         if not control:
             # Control not found in metadata (possible ID format mismatch)
-            with get_db_session() as session:
-                update_scan_result(
-                    session,
-                    result_id=result["id"],
-                    status="error",
-                    message=f"Control {result['control_id']} not found in metadata",
-                )
-                increment_scan_error_count(session, scan_id)
-                session.commit()
+            outcomes.append(
+                {
+                    "result_id": result["id"],
+                    "status": "error",
+                    "message": f"Control {result['control_id']} not found in metadata",
+                }
+            )
             continue
 
         # Check automation_status before dispatching
@@ -136,53 +156,64 @@ def run_scan(scan_id: int) -> dict:
                 and collector_id.startswith(("exchange.", "compliance.", "teams."))
                 and not collector_id.startswith("exchange.dns.")
             ):
-                with get_db_session() as session:
-                    update_scan_result(
-                        session,
-                        result_id=result["id"],
-                        status="skipped",
-                        message="Skipped (fast scan): PowerShell-based controls disabled (ENABLE_POWERSHELL_CONTROLS=false).",
-                    )
-                    increment_scan_skipped_count(session, scan_id)
-                    session.commit()
+                outcomes.append(
+                    {
+                        "result_id": result["id"],
+                        "status": "skipped",
+                        "message": "Skipped (fast scan): PowerShell-based controls disabled (ENABLE_POWERSHELL_CONTROLS=false).",
+                    }
+                )
                 skipped += 1
                 continue
 
             # Verify collector exists before dispatching
             if not control.get("data_collector_id"):
-                with get_db_session() as session:
-                    update_scan_result(
-                        session,
-                        result_id=result["id"],
-                        status="error",
-                        message="Control marked ready but has no data_collector_id",
-                    )
-                    increment_scan_error_count(session, scan_id)
-                    session.commit()
+                outcomes.append(
+                    {
+                        "result_id": result["id"],
+                        "status": "error",
+                        "message": "Control marked ready but has no data_collector_id",
+                    }
+                )
                 continue
 
-            evaluate_control.delay(
+            collector_groups.setdefault(collector_id, []).append(
+                {"result_id": result["id"], "control": control}
+            )
+            dispatched += 1
+        else:
+            # Skip non-ready controls (deferred, blocked, manual, not_started)
+            outcomes.append(
+                {
+                    "result_id": result["id"],
+                    "status": "skipped",
+                    "message": f"Control {status}: {control.get('notes') or 'Not yet automatable'}",
+                }
+            )
+            skipped += 1
+
+    # Write every skip/error outcome and set the completion counter in one
+    # transaction, before any task can decrement it
+    with get_db_session() as session:
+        bulk_update_scan_results(session, scan_id, outcomes)
+        set_scan_remaining(session, scan_id, dispatched)
+        session.commit()
+
+    # Dispatch one task per collector in a single group; each task's output
+    # is fanned out to every control that shares the collector.
+    if collector_groups:
+        group(
+            evaluate_collector_group.s(
                 scan_id=scan_id,
-                result_id=result["id"],
-                control=control,
+                collector_id=collector_id,
+                controls=controls,
                 credentials=credentials,
                 framework=scan["framework"],
                 benchmark=scan["benchmark"],
                 version=scan["version"],
             )
-            dispatched += 1
-        else:
-            # Skip non-ready controls (deferred, blocked, manual, not_started)
-            with get_db_session() as session:
-                update_scan_result(
-                    session,
-                    result_id=result["id"],
-                    status="skipped",
-                    message=f"Control {status}: {control.get('notes') or 'Not yet automatable'}",
-                )
-                increment_scan_skipped_count(session, scan_id)
-                session.commit()
-            skipped += 1
+            for collector_id, controls in collector_groups.items()
+        ).apply_async()
 
     # If no tasks were dispatched, finalize the scan immediately
     # (all controls were skipped due to automation_status)
@@ -197,17 +228,154 @@ def run_scan(scan_id: int) -> dict:
             "skipped": skipped,
         }
 
-    # Return immediately - don't wait for results
-    # Each evaluate_control task will update PostgreSQL directly
-    # The last task to complete will finalize the scan
+    # Return immediately - don't wait for the group. Each evaluate_collector_group
+    # task writes its controls' results in one transaction and decrements
+    # remaining_count by the number it recorded; the task that takes the counter
+    # to zero finalizes the scan
     return {
         "scan_id": scan_id,
         "status": "running",
         "dispatched": dispatched,
+        "collector_groups": len(collector_groups),
         "skipped": skipped,
     }
 
 
+@celery_app.task(
+    name="worker.tasks.evaluate_collector_group",
+    bind=True,
+    max_retries=3,
+    default_retry_delay=60,
+)
+def evaluate_collector_group(
+    self,
+    scan_id: int,
+    collector_id: str,
+    controls: list[dict],
+    credentials: dict,
+    framework: str,
+    benchmark: str,
+    version: str,
+) -> dict:
+    """Evaluate every control that shares a data collector.
+
+    This task:
+    1. Runs the collector once
+    2. Evaluates every control's policy in a single OPA query against the
+       collected data
+    3. Updates each ScanResult record with its outcome
+    4. Updates scan progress counters
+    5. If these were the last pending controls, finalizes the scan
+
+    Controls whose evaluation fails are retried on their own; controls that
+    already have a result are not re-evaluated on retry.
+
+    Args:
+        scan_id: The scan ID
+        collector_id: The data collector ID shared by all controls in the group
+        controls: List of {"result_id": int, "control": dict} entries
+        credentials: M365 credentials dict
+        framework: Framework name (e.g., "cis")
+        benchmark: Benchmark slug (e.g., "microsoft-365-foundations")
+        version: Version string (e.g., "v3.1.0")
+
+    Returns:
+        Result dict with per-control evaluation outcomes
+    """
+    outcomes = run_async(
+        _evaluate_collector_group_async(
+            scan_id=scan_id,
+            collector_id=collector_id,
+            controls=[entry["control"] for entry in controls],
+            credentials=credentials,
+            framework=framework,
+            benchmark=benchmark,
+            version=version,
+        )
+    )
+
+    evaluated: list[tuple[dict, dict]] = []
+    failed: list[tuple[dict, Exception]] = []
+    for entry in controls:
+        outcome = outcomes[entry["control"]["control_id"]]
+        if isinstance(outcome, Exception):
+            failed.append((entry, outcome))
+        else:
+            evaluated.append((entry, outcome))
+
+    # Record successful evaluations straight away so a retry only covers the failures
+    if evaluated:
+        with get_db_session() as session:
+            recorded = sum(
+                _record_control_result(session, scan_id, entry["result_id"], result)
+                for entry, result in evaluated
+            )
+            finalize_scan_if_complete(session, scan_id, completed=recorded)
+            session.commit()
+
+    decision_cache = get_decision_cache()
+    summary = {
+        "collector_id": collector_id,
+        # Cumulative for this scan in this worker process
+        "graph_cache": get_scan_cache(scan_id).stats(),
+        # Cumulative for every scan in this worker process
+        "decision_cache": decision_cache.stats() if decision_cache is not None else None,
+        "results": [
+            {
+                "control_id": entry["control"]["control_id"],
+                "compliant": result.get("compliant", False),
+                "message": result.get("message"),
+            }
+            for entry, result in evaluated
+        ],
+    }
+
+    if not failed:
+        return summary
+
+    exc = failed[0][1]
+    try:
+        raise self.retry(
+            exc=exc,
+            kwargs={
+                "scan_id": scan_id,
+                "collector_id": collector_id,
+                "controls": [entry for entry, _ in failed],
+                "credentials": credentials,
+                "framework": framework,
+                "benchmark": benchmark,
+                "version": version,
+            },
+        )
+    except self.MaxRetriesExceededError:
+        # Max retries exceeded - mark remaining controls as error
+        with get_db_session() as session:
+            recorded = 0
+            for entry, error in failed:
+                if update_scan_result(
+                    session,
+                    result_id=entry["result_id"],
+                    status="error",
+                    message=f"Control evaluation failed after retries: {str(error)}",
+                ):
+                    increment_scan_error_count(session, scan_id)
+                    recorded += 1
+
+            # Check if these were the last controls and finalize scan if complete
+            finalize_scan_if_complete(session, scan_id, completed=recorded)
+            session.commit()
+
+        summary["results"].extend(
+            {
+                "control_id": entry["control"]["control_id"],
+                "compliant": None,
+                "error": str(error),
+            }
+            for entry, error in failed
+        )
+        return summary
+
+
 @celery_app.task(
     name="worker.tasks.evaluate_control",
     bind=True,
@@ -226,6 +394,9 @@ def evaluate_control(
 ) -> dict:
     """Evaluate a single control.
 
+    run_scan now dispatches evaluate_collector_group instead; this task is
+    kept so messages already queued by older orchestrators still drain.
+
     This task:
     1. Collects data using the appropriate collector
     2. Evaluates the policy using OPA
@@ -251,7 +422,7 @@ def evaluate_control(
 
     try:
         # Run async collector and OPA evaluation
-        result = asyncio.run(
+        result = run_async(
             _evaluate_control_async(
                 control_id=control_id,
                 collector_id=collector_id,
@@ -265,29 +436,10 @@ def evaluate_control(
 
         # Update database based on result
         with get_db_session() as session:
-            if result.get("compliant", False):
-                # Control passed
-                update_scan_result(
-                    session,
-                    result_id=result_id,
-                    status="passed",
-                    message=result.get("message", "Control is compliant"),
-                    evidence=result.get("details"),
-                )
-                increment_scan_progress(session, scan_id, passed=True)
-            else:
-                # Control failed
-                update_scan_result(
-                    session,
-                    result_id=result_id,
-                    status="failed",
-                    message=result.get("message", "Control is non-compliant"),
-                    evidence=result.get("details"),
-                )
-                increment_scan_progress(session, scan_id, passed=False)
+            recorded = _record_control_result(session, scan_id, result_id, result)
 
             # Check if this was the last control and finalize scan if complete
-            finalize_scan_if_complete(session, scan_id)
+            finalize_scan_if_complete(session, scan_id, completed=int(recorded))
             session.commit()
 
         return {
@@ -303,16 +455,17 @@ def evaluate_control(
         except self.MaxRetriesExceededError:
             # Max retries exceeded - mark as error
             with get_db_session() as session:
-                update_scan_result(
+                recorded = update_scan_result(
                     session,
                     result_id=result_id,
                     status="error",
                     message=f"Control evaluation failed after retries: {str(exc)}",
                 )
-                increment_scan_error_count(session, scan_id)
+                if recorded:
+                    increment_scan_error_count(session, scan_id)
 
                 # Check if this was the last control and finalize scan if complete
-                finalize_scan_if_complete(session, scan_id)
+                finalize_scan_if_complete(session, scan_id, completed=int(recorded))
                 session.commit()
             return {
                 "control_id": control_id,
@@ -321,6 +474,167 @@ def evaluate_control(
             }
 
 
+def _record_control_result(session, scan_id: int, result_id: int, result: dict) -> bool:
+    """Write an OPA evaluation result to its ScanResult and bump scan counters.
+
+    Returns:
+        True if the result was recorded, False if it had already been recorded
+        (e.g. by a redelivered task), in which case counters are left alone.
+    """
+    passed = bool(result.get("compliant", False))
+    if passed:
+        # Control passed
+        recorded = update_scan_result(
+            session,
+            result_id=result_id,
+            status="passed",
+            message=result.get("message", "Control is compliant"),
+            evidence=result.get("details"),
+        )
+    else:
+        # Control failed
+        recorded = update_scan_result(
+            session,
+            result_id=result_id,
+            status="failed",
+            message=result.get("message", "Control is non-compliant"),
+            evidence=result.get("details"),
+        )
+    if recorded:
+        increment_scan_progress(session, scan_id, passed=passed)
+    return recorded
+
+
+def _build_client(collector_id: str, credentials: dict, scan_id: int | None = None):
+    """Create the API client a collector needs.
+
+    Most Exchange and Compliance collectors require PowerShell, but a few Exchange
+    collectors use Graph (e.g. domain metadata). Graph clients built for a scan
+    share that scan's read cache.
+    """
+    # Import here to avoid circular imports
+    from collectors.graph_client import GraphClient
+    from collectors.graph_throttle import GraphThrottle
+    from collectors.powershell_client import PowerShellClient
+
+    if collector_id.startswith(("exchange.", "compliance.")) and not collector_id.startswith(
+        "exchange.dns."
+    ):
+        return PowerShellClient(
+            tenant_id=credentials["tenant_id"],
+            client_id=credentials["client_id"],
+            client_secret=credentials["client_secret"],
+            service_url=settings.POWERSHELL_SERVICE_URL,
+            service_discovery=settings.POWERSHELL_SERVICE_DISCOVERY,
+            docker_mode=settings.POWERSHELL_DOCKER_MODE,
+        )
+
+    # Entra and other collectors use Graph API. On the persistent event loop
+    # every client shares the process's Graph connection pool.
+    process_loop = current_process_loop()
+    return GraphClient(
+        tenant_id=credentials["tenant_id"],
+        client_id=credentials["client_id"],
+        client_secret=credentials["client_secret"],
+        http_client=process_loop.graph_http_client() if process_loop else None,
+        throttle=GraphThrottle(
+            credentials["tenant_id"],
+            redis_url=settings.REDIS_URL if settings.GRAPH_THROTTLE_SHARED else None,
+        ),
+        cache=get_scan_cache(scan_id) if scan_id is not None else None,
+    )
+
+
+def _build_package_path(framework: str, benchmark: str, version: str, control_id: str) -> str:
+    """Build the OPA package path for a control.
+
+    Must match the Rego package declaration:
+    Rego package: "cis.microsoft_365_foundations.v3_1_0.control_1_1_1"
+    OPA REST API path: "cis/microsoft_365_foundations/v3_1_0/control_1_1_1"
+
+    Transform:
+    - framework: "essential-eight" -> "essential_eight"
+    - benchmark: "microsoft-365-foundations" -> "microsoft_365_foundations"
+    - version: "v3.1.0" -> "v3_1_0"
+    - control_id: "1.1.1" -> "control_1_1_1", "E8-MAC-2.1" -> "control_e8_mac_2_1"
+    """
+    framework_normalized = framework.replace("-", "_")
+    benchmark_normalized = benchmark.replace("-", "_")
+    version_normalized = version.replace(".", "_")
+
+    # Convert control_id to a valid Rego identifier (lowercase, hyphens/dots to underscores)
+    control_suffix = control_id.replace(".", "_").replace("-", "_").lower()
+    control_package = f"control_{control_suffix}"
+
+    return f"{framework_normalized}/{benchmark_normalized}/{version_normalized}/{control_package}"
+
+
+def _policy_path(
+    framework: str, benchmark: str, version: str, policy_file: str | None
+) -> Path | None:
+    """Path of a control's Rego file under POLICIES_DIR, or None if it has none."""
+    if not policy_file:
+        return None
+    return Path(settings.POLICIES_DIR) / framework / benchmark / version / policy_file
+
+
+async def _evaluate_collector_group_async(
+    scan_id: int,
+    collector_id: str,
+    controls: list[dict],
+    credentials: dict,
+    framework: str,
+    benchmark: str,
+    version: str,
+) -> dict[str, dict | Exception]:
+    """Async helper to collect data once and evaluate every dependent policy.
+
+    Args:
+        scan_id: The scan ID (scopes the Graph read cache)
+        collector_id: The data collector ID from registry
+        controls: Control metadata dicts that all use this collector
+        credentials: M365 credentials
+        framework: Framework name (e.g., "cis")
+        benchmark: Benchmark slug (e.g., "microsoft-365-foundations")
+        version: Version string (e.g., "v3.1.0")
+
+    Returns:
+        Mapping of control_id to its OPA evaluation result, or to the
+        exception raised while collecting or evaluating it.
+    """
+    from collectors.registry import get_collector
+    from opa_client import opa_client
+
+    try:
+        collector = get_collector(collector_id)
+        async with _build_client(collector_id, credentials, scan_id) as client:
+            collected_data = await collector.collect(client)
+    except Exception as exc:
+        # Every control in the group depends on this collection
+        return {control["control_id"]: exc for control in controls}
+
+    # Evaluate every dependent policy in one OPA query so the input is sent once;
+    # decisions cached for this exact input and policy source are reused
+    package_paths = {
+        control["control_id"]: _build_package_path(framework, benchmark, version, control["control_id"])
+        for control in controls
+    }
+    policies = {
+        package_paths[control["control_id"]]: _policy_path(
+            framework, benchmark, version, control.get("policy_file")
+        )
+        for control in controls
+    }
+    try:
+        results = await evaluate_with_cache(
+            opa_client, get_decision_cache(), policies, collected_data
+        )
+    except Exception as exc:
+        return {control_id: exc for control_id in package_paths}
+
+    return {control_id: results[path] for control_id, path in package_paths.items()}
+
+
 async def _evaluate_control_async(
     control_id: str,
     collector_id: str,
@@ -346,57 +660,23 @@ async def _evaluate_control_async(
     """
     # Import here to avoid circular imports
     from collectors.registry import get_collector
-    from collectors.graph_client import GraphClient
-    from collectors.powershell_client import PowerShellClient
     from opa_client import opa_client
 
     # Get collector
     collector = get_collector(collector_id)
 
-    # Determine client type based on collector_id prefix.
-    #
-    # Most Exchange and Compliance collectors require PowerShell, but a few Exchange
-    # collectors use Graph (e.g. domain metadata).
-    if collector_id.startswith(("exchange.", "compliance.")) and not collector_id.startswith(
-        "exchange.dns."
-    ):
-        client = PowerShellClient(
-            tenant_id=credentials["tenant_id"],
-            client_id=credentials["client_id"],
-            client_secret=credentials["client_secret"],
-            service_url=settings.POWERSHELL_SERVICE_URL,
-        )
-    else:
-        # Entra and other collectors use Graph API
-        client = GraphClient(
-            tenant_id=credentials["tenant_id"],
-            client_id=credentials["client_id"],
-            client_secret=credentials["client_secret"],
-        )
-
     # Collect data using the appropriate client
-    collected_data = await collector.collect(client)
-
-    # Build OPA package path to match the Rego package declaration
-    # Rego package: "cis.microsoft_365_foundations.v3_1_0.control_1_1_1"
-    # OPA REST API path: "cis/microsoft_365_foundations/v3_1_0/control_1_1_1"
-    #
-    # Transform:
-    # - framework: "essential-eight" -> "essential_eight"
-    # - benchmark: "microsoft-365-foundations" -> "microsoft_365_foundations"
-    # - version: "v3.1.0" -> "v3_1_0"
-    # - control_id: "1.1.1" -> "control_1_1_1", "E8-MAC-2.1" -> "control_e8_mac_2_1"
-    framework_normalized = framework.replace("-", "_")
-    benchmark_normalized = benchmark.replace("-", "_")
-    version_normalized = version.replace(".", "_")
-
-    # Convert control_id to a valid Rego identifier (lowercase, hyphens/dots to underscores)
-    control_suffix = control_id.replace(".", "_").replace("-", "_").lower()
-    control_package = f"control_{control_suffix}"
-
-    package_path = f"{framework_normalized}/{benchmark_normalized}/{version_normalized}/{control_package}"
-
-    # Evaluate policy with OPA
-    result = await opa_client.evaluate_policy(package_path, collected_data)
-
-    return result
+    async with _build_client(collector_id, credentials) as client:
+        collected_data = await collector.collect(client)
+
+    # Evaluate policy with OPA, unless this input and policy source were seen before.
+    # A cached decision says so in its details, which are stored as evidence.
+    package_path = _build_package_path(framework, benchmark, version, control_id)
+    results = await evaluate_with_cache(
+        opa_client,
+        get_decision_cache(),
+        {package_path: _policy_path(framework, benchmark, version, policy_file)},
+        collected_data,
+    )
+
+    return results[package_path]
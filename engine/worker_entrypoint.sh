@@ -3,14 +3,20 @@ set -e
 
 echo "AutoAudit Worker Container"
 echo "=========================="
-echo "Starting Celery worker with prefork pool..."
+
+# Worker pool and concurrency are configurable:
+# CELERY_POOL=prefork (default): Multiple worker processes, each with isolated event loop
+# CELERY_CONCURRENCY=4 (default): 4 worker processes (adjust based on container resources)
+#
+# Note: We use prefork or threads instead of gevent because the collectors use asyncio/httpx.
+# With WORKER_EVENT_LOOP=persistent, use CELERY_POOL=threads and a high CELERY_CONCURRENCY
+# (e.g. 200): every thread hands its collector group to the process's single event loop,
+# which runs up to MAX_INFLIGHT_EVALUATIONS of them concurrently.
+CELERY_POOL="${CELERY_POOL:-prefork}"
+CELERY_CONCURRENCY="${CELERY_CONCURRENCY:-4}"
+
+echo "Starting Celery worker with ${CELERY_POOL} pool (concurrency ${CELERY_CONCURRENCY})..."
 echo ""
 
-# Run Celery worker with prefork pool
-# --pool=prefork: Multiple worker processes, each with isolated event loop
-# --concurrency=4: 4 worker processes (adjust based on container resources)
 # --loglevel=info: Standard logging level
-#
-# Note: We use prefork instead of gevent because the collectors use asyncio/httpx.
-# Each prefork worker process has its own event loop, avoiding conflicts.
-exec celery -A worker.celery_app worker --pool=prefork --concurrency=4 --loglevel=info
+exec celery -A worker.celery_app worker --pool="${CELERY_POOL}" --concurrency="${CELERY_CONCURRENCY}" --loglevel=info